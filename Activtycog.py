@@ -10,6 +10,54 @@ from discord import app_commands
 from discord.ext import commands
 
 from branding import BRAND_COLOR, FOOTER_TEXT
+from ranking import utc_today, week_start
+from ui import PaginatorView
+
+ACTIVITY_SQL = """
+INSERT INTO user_activity (guild_id, user_id, messages_sent, last_seen, last_text_channel_id)
+VALUES ($1, $2, $3, $4, $5)
+ON CONFLICT (guild_id, user_id) DO UPDATE
+SET messages_sent = user_activity.messages_sent + EXCLUDED.messages_sent,
+    last_seen = GREATEST(user_activity.last_seen, EXCLUDED.last_seen),
+    last_text_channel_id = EXCLUDED.last_text_channel_id
+"""
+
+DAILY_SQL = """
+INSERT INTO user_activity_daily (guild_id, user_id, day, messages)
+VALUES ($1, $2, $3, $4)
+ON CONFLICT (guild_id, user_id, day) DO UPDATE
+SET messages = user_activity_daily.messages + EXCLUDED.messages
+"""
+
+WEEKLY_SQL = """
+INSERT INTO activity_weekly (guild_id, week_start, messages)
+VALUES ($1, $2, $3)
+ON CONFLICT (guild_id, week_start) DO UPDATE
+SET messages = activity_weekly.messages + EXCLUDED.messages
+"""
+
+CHANNEL_WEEKLY_SQL = """
+INSERT INTO channel_activity_weekly (guild_id, week_start, channel_id, messages)
+VALUES ($1, $2, $3, $4)
+ON CONFLICT (guild_id, week_start, channel_id) DO UPDATE
+SET messages = channel_activity_weekly.messages + EXCLUDED.messages
+"""
+
+LEADERBOARD_PAGE_SIZE = 10
+LEADERBOARD_MAX_PAGES = 10
+PERIOD_LABELS = {"all": "All Time", "week": "This Week", "month": "This Month"}
+PERIOD_CHOICES = [app_commands.Choice(name=label, value=key) for key, label in PERIOD_LABELS.items()]
+
+
+def _sum_at(index: int):
+    """Write-behind merge: add up the pending count at `index`, newest value wins elsewhere."""
+    def merge(old: tuple, new: tuple) -> tuple:
+        return new[:index] + (old[index] + new[index],) + new[index + 1:]
+    return merge
+
+
+_sum_third = _sum_at(2)
+_sum_fourth = _sum_at(3)
 
 
 class ActivityCog(commands.Cog):
@@ -23,44 +71,29 @@ class ActivityCog(commands.Cog):
         # Track message counts in guild text channels
         if message.author.bot or message.guild is None:
             return
-        pool = getattr(self.bot, "pool", None)
-        if not pool:
+        if getattr(self.bot, "pool", None) is None:
             return
-        async with pool.acquire() as conn:
-            # Update all-time counters and last text channel
-            await conn.execute(
-                """
-                INSERT INTO user_activity (guild_id, user_id, messages_sent, last_seen, last_text_channel_id)
-                VALUES ($1, $2, 1, NOW(), $3)
-                ON CONFLICT (guild_id, user_id) DO UPDATE
-                SET messages_sent = user_activity.messages_sent + 1,
-                    last_seen = NOW(),
-                    last_text_channel_id = EXCLUDED.last_text_channel_id
-                """,
-                message.guild.id,
-                message.author.id,
-                getattr(message.channel, "id", None),
-            )
+        gid, uid = message.guild.id, message.author.id
+        cid = getattr(message.channel, "id", None)
+        day = utc_today()
+        week = week_start(day)
+        # Counters are summed in the write-behind buffer and flushed in batches
+        wb = self.bot.write_behind  # type: ignore[attr-defined]
+        wb.submit(("user_activity", gid, uid), ACTIVITY_SQL, gid, uid, 1, message.created_at, cid, merge=_sum_third)
+        wb.submit(("user_activity_daily", gid, uid, day), DAILY_SQL, gid, uid, day, 1, merge=_sum_fourth)
+        # Weekly rollups read by the activity digest
+        wb.submit(("activity_weekly", gid, week), WEEKLY_SQL, gid, week, 1, merge=_sum_third)
+        if cid is not None:
+            wb.submit(("channel_activity_weekly", gid, week, cid), CHANNEL_WEEKLY_SQL, gid, week, cid, 1, merge=_sum_fourth)
+        self.bot.activity_ranks.record_message(gid, uid, day)  # type: ignore[attr-defined]
 
-            # Update daily aggregate
-            await conn.execute(
-                """
-                INSERT INTO user_activity_daily (guild_id, user_id, day, messages)
-                VALUES ($1, $2, CURRENT_DATE, 1)
-                ON CONFLICT (guild_id, user_id, day) DO UPDATE
-                SET messages = user_activity_daily.messages + 1
-                """,
-                message.guild.id,
-                message.author.id,
-            )
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.bot.activity_ranks.drop(guild.id)  # type: ignore[attr-defined]
 
     @app_commands.command(name="activity", description="Show a user's server activity")
     @app_commands.describe(user="User to view; defaults to you", period="Time period")
-    @app_commands.choices(period=[
-        app_commands.Choice(name="All Time", value="all"),
-        app_commands.Choice(name="This Week", value="week"),
-        app_commands.Choice(name="This Month", value="month"),
-    ])
+    @app_commands.choices(period=PERIOD_CHOICES)
     async def activity(self, interaction: discord.Interaction, user: discord.User | None = None, period: app_commands.Choice[str] | None = None):
         # Allow all users, guild only
         if interaction.guild is None:
@@ -103,10 +136,11 @@ class ActivityCog(commands.Cog):
                                COALESCE(SUM(voice_joins),0) AS vj,
                                COALESCE(SUM(voice_seconds),0) AS vs
                         FROM user_activity_daily
-                        WHERE guild_id = $1 AND user_id = $2 AND day >= CURRENT_DATE - ($3::INT - 1)
+                        WHERE guild_id = $1 AND user_id = $2 AND day >= $3::DATE - ($4::INT - 1)
                         """,
                         interaction.guild.id,
                         target.id,
+                        utc_today(),
                         days,
                     )
                     if agg:
@@ -114,53 +148,13 @@ class ActivityCog(commands.Cog):
                         vjoins = int(agg["vj"]) or 0
                         vseconds = int(agg["vs"]) or 0
 
-                    # Rank within period by messages
-                    rank_row = await conn.fetchrow(
-                        """
-                        SELECT 1 + COUNT(*) AS rank
-                        FROM (
-                          SELECT user_id, SUM(messages) AS m
-                          FROM user_activity_daily
-                          WHERE guild_id = $1 AND day >= CURRENT_DATE - ($2::INT - 1)
-                          GROUP BY user_id
-                        ) t
-                        WHERE t.m > $3
-                        """,
-                        interaction.guild.id,
-                        days,
-                        messages,
-                    )
-                    count_row = await conn.fetchrow(
-                        """
-                        SELECT COUNT(*) AS total FROM (
-                          SELECT user_id
-                          FROM user_activity_daily
-                          WHERE guild_id = $1 AND day >= CURRENT_DATE - ($2::INT - 1)
-                          GROUP BY user_id
-                        ) t
-                        """,
-                        interaction.guild.id,
-                        days,
-                    )
-                    if rank_row:
-                        rank_by_messages = rank_row["rank"]
-                    if count_row:
-                        total_tracked = count_row["total"]
-                else:
-                    # All-time rank
-                    rank_row = await conn.fetchrow(
-                        "SELECT 1 + COUNT(*) AS rank FROM user_activity WHERE guild_id = $1 AND messages_sent > $2",
-                        interaction.guild.id,
-                        messages,
-                    )
-                    count_row = await conn.fetchrow(
-                        "SELECT COUNT(*) AS total FROM user_activity WHERE guild_id = $1",
-                        interaction.guild.id,
-                    )
-                    if rank_row:
-                        rank_by_messages = rank_row["rank"]
-                    if count_row:
-                        total_tracked = count_row["total"]
+            # Rank from the in-memory boards; counts there include writes still in the buffer
+            board = (await self.bot.activity_ranks.get(interaction.guild.id)).board(period_key)  # type: ignore[attr-defined]
+            live = board.score(target.id)
+            if live is not None:
+                messages = live
+            rank_by_messages = board.rank_of_score(messages)
+            total_tracked = len(board)
 
         # Helpers
         def fmt_int(n: int) -> str:
@@ -185,7 +179,7 @@ class ActivityCog(commands.Cog):
         rank_part = ""
         if rank_by_messages and total_tracked:
             rank_part = f" {medal_for(rank_by_messages)} #{rank_by_messages}/{total_tracked}"
-        period_label = "All Time" if period_key == "all" else ("This Week" if period_key == "week" else "This Month")
+        period_label = PERIOD_LABELS[period_key]
         summary = (
             f"**{fmt_int(messages)}** {s('msg', messages)} • "
             f"**{fmt_int(vjoins)}** {s('join', vjoins)}{rank_part}\n_({period_label})_"
@@ -258,6 +252,41 @@ class ActivityCog(commands.Cog):
         embed.set_footer(text=FOOTER_TEXT)
         await interaction.followup.send(embed=embed)
 
+    @app_commands.command(name="leaderboard", description="Show the most active members of this server")
+    @app_commands.describe(period="Time period", page="Page to open")
+    @app_commands.choices(period=PERIOD_CHOICES)
+    @app_commands.guild_only()
+    async def leaderboard(self, interaction: discord.Interaction, period: app_commands.Choice[str] | None = None, page: app_commands.Range[int, 1, LEADERBOARD_MAX_PAGES] = 1):
+        if getattr(self.bot, "pool", None) is None:
+            await interaction.response.send_message("Database is not available.", ephemeral=True)
+            return
+        await interaction.response.defer()
+        period_key = period.value if period else "all"
+        board = (await self.bot.activity_ranks.get(interaction.guild.id)).board(period_key)  # type: ignore[attr-defined]
+        total = len(board)
+        if not total:
+            await interaction.followup.send("No activity recorded yet.", ephemeral=True)
+            return
+        own_rank = board.rank(interaction.user.id)
+        you = f"\nYou: #{own_rank}/{total}" if own_rank else ""
+        pages = []
+        page_count = min(LEADERBOARD_MAX_PAGES, -(-total // LEADERBOARD_PAGE_SIZE))
+        for i in range(page_count):
+            offset = i * LEADERBOARD_PAGE_SIZE
+            lines = [
+                f"**{board.rank_of_score(score)}.** <@{uid}> — {score:,} {'msg' if score == 1 else 'msgs'}"
+                for uid, score in board.page(offset, LEADERBOARD_PAGE_SIZE)
+            ]
+            embed = discord.Embed(
+                title=f"Activity Leaderboard — {PERIOD_LABELS[period_key]}",
+                description="\n".join(lines) + f"\n\n_Page {i + 1}/{page_count} • {total:,} members ranked_{you}",
+                color=BRAND_COLOR,
+            )
+            embed.set_footer(text=FOOTER_TEXT)
+            pages.append(embed)
+        view = PaginatorView(pages, start_index=page - 1)
+        await interaction.followup.send(embed=view.current, view=view)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(ActivityCog(bot))
\ No newline at end of file
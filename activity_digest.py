@@ -1,64 +1,156 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List
 
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 
-from branding import BRAND_COLOR, FOOTER_TEXT
+from ranking import week_start
 from ui import make_embed
 
+# Sundays at 12:00 UTC; the digest covers the week so far (Monday onwards)
+DIGEST_WEEKDAY = 6
+DIGEST_HOUR = 12
+# A digest that is this late (bot was offline) is skipped rather than sent stale
+DIGEST_GRACE = timedelta(hours=12)
+DIGEST_CONCURRENCY = 5
+TOP_N = 5
+
+DIGEST_SQL = """
+WITH targets AS (
+    SELECT guild_id, digest_channel_id FROM general_server WHERE digest_channel_id IS NOT NULL
+), top_users AS (
+    SELECT guild_id, jsonb_agg(jsonb_build_array(user_id, m) ORDER BY m DESC) AS users
+    FROM (
+        SELECT d.guild_id, d.user_id, SUM(d.messages) AS m,
+               ROW_NUMBER() OVER (PARTITION BY d.guild_id ORDER BY SUM(d.messages) DESC) AS rn
+        FROM user_activity_daily d JOIN targets t ON t.guild_id = d.guild_id
+        WHERE d.day >= $1 AND d.day < $2 AND d.messages > 0
+        GROUP BY d.guild_id, d.user_id
+    ) u
+    WHERE rn <= $3
+    GROUP BY guild_id
+), top_channels AS (
+    SELECT guild_id, jsonb_agg(jsonb_build_array(channel_id, messages) ORDER BY messages DESC) AS channels
+    FROM (
+        SELECT c.guild_id, c.channel_id, c.messages,
+               ROW_NUMBER() OVER (PARTITION BY c.guild_id ORDER BY c.messages DESC) AS rn
+        FROM channel_activity_weekly c JOIN targets t ON t.guild_id = c.guild_id
+        WHERE c.week_start = $1
+    ) ch
+    WHERE rn <= $3
+    GROUP BY guild_id
+)
+SELECT t.guild_id, t.digest_channel_id,
+       COALESCE(w.messages, 0) AS messages,
+       COALESCE(w.voice_joins, 0) AS voice_joins,
+       COALESCE(w.voice_seconds, 0) AS voice_seconds,
+       u.users, c.channels
+FROM targets t
+LEFT JOIN activity_weekly w ON w.guild_id = t.guild_id AND w.week_start = $1
+LEFT JOIN top_users u ON u.guild_id = t.guild_id
+LEFT JOIN top_channels c ON c.guild_id = t.guild_id
+"""
+
+
+def next_digest_time(after: datetime) -> datetime:
+    """First digest slot strictly after `after`."""
+    slot = after.astimezone(timezone.utc).replace(hour=DIGEST_HOUR, minute=0, second=0, microsecond=0)
+    slot += timedelta(days=(DIGEST_WEEKDAY - slot.weekday()) % 7)
+    if slot <= after:
+        slot += timedelta(days=7)
+    return slot
+
+
+def _pairs(value: Any) -> List[List[int]]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = json.loads(value)
+    return [[int(a), int(b)] for a, b in value]
+
 
 class ActivityDigest(commands.Cog):
+    TIMER_KIND = "weekly_digest"
+
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.log = getattr(bot, "log", logging.getLogger(__name__))
-        self.weekly_digest.start()
+        bot.scheduler.register(self.TIMER_KIND, self._on_timer)  # type: ignore[attr-defined]
 
-    def cog_unload(self):
-        self.weekly_digest.cancel()
+    async def ensure_scheduled(self) -> None:
+        if self.bot.scheduler.fire_time(self.TIMER_KIND, 0) is None:  # type: ignore[attr-defined]
+            await self._schedule_next(datetime.now(timezone.utc))
 
-    @tasks.loop(hours=24)
-    async def weekly_digest(self):
+    async def _schedule_next(self, after: datetime) -> None:
+        due = next_digest_time(after)
+        await self.bot.scheduler.schedule(self.TIMER_KIND, 0, due, {"due": due.isoformat()})  # type: ignore[attr-defined]
+
+    async def _on_timer(self, ref_id: int, payload: Dict[str, Any]) -> None:
         now = datetime.now(timezone.utc)
-        # Run on Sundays at 12:00 UTC
-        if now.weekday() != 6 or now.hour < 12 or now.hour >= 13:
+        due = datetime.fromisoformat(payload["due"]) if payload.get("due") else now
+        # Arm next week's slot first so a failing run cannot stop the digests
+        await self._schedule_next(max(now, due))
+        if now - due > DIGEST_GRACE:
+            self.log.info(f"[DIGEST] Skipping digest due {due.isoformat()} (bot was offline)")
             return
+        await self.send_digests(week_start(due.date()))
+
+    async def send_digests(self, week: date) -> int:
+        """Build every guild's digest with one query and deliver them concurrently."""
         pool = getattr(self.bot, "pool", None)
         if not pool:
-            return
+            return 0
+        # Pending activity counters land in the rollups before we read them
+        await self.bot.write_behind.flush()  # type: ignore[attr-defined]
         async with pool.acquire() as conn:
-            rows = await conn.fetch("SELECT guild_id, digest_channel_id FROM general_server WHERE digest_channel_id IS NOT NULL")
-            for row in rows:
-                guild_id = row["guild_id"]
-                channel_id = row["digest_channel_id"]
-                guild = self.bot.get_guild(int(guild_id))
-                if not guild:
-                    continue
-                ch = guild.get_channel(int(channel_id))
-                if not isinstance(ch, discord.TextChannel):
-                    continue
-                week_ago = (now - timedelta(days=7)).date()
-                # Aggregate last week from daily rollups
-                stats = await conn.fetch("""
-                    SELECT SUM(messages) AS messages, SUM(voice_joins) AS voice_joins, SUM(voice_seconds) AS voice_seconds
-                    FROM user_activity_daily WHERE guild_id=$1 AND day >= $2
-                """, guild.id, week_ago)
-                messages = stats[0]["messages"] or 0
-                voice_joins = stats[0]["voice_joins"] or 0
-                voice_seconds = stats[0]["voice_seconds"] or 0
-                hours = round((voice_seconds or 0) / 3600, 1)
-
-                embed = make_embed(
-                    title=f"Weekly Activity — {guild.name}",
-                    description=f"Messages: {messages}\nVoice joins: {voice_joins}\nVoice time: {hours}h",
-                )
+            rows = await conn.fetch(DIGEST_SQL, week, week + timedelta(days=7), TOP_N)
+
+        sem = asyncio.Semaphore(DIGEST_CONCURRENCY)
+
+        async def deliver(row) -> bool:
+            guild = self.bot.get_guild(int(row["guild_id"]))
+            if not guild:
+                return False
+            ch = guild.get_channel(int(row["digest_channel_id"]))
+            if not isinstance(ch, discord.TextChannel):
+                return False
+            async with sem:
                 try:
-                    await ch.send(embed=embed)
+                    await ch.send(embed=self.build_embed(guild, row))
+                    return True
                 except Exception:
-                    pass
+                    return False
+
+        results = await asyncio.gather(*(deliver(r) for r in rows))
+        sent = sum(1 for ok in results if ok)
+        self.log.info(f"[DIGEST] Weekly digest sent to {sent}/{len(rows)} guild(s)")
+        return sent
+
+    def build_embed(self, guild: discord.Guild, row) -> discord.Embed:
+        messages = int(row["messages"])
+        voice_joins = int(row["voice_joins"])
+        hours = round(int(row["voice_seconds"]) / 3600, 1)
+        embed = make_embed(
+            title=f"Weekly Activity — {guild.name}",
+            description=f"Messages: {messages}\nVoice joins: {voice_joins}\nVoice time: {hours}h",
+        )
+        users = _pairs(row["users"])
+        if users:
+            lines = [f"{i}. <@{uid}> — {n} msgs" for i, (uid, n) in enumerate(users, 1)]
+            embed.add_field(name="Top Members", value="\n".join(lines), inline=False)
+        channels = _pairs(row["channels"])
+        if channels:
+            lines = [f"{i}. <#{cid}> — {n} msgs" for i, (cid, n) in enumerate(channels, 1)]
+            embed.add_field(name="Top Channels", value="\n".join(lines), inline=False)
+        return embed
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(ActivityDigest(bot))
+    cog = ActivityDigest(bot)
+    await bot.add_cog(cog)
+    await cog.ensure_scheduled()
@@ -13,7 +13,10 @@ Features:
 
 import logging
 import json
-from datetime import datetime, timezone
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from typing import Dict, List, Optional, Any
 
 import discord
@@ -21,31 +24,119 @@ from discord import app_commands
 from discord.ext import commands
 
 from branding import BRAND_COLOR, FOOTER_TEXT, GREEN, YELLOW, RED
+from metrics import REGISTRY
+from retrieval import QUESTION_WORDS, BM25Index, Passage, jaccard, normalize, shingles, split_paragraphs
+
+# Streaming /ask answers: minimum seconds between message edits (Discord rate-limits edits)
+EDIT_INTERVAL = 1.0
+ASK_MAX_TOKENS = int(os.getenv("AI_ASK_MAX_TOKENS", "512"))
+MAX_DESCRIPTION = 4096
+# Characters of retrieved server context sent with each question
+CONTEXT_BUDGET = int(os.getenv("AI_CONTEXT_CHARS", "1500"))
+# Answer cache for repeated questions (per guild)
+ANSWER_CACHE_SIZE = int(os.getenv("AI_ANSWER_CACHE_SIZE", "64"))
+ANSWER_CACHE_TTL = int(os.getenv("AI_ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("AI_ANSWER_CACHE_SIMILARITY", "0.6"))
+
+ANSWER_CACHE = REGISTRY.counter("frostmod_ai_answer_cache_total", "/ask answer cache lookups", ("result",))
 
 
 class ServerContextCache:
-    """Cache server context information for better AI responses."""
+    """Per-guild retrieval index over server context, invalidated by guild events.
+
+    Rules text is fetched over REST and kept until the rules channel changes;
+    the index (rules paragraphs, channels and topics, roles) is rebuilt in
+    memory after any channel, role or rules change.
+    """
     
     def __init__(self):
-        self.cache = {}  # guild_id -> context_data
-        self.max_age_hours = 1  # Refresh cache after this many hours
+        self.rules = {}  # guild_id -> list of rules paragraphs
+        self.indexes = {}  # guild_id -> BM25Index
+        self.versions = {}  # guild_id -> answer-cache version, bumped when cached answers may be wrong
         
-    def get(self, guild_id: int) -> Optional[Dict[str, Any]]:
-        """Get cached context for a guild if available and not expired."""
-        if guild_id in self.cache:
-            context = self.cache[guild_id]
-            # Check if cache is still valid
-            age = (datetime.now(timezone.utc) - context["timestamp"]).total_seconds() / 3600
-            if age < self.max_age_hours:
-                return context["data"]
-        return None
+    def get(self, guild_id: int) -> Optional[BM25Index]:
+        """Get the cached index for a guild, if still valid."""
+        return self.indexes.get(guild_id)
         
-    def set(self, guild_id: int, context_data: Dict[str, Any]):
-        """Cache context data for a guild."""
-        self.cache[guild_id] = {
-            "data": context_data,
-            "timestamp": datetime.now(timezone.utc)
-        }
+    def set(self, guild_id: int, index: BM25Index):
+        """Cache the index for a guild."""
+        self.indexes[guild_id] = index
+
+    def invalidate(self, guild_id: int, rules: bool = False, answers: bool = True):
+        """Drop the guild's index (and its rules text when `rules` is set).
+
+        With `answers` off only the index is rebuilt: for changes that do not
+        make earlier answers wrong (role member counts), so cached answers stay.
+        """
+        self.indexes.pop(guild_id, None)
+        if answers:
+            self.versions[guild_id] = self.versions.get(guild_id, 0) + 1
+        if rules:
+            self.rules.pop(guild_id, None)
+
+    def version(self, guild_id: int) -> int:
+        return self.versions.get(guild_id, 0)
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    sources: List[str]
+    version: int
+    shingles: frozenset
+    created: float
+
+
+class AnswerCache:
+    """Per-guild LRU cache of answers, matched on normalized question text or close paraphrases.
+
+    Entries expire after `ttl` seconds and are ignored once the guild's
+    context version has changed.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 similarity: float = ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.guilds: Dict[int, "OrderedDict[str, CachedAnswer]"] = {}
+
+    def get(self, guild_id: int, question: str, version: int) -> Optional[CachedAnswer]:
+        entries = self.guilds.get(guild_id)
+        if not entries:
+            return None
+        now = time.monotonic()
+        for key in [k for k, e in entries.items() if e.version != version or now - e.created > self.ttl]:
+            del entries[key]
+        key = normalize(question)
+        entry = entries.get(key)
+        if entry is None:
+            # Closest paraphrase above the similarity threshold that asks the same kind of question
+            wanted = shingles(question)
+            asks = wanted & QUESTION_WORDS
+            best = 0.0
+            for k, e in entries.items():
+                if e.shingles & QUESTION_WORDS != asks:
+                    continue
+                score = jaccard(wanted, e.shingles)
+                if score >= self.similarity and score > best:
+                    key, entry, best = k, e, score
+        if entry is not None:
+            entries.move_to_end(key)
+        return entry
+
+    def put(self, guild_id: int, question: str, version: int, answer: str, sources: List[str]):
+        key = normalize(question)
+        if not key:
+            return
+        entries = self.guilds.setdefault(guild_id, OrderedDict())
+        entries[key] = CachedAnswer(answer, sources, version, shingles(question), time.monotonic())
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def clear(self, guild_id: int):
+        self.guilds.pop(guild_id, None)
 
 
 class AskModal(discord.ui.Modal, title="Ask the Assistant"):
@@ -78,6 +169,7 @@ class AIAssistant(commands.Cog):
         self.bot = bot
         self.logger = logging.getLogger('aiassistant')
         self.context_cache = ServerContextCache()
+        self.answer_cache = AnswerCache()
         self.recent_questions = {}  # guild_id -> list of recent questions
         self.max_recent_questions = 10  # Per guild
         self.logger.info("AI Assistant cog initialized")
@@ -127,8 +219,26 @@ class AIAssistant(commands.Cog):
         self._add_recent_question(guild.id, interaction.user.id, question)
         
         try:
-            # Get server context (rules, channels, etc.)
-            server_context = await self._get_server_context(guild)
+            title = f"Answer to: {question[:100] + ('...' if len(question) > 100 else '')}"
+
+            # Repeated (or closely paraphrased) questions are answered from the cache
+            context_version = self.context_cache.version(guild.id)
+            cached = self.answer_cache.get(guild.id, question, context_version)
+            if cached is not None:
+                ANSWER_CACHE.inc("hit")
+                embed = self._answer_embed(title, cached.answer, cached.sources)
+                embed.set_footer(text=f"{FOOTER_TEXT} • Cached answer")
+                await interaction.followup.send(embed=embed)
+                self.logger.info(f"Answered question from cache for {interaction.user.name} in {guild.name}: {question[:50]}...")
+                return
+            ANSWER_CACHE.inc("miss")
+
+            # Get the server context relevant to this question (rules, channels, roles)
+            passages = await self._get_server_context(guild, question)
+            server_context = "\n\n".join(
+                f"{source}:\n" + "\n".join(p.text for p in passages if p.source == source)
+                for source in dict.fromkeys(p.source for p in passages)
+            )
             
             # Get recent questions from this user in this server for context
             recent_questions = self._get_recent_questions(guild.id, interaction.user.id)
@@ -154,42 +264,52 @@ class AIAssistant(commands.Cog):
             if recent_context:
                 user_prompt = f"{recent_context}\n\nNew question: {question}"
             
-            # Use the AI service to get a response
-            _, _, response = await ai_mod_cog.analyze_message(
-                message_content=user_prompt,
-                guild_id=guild.id,
-                debug_mode=True,
-                system_override=system_prompt,
-                response_format="text"  # Request regular text, not JSON
-            )
-            
-            # Create response embed
-            embed = discord.Embed(
-                title=f"Answer to: {question[:100] + ('...' if len(question) > 100 else '')}",
-                description=response,
-                color=BRAND_COLOR
-            )
-            
             # Add information about what data was used
-            context_sources = []
-            if server_context:
-                if "Rules" in server_context:
-                    context_sources.append("Server Rules")
-                if "Channels" in server_context:
-                    context_sources.append("Channel Structure")
-                if "Roles" in server_context:
-                    context_sources.append("Server Roles")
-                
-            if context_sources:
-                embed.add_field(
-                    name="Sources Used", 
-                    value=", ".join(context_sources),
-                    inline=False
-                )
-            
-            embed.set_footer(text=f"{FOOTER_TEXT}")
-            
-            await interaction.followup.send(embed=embed)
+            source_names = {"Rules": "Server Rules", "Channels": "Channel Structure", "Roles": "Server Roles"}
+            context_sources = [source_names.get(s, s) for s in dict.fromkeys(p.source for p in passages)]
+
+            message = await interaction.followup.send(
+                embed=self._answer_embed(title, "*Thinking…*"), wait=True
+            )
+
+            # Stream the answer, editing the message as tokens arrive
+            answer = ""
+            last_edit = time.monotonic()
+            interrupted = False
+            streamed = False
+            stream = ai_mod_cog.stream_chat(system_prompt, user_prompt, max_tokens=ASK_MAX_TOKENS)
+            try:
+                async for delta in stream:
+                    answer += delta
+                    if time.monotonic() - last_edit >= EDIT_INTERVAL and answer.strip():
+                        await message.edit(embed=self._answer_embed(title, answer + " ▌"))
+                        last_edit = time.monotonic()
+                streamed = True
+            except Exception as e:
+                if answer.strip():
+                    self.logger.warning(f"Answer stream interrupted after {len(answer)} chars: {e}")
+                    interrupted = True
+                else:
+                    # Nothing streamed yet: fall back to a regular request
+                    self.logger.info(f"Streaming unavailable ({e}); falling back to a full response")
+                    _, _, answer = await ai_mod_cog.analyze_message(
+                        message_content=user_prompt,
+                        guild_id=guild.id,
+                        debug_mode=True,
+                        system_override=system_prompt,
+                        response_format="text"  # Request regular text, not JSON
+                    )
+            finally:
+                # Release the backend slot right away if we stopped early
+                await stream.aclose()
+
+            if interrupted:
+                answer += "\n\n*The response was interrupted.*"
+            answer = answer.strip()
+            await message.edit(embed=self._answer_embed(title, answer or "No answer was generated.", context_sources))
+            # Only complete model answers are cached (not fallbacks or interrupted streams)
+            if streamed and answer:
+                self.answer_cache.put(guild.id, question, context_version, answer, context_sources)
             self.logger.info(f"Answered question for {interaction.user.name} in {guild.name}: {question[:50]}...")
             
         except Exception as e:
@@ -199,87 +319,125 @@ class AIAssistant(commands.Cog):
                 ephemeral=True
             )
     
-    async def _get_server_context(self, guild: discord.Guild) -> str:
-        """Get context about the server for informed AI responses."""
-        # Check cache first
-        cached_context = self.context_cache.get(guild.id)
-        if cached_context:
+    def _answer_embed(self, title: str, text: str, sources: Optional[List[str]] = None) -> discord.Embed:
+        if len(text) > MAX_DESCRIPTION:
+            text = text[:MAX_DESCRIPTION - 1] + "…"
+        embed = discord.Embed(title=title, description=text, color=BRAND_COLOR)
+        if sources:
+            embed.add_field(name="Sources Used", value=", ".join(sources), inline=False)
+        embed.set_footer(text=f"{FOOTER_TEXT}")
+        return embed
+
+    async def _get_server_context(self, guild: discord.Guild, question: str) -> List[Passage]:
+        """Get the server context passages relevant to a question."""
+        index = self.context_cache.get(guild.id)
+        if index is None:
+            index = await self._build_context_index(guild)
+        else:
             self.logger.debug(f"Using cached context for guild {guild.id}")
-            return cached_context
-            
+        return index.select(question, CONTEXT_BUDGET)
+
+    async def _build_context_index(self, guild: discord.Guild) -> BM25Index:
+        """Index the server's rules, channels and roles."""
         self.logger.info(f"Building server context for guild {guild.id} ({guild.name})")
-        
-        context_parts = []
-        
-        # 1. Get server rules if available
-        try:
-            # First check for auto-published rules
-            rules_channel_id = guild.rules_channel and guild.rules_channel.id
-            if rules_channel_id:
-                rules_channel = guild.rules_channel
-                async for message in rules_channel.history(limit=10):
-                    if message.author == guild.me:
-                        continue  # Skip bot's own messages
-                    if message.content:
-                        context_parts.append(f"Rules:\n{message.content[:1000]}")
-                        break
-        except Exception as e:
-            self.logger.error(f"Error getting rules: {e}")
-        
-        # 2. Get channel structure for navigation context
-        try:
-            channel_info = []
-            # Add categories and their channels
-            for category in guild.categories:
-                cat_channels = []
-                for channel in category.channels:
-                    if isinstance(channel, discord.TextChannel) and channel.permissions_for(guild.me).view_channel:
-                        topic = f": {channel.topic}" if channel.topic else ""
-                        cat_channels.append(f"#{channel.name}{topic}")
-                
-                if cat_channels:
-                    channel_info.append(f"Category '{category.name}':\n" + "\n".join(cat_channels))
-            
-            # Add uncategorized channels
-            uncat_channels = []
-            for channel in guild.text_channels:
-                if channel.category is None and channel.permissions_for(guild.me).view_channel:
-                    topic = f": {channel.topic}" if channel.topic else ""
-                    uncat_channels.append(f"#{channel.name}{topic}")
-                    
-            if uncat_channels:
-                channel_info.append("Uncategorized channels:\n" + "\n".join(uncat_channels))
-                
-            if channel_info:
-                context_parts.append("Channels:\n" + "\n".join(channel_info))
-        except Exception as e:
-            self.logger.error(f"Error getting channel structure: {e}")
-            
-        # 3. Get role information
-        try:
-            role_info = []
-            for role in sorted(guild.roles, key=lambda r: r.position, reverse=True):
-                if role.name != "@everyone" and not role.is_bot_managed():
-                    members_count = len(role.members)
-                    if members_count > 0:
-                        role_info.append(f"{role.name}: {members_count} members")
-            
-            if role_info:
-                context_parts.append("Roles:\n" + "\n".join(role_info[:15]))  # Limit to top 15 roles
-        except Exception as e:
-            self.logger.error(f"Error getting role information: {e}")
-            
-        # Combine all context
-        combined_context = "\n\n".join(context_parts)
-        
-        # Truncate if too long
-        if len(combined_context) > 4000:
-            combined_context = combined_context[:4000] + "...[additional context omitted]"
-        
-        # Cache the context
-        self.context_cache.set(guild.id, combined_context)
-        
-        return combined_context
+        passages = []
+
+        # 1. Server rules (fetched once, until the rules channel changes)
+        rules = self.context_cache.rules.get(guild.id)
+        if rules is None:
+            rules = []
+            try:
+                if guild.rules_channel:
+                    async for message in guild.rules_channel.history(limit=10, oldest_first=True):
+                        if message.author == guild.me:
+                            continue  # Skip bot's own messages
+                        if message.content:
+                            rules.extend(split_paragraphs(message.content, max_chars=300))
+                self.context_cache.rules[guild.id] = rules
+            except Exception as e:
+                self.logger.error(f"Error getting rules: {e}")
+        passages.extend(Passage("Rules", r) for r in rules)
+
+        # 2. Channel structure for navigation context
+        for channel in guild.text_channels:
+            if not channel.permissions_for(guild.me).view_channel:
+                continue
+            where = f" in category '{channel.category.name}'" if channel.category else ""
+            topic = f": {channel.topic}" if channel.topic else ""
+            passages.append(Passage("Channels", f"#{channel.name}{where}{topic}"))
+
+        # 3. Role information
+        for role in sorted(guild.roles, key=lambda r: r.position, reverse=True):
+            if role.is_default() or role.is_bot_managed():
+                continue
+            members_count = len(role.members)
+            if members_count > 0:
+                passages.append(Passage("Roles", f"{role.name} role: {members_count} members"))
+
+        index = BM25Index(passages)
+        self.context_cache.set(guild.id, index)
+        return index
+
+    # Context invalidation: rebuild only when something the index covers changes
+
+    def _is_rules_channel(self, guild: Optional[discord.Guild], channel_id: int) -> bool:
+        return bool(guild and guild.rules_channel and guild.rules_channel.id == channel_id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self.context_cache.invalidate(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.context_cache.invalidate(channel.guild.id, rules=self._is_rules_channel(channel.guild, channel.id))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        self.context_cache.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self.context_cache.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.context_cache.invalidate(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        self.context_cache.invalidate(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        # Role member counts are part of the index, but not worth retiring cached answers
+        # over (auto-roles and reaction roles change them constantly)
+        if before.roles != after.roles:
+            self.context_cache.invalidate(after.guild.id, answers=False)
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        if before.rules_channel != after.rules_channel:
+            self.context_cache.invalidate(after.id, rules=True)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.context_cache.invalidate(guild.id, rules=True)
+        self.answer_cache.clear(guild.id)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if self._is_rules_channel(message.guild, message.channel.id):
+            self.context_cache.invalidate(message.guild.id, rules=True)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if payload.guild_id and self._is_rules_channel(self.bot.get_guild(payload.guild_id), payload.channel_id):
+            self.context_cache.invalidate(payload.guild_id, rules=True)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.guild_id and self._is_rules_channel(self.bot.get_guild(payload.guild_id), payload.channel_id):
+            self.context_cache.invalidate(payload.guild_id, rules=True)
         
     def _add_recent_question(self, guild_id: int, user_id: int, question: str):
         """Track recent questions for conversation context."""
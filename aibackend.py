@@ -0,0 +1,406 @@
+"""
+Failure isolation for the local model backend (AI_API_URL).
+
+- `CircuitBreaker`: opens after AI_BREAKER_FAILURES consecutive failures and
+  fails fast while open; after a cool-down it lets a single half-open probe
+  through, closing again on success or re-opening with a doubled cool-down
+  (capped at AI_BREAKER_MAX_OPEN_SECONDS) on failure.
+- `AdaptiveLimiter`: AIMD limit on in-flight inference requests. The limit
+  grows by 1/limit per on-target completion and shrinks multiplicatively
+  when a request fails or its latency exceeds AI_LATENCY_TARGET_MS, so
+  concurrency settles where the backend still answers on time.
+- `ModelBackend.slot()` combines both. When the backend cannot take a request
+  it raises `BackendUnavailable` and the caller falls back to the local
+  pre-filter. AI_DEGRADED_MODE decides what live moderation does while the
+  circuit is open:
+    "prefilter" - do not wait; answer from the local pre-filter instead
+    "queue"     - wait up to AI_QUEUE_DEADLINE_MS for the half-open probe
+                  (within the request's deadline), then fall back
+
+Requests carry a priority class and a deadline. Waiting requests are served
+live moderation first, then interactive commands (/testmod, /ask,
+/risklevel); background work (profile risk reassessment) only runs on idle
+capacity and is shed otherwise. Live moderation waits for a slot at least as
+long as interactive commands do, up to its own deadline, so a burst is queued
+rather than answered in degraded mode. A request whose deadline passes while
+it waits is dropped instead of being sent to the model.
+
+Breaker state, the limit, in-flight and queued requests are exported as
+metrics.
+
+Moderation can run as a cascade: when AI_SMALL_MODEL is set, requests go to
+that (small, fast) model first and only verdicts whose confidence falls inside
+[AI_CASCADE_LOW, AI_CASCADE_HIGH] are sent on to the main model. Each stage is
+a `ModelEndpoint` with its own URL, model name and breaker/limiter.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional, Tuple
+
+import jsonscan
+import latency
+from metrics import REGISTRY
+
+log = logging.getLogger("aimoderation")
+
+BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("AI_BREAKER_OPEN_SECONDS", "15"))
+BREAKER_MAX_OPEN_SECONDS = float(os.getenv("AI_BREAKER_MAX_OPEN_SECONDS", "300"))
+MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+LATENCY_TARGET_MS = float(os.getenv("AI_LATENCY_TARGET_MS", "4000"))
+DEGRADED_MODE = os.getenv("AI_DEGRADED_MODE", "queue").lower()
+QUEUE_DEADLINE_MS = float(os.getenv("AI_QUEUE_DEADLINE_MS", "5000"))
+MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "100"))
+
+# Priority classes: lower runs first
+LIVE, INTERACTIVE, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {LIVE: "live", INTERACTIVE: "interactive", BACKGROUND: "background"}
+# Seconds after which an answer is no longer useful (None = no deadline)
+DEADLINES = {
+    LIVE: float(os.getenv("AI_LIVE_DEADLINE_MS", "10000")) / 1000,
+    INTERACTIVE: float(os.getenv("AI_INTERACTIVE_DEADLINE_MS", "20000")) / 1000,
+    BACKGROUND: None,
+}
+
+# Small-model verdicts with confidence inside this band go on to the main model
+CASCADE_LOW = float(os.getenv("AI_CASCADE_LOW", "0.2"))
+CASCADE_HIGH = float(os.getenv("AI_CASCADE_HIGH", "0.8"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+REJECTED = REGISTRY.counter("frostmod_ai_rejected_total", "Inference requests not sent to the backend", ("priority", "reason"))
+CASCADE = REGISTRY.counter("frostmod_ai_cascade_total", "Moderation requests by cascade outcome", ("outcome",))
+CASCADE_AGREEMENT = REGISTRY.counter("frostmod_ai_cascade_agreement_total",
+                                     "Small/main model verdict agreement on escalated requests", ("result",))
+_active: Optional["ModelBackend"] = None
+REGISTRY.gauge("frostmod_ai_breaker_state", "Model backend circuit (0 closed, 1 half-open, 2 open)",
+               fn=lambda: _STATE_VALUES[_active.breaker.state] if _active else None)
+REGISTRY.gauge("frostmod_ai_concurrency_limit", "Adaptive in-flight inference limit", fn=lambda: _active.limiter.limit if _active else None)
+REGISTRY.gauge("frostmod_ai_in_flight", "Inference requests in flight", fn=lambda: _active.limiter.in_flight if _active else None)
+REGISTRY.gauge("frostmod_ai_queued", "Inference requests waiting for a slot", fn=lambda: _active.limiter.queued if _active else None)
+
+
+class BackendUnavailable(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, open_seconds: float = BREAKER_OPEN_SECONDS,
+                 max_open_seconds: float = BREAKER_MAX_OPEN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.open_seconds = open_seconds
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        """Whether a request may go to the backend; in half-open state only one probe at a time."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic() if now is None else now
+        if self.state == OPEN:
+            if now - self.opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            log.info("[AI] Backend recovered; circuit closed")
+        self.state = CLOSED
+        self.failures = 0
+        self.open_seconds = self.base_open_seconds
+        self._probe_in_flight = False
+
+    def record_failure(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self.open_seconds = min(self.open_seconds * 2, self.max_open_seconds)
+            self._open(now)
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open(now)
+
+    def release_probe(self) -> None:
+        """A half-open probe was abandoned before reaching the backend; allow another."""
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self._probe_in_flight = False
+        log.warning(f"[AI] Backend unhealthy after {self.failures} failure(s); circuit open for {self.open_seconds:.0f}s")
+
+
+class AdaptiveLimiter:
+    def __init__(self, max_limit: int = MAX_CONCURRENCY, target_ms: float = LATENCY_TARGET_MS,
+                 initial: float = 2.0, min_limit: float = 1.0, backoff: float = 0.7):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.target_ms = target_ms
+        self.backoff = backoff
+        self.limit = min(float(initial), float(max_limit))
+        self.in_flight = 0
+        # Waiters ordered by (priority, deadline, arrival); abandoned entries are skipped lazily
+        self._waiters: List[Tuple[int, float, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self.queued = 0
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self, priority: int = INTERACTIVE, timeout: Optional[float] = None,
+                      deadline: Optional[float] = None) -> None:
+        """Take a slot, waiting up to `timeout` seconds behind more urgent requests.
+
+        Background requests only use idle capacity: they never queue.
+        """
+        if self._has_capacity() and not self.queued:
+            self.in_flight += 1
+            return
+        if priority >= BACKGROUND:
+            raise BackendUnavailable("shed")
+        if timeout is not None and timeout <= 0:
+            raise BackendUnavailable("saturated")
+        if self.queued >= MAX_QUEUE:
+            raise BackendUnavailable("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, math.inf if deadline is None else deadline, next(self._seq), waiter))
+        self.queued += 1
+        if len(self._waiters) > 2 * MAX_QUEUE:
+            self._compact()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # The slot was handed over just as we gave up: pass it on
+                self.in_flight -= 1
+                self._wake()
+            elif not waiter.done() or waiter.cancelled():
+                self.queued -= 1
+            if isinstance(e, asyncio.TimeoutError):
+                raise BackendUnavailable("deadline") from None
+            raise
+        # The slot was handed over by _wake(); in_flight already counts it
+
+    def release(self, latency_ms: Optional[float], ok: bool) -> None:
+        self.in_flight -= 1
+        if not ok or (latency_ms is not None and latency_ms > self.target_ms):
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        now = time.monotonic()
+        while self._waiters and self._has_capacity():
+            _, deadline, _, waiter = heapq.heappop(self._waiters)
+            if waiter.done():
+                continue
+            self.queued -= 1
+            if deadline < now:
+                # Too late to be worth sending to the model
+                waiter.set_exception(BackendUnavailable("expired"))
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def _compact(self) -> None:
+        self._waiters = [w for w in self._waiters if not w[3].done()]
+        heapq.heapify(self._waiters)
+
+
+class _Call:
+    __slots__ = ("ok", "latency_ms")
+
+    def __init__(self):
+        self.ok = True
+        # Set by streaming callers to judge the backend by time-to-first-token
+        self.latency_ms: Optional[float] = None
+
+    def mark_failure(self) -> None:
+        self.ok = False
+
+
+class ModelBackend:
+    def __init__(self, mode: str = DEGRADED_MODE, queue_deadline_ms: float = QUEUE_DEADLINE_MS, export: bool = True):
+        self.breaker = CircuitBreaker()
+        self.limiter = AdaptiveLimiter()
+        self.mode = mode if mode in ("prefilter", "queue") else "queue"
+        self.queue_deadline = queue_deadline_ms / 1000
+        if export:
+            # The gauges below follow the most recently created backend (survives cog reloads)
+            global _active
+            _active = self
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker.state == CLOSED
+
+    def deadline_for(self, priority: int) -> Optional[float]:
+        """Absolute (monotonic) time after which a request of this class is no longer worth answering."""
+        budget = DEADLINES.get(priority)
+        return None if budget is None else time.monotonic() + budget
+
+    def _max_wait(self, priority: int) -> float:
+        """Longest wait for a slot; slot() also caps it at the request's deadline."""
+        if priority == LIVE:
+            # Served first, so never given up on sooner than an interactive request
+            return max(DEADLINES[LIVE], DEADLINES[INTERACTIVE])
+        if priority == INTERACTIVE:
+            return DEADLINES[INTERACTIVE]
+        return 0.0
+
+    def _probe_time(self, priority: int, now: float, deadline: Optional[float]) -> Optional[float]:
+        """When an open circuit goes half-open, if a live request in queue mode should wait for it."""
+        if self.mode != "queue" or priority != LIVE or self.breaker.state != OPEN:
+            return None
+        probe_at = self.breaker.opened_at + self.breaker.open_seconds
+        limit = now + self.queue_deadline
+        if deadline is not None:
+            limit = min(limit, deadline)
+        return probe_at if probe_at <= limit else None
+
+    @asynccontextmanager
+    async def slot(self, priority: int = INTERACTIVE, deadline: Optional[float] = None):
+        """Run one backend request; raises BackendUnavailable instead of waiting on an unhealthy or busy backend."""
+        label = PRIORITY_NAMES.get(priority, str(priority))
+        try:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                raise BackendUnavailable("expired")
+            if not self.breaker.allow(now):
+                probe_at = self._probe_time(priority, now, deadline)
+                if probe_at is None:
+                    raise BackendUnavailable("circuit_open")
+                await asyncio.sleep(max(0.0, probe_at - now))
+                now = time.monotonic()
+                if not self.breaker.allow(now):
+                    raise BackendUnavailable("circuit_open")
+            wait = self._max_wait(priority)
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            try:
+                await self.limiter.acquire(priority, wait, deadline)
+            except BaseException:
+                # A half-open probe that could not get a slot must not block future probes
+                self.breaker.release_probe()
+                raise
+        except BackendUnavailable as e:
+            REJECTED.inc(label, e.reason)
+            raise
+        call = _Call()
+        started = time.perf_counter()
+        try:
+            yield call
+        except (asyncio.CancelledError, GeneratorExit):
+            # Abandoned by the caller (or a stream closed early): free the slot without judging the backend
+            self.limiter.release(None, True)
+            self.breaker.release_probe()
+            raise
+        except BaseException:
+            call.mark_failure()
+            self._finish(call, started)
+            raise
+        else:
+            self._finish(call, started)
+
+    def _finish(self, call: _Call, started: float) -> None:
+        latency_ms = call.latency_ms if call.latency_ms is not None else (time.perf_counter() - started) * 1000
+        self.limiter.release(latency_ms, call.ok)
+        if call.ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+
+async def iter_sse_deltas(response) -> AsyncIterator[str]:
+    """Yield content deltas from an OpenAI-compatible `stream: true` chat completion response."""
+    async for raw in response.content:
+        line = raw.strip()
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            return
+        try:
+            event = jsonscan.loads(data)
+        except ValueError:
+            continue
+        choices = event.get("choices") or []
+        if choices:
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                yield delta
+
+
+@dataclass
+class ModelEndpoint:
+    """One model stage: where requests go and the breaker/limiter guarding it."""
+    stage: str
+    url: str
+    path: str
+    model: str
+    backend: ModelBackend
+    latency: latency.LatencyStats
+
+    @property
+    def full_url(self) -> str:
+        return f"{self.url}{self.path}"
+
+
+def load_small_endpoint(api_url: str, api_path: str) -> Optional[ModelEndpoint]:
+    """The cascade's first stage, or None when AI_SMALL_MODEL is not configured."""
+    model = os.getenv("AI_SMALL_MODEL", "").strip()
+    if not model:
+        return None
+    return ModelEndpoint(
+        stage="small",
+        url=os.getenv("AI_SMALL_API_URL") or api_url,
+        path=os.getenv("AI_SMALL_API_PATH") or api_path,
+        model=model,
+        backend=ModelBackend(export=False),
+        latency=latency.tracker("inference_small"),
+    )
+
+
+def uncertain(confidence: float, low: float = CASCADE_LOW, high: float = CASCADE_HIGH) -> bool:
+    return low <= confidence <= high
+
+
+_SPLIT = re.compile(r"\s*,\s*")
+
+
+def load_prefilter_patterns() -> List[re.Pattern]:
+    raw = os.getenv("AI_PREFILTER_PATTERNS", "")
+    patterns = []
+    for p in _SPLIT.split(raw.strip()):
+        if not p:
+            continue
+        try:
+            patterns.append(re.compile(p, re.IGNORECASE))
+        except re.error as e:
+            log.warning(f"[AI] Ignoring invalid AI_PREFILTER_PATTERNS entry {p!r}: {e}")
+    return patterns
@@ -13,6 +13,8 @@ import platform
 import re
 import random
 import csv
+import shutil
+import subprocess
 import os.path
 from datetime import datetime, timedelta, timezone
 import psutil
@@ -22,7 +24,15 @@ import aiohttp
 from discord import app_commands
 from discord.ext import commands
 
+from aibackend import (
+    BACKGROUND, CASCADE, CASCADE_AGREEMENT, INTERACTIVE, LIVE, BackendUnavailable, ModelBackend, ModelEndpoint,
+    iter_sse_deltas, load_prefilter_patterns, load_small_endpoint, uncertain,
+)
 from branding import BRAND_COLOR, FOOTER_TEXT, GREEN, YELLOW, RED
+from escalation import ViolationEscalation
+import jsonscan
+import latency
+from metrics import AI_TTFT_SECONDS, INFERENCE_SECONDS
 
 
 class AIModSettingsView(discord.ui.View):
@@ -907,7 +917,20 @@ class AIModeration(commands.Cog):
             "avg_inference_time": 0.0,
             "started_at": datetime.now().isoformat()
         }
-        self.inference_times = []  # List to track individual inference times
+        # Bounded p50/p95/p99 + EWMA, shared with the metrics endpoint
+        self.inference_stats = latency.tracker("inference")
+        self.ttft_stats = latency.tracker("ai_ttft")
+        # Circuit breaker + adaptive concurrency for the model backend; see aibackend.py
+        self.backend = ModelBackend()
+        self.prefilter_patterns = load_prefilter_patterns()
+        if self.backend.mode == "prefilter" and not self.prefilter_patterns:
+            # A pre-filter with nothing to match would let every message through while the model is down
+            self.logger.warning("AI_DEGRADED_MODE=prefilter without AI_PREFILTER_PATTERNS; using queue mode")
+            self.backend.mode = "queue"
+        # Moderation cascade: optional small model first, this model for uncertain verdicts
+        self.endpoint = ModelEndpoint("main", self.api_url, self.api_path, self.model, self.backend, self.inference_stats)
+        self.small_endpoint = load_small_endpoint(self.api_url, self.api_path)
+        self.escalation = ViolationEscalation(bot)
         
         # Set up data export directory paths
         self.data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'user_data')
@@ -916,7 +939,7 @@ class AIModeration(commands.Cog):
         # Initialize hardware info variables
         self.cpu_cores = 0
         self.gpu_available = False
-        self.detect_hardware()
+        self.memory_available = 0.0
         
         if not all([self.model, self.api_url, self.api_path]):
             self.logger.warning("AI moderation configuration incomplete. Check your .env file.")
@@ -926,6 +949,10 @@ class AIModeration(commands.Cog):
             # Schedule the connection check to run after the bot is ready instead of calling it directly
             self.bot.loop.create_task(self.check_connection_on_startup())
             
+    async def cog_load(self):
+        # Hardware probing spawns nvidia-smi; keep it off the event loop
+        await asyncio.to_thread(self.detect_hardware)
+
     def detect_hardware(self):
         """Detect available hardware for optimization purposes."""
         try:
@@ -941,7 +968,9 @@ class AIModeration(commands.Cog):
             # Check for NVIDIA GPU - relevant for RTX 3060 optimization
             # This is a simple check - in production you'd use libraries like nvidia-ml-py
             # or run a subprocess to check nvidia-smi
-            if os.system("nvidia-smi >nul 2>&1") == 0:  # Windows-specific check
+            if shutil.which("nvidia-smi") and subprocess.run(
+                ["nvidia-smi"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10
+            ).returncode == 0:
                 self.gpu_available = True
                 self.logger.info("NVIDIA GPU detected - optimizing for RTX 3060")
                 
@@ -957,6 +986,21 @@ class AIModeration(commands.Cog):
         except Exception as e:
             self.logger.error(f"Error detecting hardware: {e}")
             
+    def _degraded_result(self, request_id: str, message_content: str, response_format: str) -> tuple:
+        """Answer without the model (backend down or saturated): only the local pre-filter can flag."""
+        self.stats["degraded_responses"] = self.stats.get("degraded_responses", 0) + 1
+        if response_format == "json":
+            for pattern in self.prefilter_patterns:
+                if pattern.search(message_content):
+                    self.logger.info(f"[{request_id}] Flagged by pre-filter pattern {pattern.pattern!r} (degraded mode)")
+                    return True, 0.9, "Matched a blocked pattern (AI backend unavailable)"
+        return False, 0.0, ""
+
+    def _stage_failed(self, request_id: str, message_content: str, response_format: str, degrade: bool) -> tuple:
+        if not degrade:
+            raise BackendUnavailable("failed")
+        return self._degraded_result(request_id, message_content, response_format)
+
     def _determine_response_level(self, content: str, reason: str, confidence: float) -> dict:
         """Determine the appropriate response level based on content type and confidence.
         
@@ -1007,154 +1051,51 @@ class AIModeration(commands.Cog):
         
         return response
         
-    def _extract_json_from_response(self, content: str) -> str:
-        """Extract JSON from markdown-formatted responses.
-        
-        The AI model might wrap JSON in markdown code blocks or <think> tags.
-        This method extracts the actual JSON content from such responses and ensures
-        it has the required fields for moderation decisions.
-        
+    def _extract_verdict(self, content: str) -> dict:
+        """Moderation verdict from a raw model response.
+
+        The model might wrap its JSON in markdown code blocks, prose or a
+        <think> preamble, or stop mid-object; `jsonscan` finds it in one pass.
+        Responses without usable JSON fall back to picking out the fields.
+
         Args:
             content: The raw response from the AI service
-            
+
         Returns:
-            str: The extracted JSON string or a default JSON if extraction fails
+            dict: inappropriate, confidence and reason (defaults filled in)
         """
+        result = {"inappropriate": False, "confidence": 0.0, "reason": ""}
         if not content:
-            return '{"inappropriate": false, "confidence": 0.0, "reason": ""}'
-        
-        self.logger.debug(f"Extracting JSON from: {content[:200]}")
-        extraction_method = "unknown"
-        json_str = None
-        
-        # Try multiple extraction patterns in order of preference
-        
-        # Pattern 1: Standard JSON object first (fastest match)
-        try:
-            json_obj_match = re.search(r'\{\s*"inappropriate"\s*:\s*(true|false).*?\}', content, re.DOTALL)
-            if json_obj_match:
-                potential_json = json_obj_match.group(0)
-                # Validate if it's proper JSON
-                json.loads(potential_json)
-                json_str = potential_json
-                extraction_method = "standard_json"
-        except (json.JSONDecodeError, Exception):
-            pass
-            
-        # Pattern 2: Check for JSON in markdown code blocks
-        if not json_str:
-            md_pattern = r'```(?:json)?\s*({[\s\S]*?})\s*```'
-            md_match = re.search(md_pattern, content)
-            if md_match:
-                try:
-                    potential_json = md_match.group(1).strip()
-                    # Validate JSON
-                    json.loads(potential_json)
-                    json_str = potential_json
-                    extraction_method = "markdown"
-                except (json.JSONDecodeError, Exception):
-                    pass
-        
-        # Pattern 3: Check for content within <think> tags
-        if not json_str:
-            think_pattern = r'<think>\s*([\s\S]*?)\s*(?:</think>|$)'
-            think_match = re.search(think_pattern, content)
-            if think_match:
-                inner_content = think_match.group(1).strip()
-                # Look for JSON inside think tag
-                try:
-                    json_inside_think = re.search(r'({\s*"[^"]+"\s*:.*?})', inner_content)
-                    if json_inside_think:
-                        potential_json = json_inside_think.group(1).strip()
-                        # Validate JSON
-                        json.loads(potential_json)
-                        json_str = potential_json
-                        extraction_method = "think+json"
-                except (json.JSONDecodeError, Exception):
-                    pass
-        
-        # Pattern 4: Handle malformed responses with extra data after valid JSON
-        if not json_str:
-            try:
-                # Look for JSON-like patterns with key fields
-                json_like_pattern = r'\{[^}]*"inappropriate"\s*:\s*(true|false)[^}]*\}'
-                json_like_match = re.search(json_like_pattern, content)
-                if json_like_match:
-                    potential_json = json_like_match.group(0)
-                    # Clean up and validate
-                    potential_json = re.sub(r',\s*}', '}', potential_json)  # Fix trailing commas
-                    json.loads(potential_json)  # Validate
-                    json_str = potential_json
-                    extraction_method = "json_like_pattern"
-            except (json.JSONDecodeError, Exception):
-                pass
-                
-        # If we have extracted JSON at this point, parse and validate it
-        if json_str:
-            try:
-                result = json.loads(json_str)
-                # Ensure it has all required fields or add defaults
-                if "inappropriate" not in result:
-                    result["inappropriate"] = False
-                if "confidence" not in result:
-                    result["confidence"] = 0.0
-                if "reason" not in result:
-                    result["reason"] = ""
-                    
-                self.logger.debug(f"Successfully extracted JSON using {extraction_method}")
-                return json.dumps(result)
-            except json.JSONDecodeError:
-                self.logger.warning(f"Failed to validate JSON using {extraction_method}")
-        
-        # Fallback: Direct field extraction using regex for malformed responses
-        self.logger.warning("Using fallback field extraction for malformed response")
-        try:
-            inappropriate = False
-            confidence = 0.0
-            reason = ""
-            
-            # Extract fields with patterns
-            inappropriate_match = re.search(r'"?inappropriate"?\s*:\s*(true|false)', content, re.IGNORECASE)
-            if inappropriate_match:
-                inappropriate = inappropriate_match.group(1).lower() == 'true'
-                
-            confidence_match = re.search(r'"?confidence"?\s*:\s*([0-9.]+)', content)
-            if confidence_match:
-                confidence = min(float(confidence_match.group(1)), 1.0)  # Cap at 1.0
-                
-            reason_match = re.search(r'"?reason"?\s*:\s*"([^"]+)"', content)
-            if reason_match:
-                reason = reason_match.group(1)
-            else:
-                # Try alternative pattern without quotes
-                alt_reason_match = re.search(r'"?reason"?\s*:\s*([^,}\n]+)', content)
-                if alt_reason_match:
-                    reason = alt_reason_match.group(1).strip()
-            
-            # Alternatively, look for indicators of inappropriate content in the response
-            if not inappropriate_match and ("harmful" in content.lower() or 
-                                        "profanity" in content.lower() or
-                                        "offensive" in content.lower()):
-                inappropriate = True
-                if not reason:
-                    reason = "Content contains potentially harmful material"
-                if not confidence_match:
-                    confidence = 0.7  # Default confidence for detected harmful content
-            
-            fallback_result = {
-                "inappropriate": inappropriate,
-                "confidence": confidence,
-                "reason": reason
-            }
-            
-            self.logger.info(f"Fallback extraction: inappropriate={inappropriate}, confidence={confidence:.2f}, reason='{reason}'")
-            return json.dumps(fallback_result)
-            
-        except Exception as e:
-            # Last resort if even regex extraction fails
-            self.logger.error(f"All extraction methods failed: {e}")
-            return '{"inappropriate": false, "confidence": 0.0, "reason": ""}'
-        
+            return result
+
+        found = jsonscan.extract_object(content, keys=("inappropriate",))
+        if found is not None:
+            result.update(found)
+            return result
+
+        # Fallback: direct field extraction for malformed responses
+        self.logger.warning(f"No JSON verdict in model response, using field extraction: {content[:200]}")
+        inappropriate_match = re.search(r'"?inappropriate"?\s*:\s*(true|false)', content, re.IGNORECASE)
+        if inappropriate_match:
+            result["inappropriate"] = inappropriate_match.group(1).lower() == 'true'
+
+        confidence_match = re.search(r'"?confidence"?\s*:\s*([0-9]*\.?[0-9]+)', content)
+        if confidence_match:
+            result["confidence"] = min(float(confidence_match.group(1)), 1.0)
+
+        reason_match = re.search(r'"?reason"?\s*:\s*(?:"([^"]+)"|([^,}\n]+))', content)
+        if reason_match:
+            result["reason"] = (reason_match.group(1) or reason_match.group(2)).strip()
+
+        # Otherwise look for indicators of inappropriate content in the prose
+        lowered = content.lower()
+        if not inappropriate_match and any(w in lowered for w in ("harmful", "profanity", "offensive")):
+            result["inappropriate"] = True
+            result["reason"] = result["reason"] or "Content contains potentially harmful material"
+            if not confidence_match:
+                result["confidence"] = 0.7  # Default confidence for detected harmful content
+        return result
+
     async def check_connection_on_startup(self):
         """Check connection to the AI service during startup with retry logic."""
         self.logger.info(f"AI moderation initialized with model: {self.model}")
@@ -1296,9 +1237,49 @@ class AIModeration(commands.Cog):
         except Exception as e:
             self.logger.error(f"Failed to log moderation action: {e}")
             
+    async def stream_chat(self, system_prompt: str, user_prompt: str, temperature: float = 0.3,
+                          max_tokens: int = 512, priority: int = INTERACTIVE):
+        """Stream a chat completion as text deltas (OpenAI-compatible SSE).
+
+        Goes through the same breaker/limiter as analyze_message; the backend is judged by
+        time-to-first-token. Raises BackendUnavailable, or RuntimeError if the API rejects the request.
+        """
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        # No total timeout: generation may take a while, but tokens must keep arriving
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30)
+        rejected = None
+        started = time.perf_counter()
+        async with self.backend.slot(priority, self.backend.deadline_for(priority)) as call, \
+                aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.post(f"{self.api_url}{self.api_path}", json=payload) as response:
+                if response.status != 200:
+                    rejected = f"status {response.status}: {(await response.text())[:200]}"
+                    if response.status in [429, 500, 502, 503, 504]:
+                        call.mark_failure()
+                else:
+                    async for delta in iter_sse_deltas(response):
+                        if call.latency_ms is None:
+                            ttft = time.perf_counter() - started
+                            call.latency_ms = ttft * 1000
+                            AI_TTFT_SECONDS.observe(ttft)
+                            self.ttft_stats.record(ttft * 1000)
+                        yield delta
+        if rejected:
+            raise RuntimeError(f"Streaming request failed with {rejected}")
+
     async def analyze_message(self, message_content: str, guild_id: int = None, channel_id: int = None, 
                            message_id: int = None, author_id: int = None, debug_mode: bool = False,
-                           system_override: str = None, response_format: str = "json") -> tuple[bool, float, str]:
+                           system_override: str = None, response_format: str = "json",
+                           priority: int = INTERACTIVE) -> tuple[bool, float, str]:
         """Analyze a message using the AI model to determine if it's inappropriate.
         
         Args:
@@ -1321,10 +1302,57 @@ class AIModeration(commands.Cog):
         
         # Update stats
         self.stats["messages_analyzed"] += 1
-        
+
+        kwargs = dict(guild_id=guild_id, channel_id=channel_id, message_id=message_id, author_id=author_id,
+                      debug_mode=debug_mode, system_override=system_override, response_format=response_format,
+                      priority=priority)
+        # Only moderation verdicts are routed through the cascade
+        if self.small_endpoint is not None and response_format == "json" and not system_override:
+            result = await self._analyze_cascade(message_content, **kwargs)
+        else:
+            result = await self._analyze_on(self.endpoint, message_content, **kwargs)
+
+        # Update flagged count if inappropriate
+        if result[0]:
+            self.stats["messages_flagged"] += 1
+        return result
+
+    async def _analyze_cascade(self, message_content: str, **kwargs) -> tuple[bool, float, str]:
+        """Ask the small model first; escalate to the main model when it is unsure or unavailable."""
+        small = self.small_endpoint
+        try:
+            first = await self._analyze_on(small, message_content, degrade=False, **kwargs)
+        except BackendUnavailable as e:
+            CASCADE.inc("small_failed")
+            self.logger.debug(f"Small model unavailable ({e.reason}); using {self.endpoint.model}")
+            return await self._analyze_on(self.endpoint, message_content, **kwargs)
+
+        if not uncertain(first[1]):
+            CASCADE.inc("accepted")
+            return first
+
+        CASCADE.inc("escalated")
+        try:
+            second = await self._analyze_on(self.endpoint, message_content, degrade=False, **kwargs)
+        except BackendUnavailable as e:
+            # The small model's verdict beats a degraded answer
+            self.logger.debug(f"Main model unavailable ({e.reason}); keeping the small model's verdict")
+            return first
+        CASCADE_AGREEMENT.inc("agree" if bool(second[0]) == bool(first[0]) else "disagree")
+        return second
+
+    async def _analyze_on(self, endpoint: ModelEndpoint, message_content: str, guild_id: int = None,
+                          channel_id: int = None, message_id: int = None, author_id: int = None,
+                          debug_mode: bool = False, system_override: str = None, response_format: str = "json",
+                          priority: int = INTERACTIVE, degrade: bool = True) -> tuple[bool, float, str]:
+        """Run one analysis request against `endpoint` (see analyze_message).
+
+        With `degrade=False` failures raise BackendUnavailable instead of returning a degraded result,
+        so the cascade can fall through to the next model.
+        """
         # Set up request_id for tracking this specific request in logs
         request_id = f"req-{int(time.time() * 1000)}-{self.stats['messages_analyzed']}"
-        self.logger.info(f"[{request_id}] Analyzing message: {message_content[:50]}...")
+        self.logger.info(f"[{request_id}] Analyzing message with {endpoint.model}: {message_content[:50]}...")
             
         try:
             # Get server-specific settings if guild_id is provided
@@ -1385,9 +1413,9 @@ class AIModeration(commands.Cog):
             max_tokens = 50  # Just need a small response for moderation
             
             # Send request to the local API
-            full_url = f"{self.api_url}{self.api_path}"
+            full_url = endpoint.full_url
             payload = {
-                "model": self.model,
+                "model": endpoint.model,
                 "messages": prompt,
                 "temperature": temperature,  # Use server-specific temperature
                 "max_tokens": max_tokens
@@ -1403,41 +1431,51 @@ class AIModeration(commands.Cog):
                 payload["use_gpu"] = True
                 payload["batch_size"] = int(os.getenv("AI_BATCH_SIZE", "8"))  # Optimal for RTX 3060
             
+            # Scheduling class and deadline (see aibackend.py); retries share the same deadline
+            deadline = endpoint.backend.deadline_for(priority)
+
             # Measure inference time for monitoring
             start_time = time.time()
             data = None
             raw_response = None
             
             # Add retry logic for transient errors
-            max_retries = 2  # Maximum number of retries
+            # Maximum number of retries; a cascade stage falls through to the next model instead
+            max_retries = 2 if degrade else 0
             retry_count = 0
             retry_delay = 2  # Initial delay in seconds
             
+            backoff = 0
             while retry_count <= max_retries:
+                if backoff:
+                    await asyncio.sleep(backoff)  # Exponential backoff
+                    backoff = 0
                 # Create session with configurable timeout to prevent hanging
                 # Reduced from 15s to 10s to fail faster if needed for retries
                 timeout = aiohttp.ClientTimeout(total=10)  
                 
                 try:
-                    async with aiohttp.ClientSession(timeout=timeout) as session:
+                    async with endpoint.backend.slot(priority, deadline) as call, aiohttp.ClientSession(timeout=timeout) as session:
                         self.logger.debug(f"[{request_id}] Sending request to {full_url} (attempt {retry_count+1}/{max_retries+1})")
                         if debug_mode:
                             self.logger.debug(f"[{request_id}] Request payload: {json.dumps(payload)}")
                         
                         async with session.post(full_url, json=payload) as response:
                             if response.status != 200:
+                                if response.status in [429, 500, 502, 503, 504]:
+                                    call.mark_failure()
                                 response_text = await response.text()
                                 self.logger.error(f"[{request_id}] API request failed with status {response.status}: {response_text[:200]}")
                                 
                                 # Decide whether to retry based on status code
-                                if response.status in [429, 500, 502, 503, 504] and retry_count < max_retries:
+                                if response.status in [429, 500, 502, 503, 504] and retry_count < max_retries and endpoint.backend.healthy:
                                     retry_count += 1
                                     self.logger.warning(f"[{request_id}] Retrying after error {response.status} (attempt {retry_count}/{max_retries})")
-                                    await asyncio.sleep(retry_delay * retry_count)  # Exponential backoff
+                                    backoff = retry_delay * retry_count  # Slept outside the backend slot
                                     continue
                                 else:
                                     self.stats["connection_errors"] += 1
-                                    return False, 0.0, ""
+                                    return self._stage_failed(request_id, message_content, response_format, degrade)
                             
                             # Get raw response before parsing as JSON
                             raw_response = await response.text()
@@ -1446,25 +1484,32 @@ class AIModeration(commands.Cog):
                                 self.logger.debug(f"[{request_id}] Raw API response: {raw_response[:500]}")
                             
                             try:
-                                data = json.loads(raw_response)
+                                data = jsonscan.loads(raw_response)
                                 # Success - break out of retry loop
                                 break
-                            except json.JSONDecodeError as json_err:
+                            except jsonscan.DecodeError as json_err:
                                 self.logger.error(f"[{request_id}] Failed to parse JSON response: {json_err}")
                                 self.logger.error(f"[{request_id}] Raw response: {raw_response[:200]}")
                                 
                                 if retry_count < max_retries:
                                     retry_count += 1
                                     self.logger.warning(f"[{request_id}] Retrying after JSON parse error (attempt {retry_count}/{max_retries})")
-                                    await asyncio.sleep(retry_delay * retry_count)  # Exponential backoff
+                                    backoff = retry_delay * retry_count  # Slept outside the backend slot
                                     continue
                                 else:
                                     # Last attempt failed, but we have raw_response for fallback extraction
                                     break
                                     
+                except BackendUnavailable as e:
+                    if priority >= BACKGROUND or not degrade:
+                        # Background callers postpone their work instead of taking a degraded answer
+                        raise
+                    self.logger.debug(f"[{request_id}] Backend unavailable ({e.reason}); using degraded mode")
+                    return self._stage_failed(request_id, message_content, response_format, degrade)
+
                 except asyncio.TimeoutError:
                     self.logger.error(f"[{request_id}] Request timed out after {timeout.total} seconds")
-                    if retry_count < max_retries:
+                    if retry_count < max_retries and endpoint.backend.healthy:
                         retry_count += 1
                         self.logger.warning(f"[{request_id}] Retrying after timeout (attempt {retry_count}/{max_retries})")
                         # Reduce payload complexity for retries to help with timeouts
@@ -1477,19 +1522,22 @@ class AIModeration(commands.Cog):
                         continue
                     else:
                         self.stats["connection_errors"] += 1
-                        return False, 0.0, ""
+                        return self._stage_failed(request_id, message_content, response_format, degrade)
                         
                 except Exception as e:
                     self.logger.error(f"[{request_id}] Request error: {str(e)}")
-                    if retry_count < max_retries:
+                    if retry_count < max_retries and endpoint.backend.healthy:
                         retry_count += 1
                         self.logger.warning(f"[{request_id}] Retrying after error (attempt {retry_count}/{max_retries})")
                         await asyncio.sleep(retry_delay * retry_count)
                         continue
                     else:
                         self.stats["connection_errors"] += 1
-                        return False, 0.0, ""
+                        return self._stage_failed(request_id, message_content, response_format, degrade)
             
+            if not degrade and not (data and data.get("choices")):
+                raise BackendUnavailable("bad_response")
+
             # If all retries failed and we couldn't get a response
             if not data and not raw_response:
                 self.logger.error(f"[{request_id}] All retries failed")
@@ -1509,14 +1557,9 @@ class AIModeration(commands.Cog):
             # Track inference performance
             end_time = time.time()
             inference_time = (end_time - start_time) * 1000  # ms
-            
-            # Keep track of recent inference times (last 100)
-            self.inference_times.append(inference_time)
-            if len(self.inference_times) > 100:
-                self.inference_times.pop(0)
-            
-            # Update average inference time
-            self.stats["avg_inference_ms"] = sum(self.inference_times) / len(self.inference_times)
+            INFERENCE_SECONDS.observe(end_time - start_time)
+            endpoint.latency.record(inference_time)
+            self.stats["avg_inference_ms"] = self.inference_stats.ewma
             
             # Log occasional performance data
             if self.stats["messages_analyzed"] % 100 == 0:
@@ -1553,50 +1596,30 @@ class AIModeration(commands.Cog):
                     
                     self.logger.debug(f"[{request_id}] Returning text response format, length: {len(reason)}")
                 else:  # Default JSON processing
+                    result = self._extract_verdict(response_to_process)
+                    is_inappropriate = bool(result.get("inappropriate", False))
                     try:
-                        # Use our enhanced JSON extraction method with multiple fallback strategies
-                        cleaned_json = self._extract_json_from_response(response_to_process)
-                        self.logger.debug(f"[{request_id}] Processed content for parsing: {cleaned_json[:100]}...")
-                        
-                        # Parse the cleaned JSON
-                        result = json.loads(cleaned_json)
-                        
-                        # Extract values with safety checks and ensure all fields are present
-                        is_inappropriate = result.get("inappropriate", False)
-                        confidence = result.get("confidence", 0.0)
-                        reason = result.get("reason", "")
-                        
-                        self.logger.info(f"[{request_id}] Analysis result: inappropriate={is_inappropriate}, "
-                                      f"confidence={confidence:.2%}, reason='{reason}'")
-                                      
-                    except json.JSONDecodeError as e:
-                        # This is unlikely since _extract_json_from_response already handles JSON errors,
-                        # but adding as a safeguard
-                        self.logger.error(f"[{request_id}] Final JSON parse error after extraction: {e}")
-                        
-                        # Use smart content analysis as last resort
-                        is_inappropriate = any(word in response_to_process.lower() for word in 
-                                            ["inappropriate", "harmful", "offensive", "profanity", 
-                                             "hate speech", "violent"])
-                        confidence = 0.65  # Conservative confidence for fallback
-                        reason = "Content flagged by fallback detection system"
-                        
-                        self.logger.warning(f"[{request_id}] Using last resort fallback: inappropriate={is_inappropriate}, "
-                                        f"confidence={confidence:.2%}, reason='{reason}'")
+                        confidence = float(result.get("confidence", 0.0))
+                    except (TypeError, ValueError):
+                        confidence = 0.0
+                    reason = str(result.get("reason") or "")
+
+                    self.logger.info(f"[{request_id}] Analysis result: inappropriate={is_inappropriate}, "
+                                  f"confidence={confidence:.2%}, reason='{reason}'")
             else:
                 self.logger.error(f"[{request_id}] No processable content received from AI service")
             
             # Always cap confidence at 1.0
             confidence = min(confidence, 1.0)
             
-            # Update flagged count if inappropriate
-            if is_inappropriate:
-                self.stats["messages_flagged"] += 1
-            
             return is_inappropriate, confidence, reason
-                
+
+        except BackendUnavailable:
+            raise
         except Exception as e:
             self.logger.error(f"[{request_id}] Error analyzing message: {e}")
+            if not degrade:
+                raise BackendUnavailable("error") from e
             return False, 0.0, ""
     
     @commands.Cog.listener()
@@ -2034,6 +2057,7 @@ class AIModeration(commands.Cog):
             self.stats['cpu_cores'] = self.cpu_cores
             self.stats['gpu_available'] = self.gpu_available
             self.stats['model'] = self.model
+            self.stats['inference_latency'] = self.inference_stats.snapshot()
             
             # Calculate derived metrics
             if self.stats.get('messages_analyzed', 0) > 0:
@@ -2132,7 +2156,8 @@ class AIModeration(commands.Cog):
             guild_id=message.guild.id,
             channel_id=message.channel.id,
             message_id=message.id,
-            author_id=message.author.id
+            author_id=message.author.id,
+            priority=LIVE,
         )
         
         # Step 2: If not flagged, also check message patterns (for split content evasion)
@@ -2393,19 +2418,8 @@ class AIModeration(commands.Cog):
             return False
             
         try:
-            # First check if we need to create a new table for acknowledgments
+            # Table is created (partitioned by month) at startup; see housekeeping.py
             async with self.bot.pool.acquire() as conn:
-                # Ensure the table exists (idempotent)
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS ai_mod_acknowledgments (
-                        guild_id BIGINT NOT NULL,
-                        user_id BIGINT NOT NULL,
-                        response_type TEXT NOT NULL,
-                        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                        PRIMARY KEY (guild_id, user_id, created_at)
-                    )
-                """)
-                
                 # Record the acknowledgment
                 await conn.execute(
                     """INSERT INTO ai_mod_acknowledgments
@@ -2422,99 +2436,13 @@ class AIModeration(commands.Cog):
             return False
     
     async def _check_rate_limit(self, guild_id: int, user_id: int, severity: str) -> int:
-        """Check if user should be rate limited based on past violations.
-        
+        """Escalate the user's warning duration for a new violation (see escalation.py).
+
         Returns:
             int: Warning duration in seconds
         """
-        base_duration = 5  # Default warning duration
-        
-        if not self.bot.pool:
-            return base_duration
-            
-        try:
-            async with self.bot.pool.acquire() as conn:
-                # Get current rate limit info
-                row = await conn.fetchrow(
-                    "SELECT violation_count, current_limit_duration, expires_at FROM ai_mod_rate_limits WHERE guild_id = $1 AND user_id = $2",
-                    guild_id, user_id
-                )
-                
-                now = datetime.now(timezone.utc)
-                
-                if row:
-                    # User has previous violations
-                    # Ensure we're using integer types for all database parameters
-                    count = int(row["violation_count"])
-                    current_duration = int(row["current_limit_duration"])
-                    expires_at = row["expires_at"]
-                    
-                    if expires_at and expires_at > now:
-                        # User is currently rate limited
-                        # Increase the count and duration
-                        count += 1
-                        new_duration = min(current_duration * 2, 300)  # Max 5 minutes
-                        
-                        # Update the rate limit - explicitly cast to integers to avoid type conflicts
-                        await conn.execute(
-                            """
-                            UPDATE ai_mod_rate_limits 
-                            SET violation_count = $3::integer, 
-                                last_violation_at = NOW(), 
-                                current_limit_duration = $4::integer,
-                                expires_at = NOW() + ($4::integer * interval '1 second')
-                            WHERE guild_id = $1 AND user_id = $2
-                            """,
-                            guild_id, user_id, count, int(new_duration)
-                        )
-                        
-                        return int(new_duration)
-                    else:
-                        # Previous rate limit expired, but increment count
-                        count += 1
-                        new_duration = min(current_duration, 30)  # Start with minimal increase if it expired
-                        
-                        # Update the rate limit - explicitly cast to integers to avoid type conflicts
-                        await conn.execute(
-                            """
-                            UPDATE ai_mod_rate_limits 
-                            SET violation_count = $3::integer, 
-                                last_violation_at = NOW(), 
-                                current_limit_duration = $4::integer,
-                                expires_at = NOW() + ($4::integer * interval '1 second')
-                            WHERE guild_id = $1 AND user_id = $2
-                            """,
-                            guild_id, user_id, count, int(new_duration)
-                        )
-                        
-                        return int(new_duration)
-                else:
-                    # First violation for this user
-                    # Severity affects initial duration
-                    initial_duration = base_duration
-                    if severity == "high":
-                        initial_duration = 15
-                    elif severity == "med":
-                        initial_duration = 10
-                        
-                    # Create new rate limit entry - explicitly cast to integer
-                    await conn.execute(
-                        """
-                        INSERT INTO ai_mod_rate_limits
-                        (guild_id, user_id, violation_count, last_violation_at, current_limit_duration, expires_at)
-                        VALUES ($1, $2, 1, NOW(), $3::integer, NOW() + ($3::integer * interval '1 second'))
-                        """,
-                        guild_id, user_id, int(initial_duration)
-                    )
-                    
-                    return int(initial_duration)
-                    
-        except Exception as e:
-            self.logger.error(f"Error checking rate limit: {e}")
-            
-        return base_duration  # Default to base duration if anything fails
-            
-    
+        return await self.escalation.record(guild_id, user_id, severity)
+
     @app_commands.command(name="aimod", description="Configure AI moderation settings for this server")
     @app_commands.guild_only()
     @app_commands.default_permissions(manage_guild=True)
@@ -2884,7 +2812,8 @@ class AIModeration(commands.Cog):
                 is_inappropriate, confidence, reason = await self.analyze_message(
                     message_content=combined_content,
                     guild_id=guild_id,
-                    debug_mode=True
+                    debug_mode=True,
+                    priority=LIVE,
                 )
                 
                 if is_inappropriate:
@@ -3068,7 +2997,7 @@ class AIModeration(commands.Cog):
         
         # Get real-time hardware stats
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
+            cpu_percent = await asyncio.to_thread(psutil.cpu_percent, 1)
             mem = psutil.virtual_memory()
             mem_percent = mem.percent
             mem_used = mem.used / (1024 * 1024 * 1024)  # GB
@@ -3109,8 +3038,29 @@ class AIModeration(commands.Cog):
         embed.add_field(name="Messages Flagged", value=str(self.stats["messages_flagged"]), inline=True)
         
         # Performance metrics
-        embed.add_field(name="Average Inference Time", value=f"{self.stats['avg_inference_ms']:.2f}ms", inline=True)
+        embed.add_field(name="Average Inference Time", value=f"{self.inference_stats.ewma or 0.0:.2f}ms", inline=True)
+        embed.add_field(name="Inference p50 / p95 / p99 (5m)", value=latency.format_percentiles(self.inference_stats), inline=True)
         embed.add_field(name="Connection Errors", value=str(self.stats["connection_errors"]), inline=True)
+        limiter = self.backend.limiter
+        embed.add_field(
+            name="Backend",
+            value=f"Circuit: {self.backend.breaker.state} | Limit: {limiter.limit:.1f} | In flight: {limiter.in_flight} | Queued: {limiter.queued}",
+            inline=False
+        )
+        if self.small_endpoint is not None:
+            accepted, escalated = CASCADE.value("accepted"), CASCADE.value("escalated")
+            agree, disagree = CASCADE_AGREEMENT.value("agree"), CASCADE_AGREEMENT.value("disagree")
+            routed = accepted + escalated
+            embed.add_field(
+                name=f"Cascade ({self.small_endpoint.model})",
+                value=(
+                    f"Answered by small model: {accepted:.0f}/{routed:.0f} | Escalated: {escalated:.0f} | "
+                    f"Small unavailable: {CASCADE.value('small_failed'):.0f}\n"
+                    f"Agreement on escalations: {(agree / (agree + disagree) if agree + disagree else 0):.0%}\n"
+                    f"Small model p50 / p95 / p99 (5m): {latency.format_percentiles(self.small_endpoint.latency)}"
+                ),
+                inline=False
+            )
         last_check = self.stats["last_connection_check"]
         last_check_str = discord.utils.format_dt(last_check) if last_check else "Never"
         embed.add_field(name="Last Connection Check", value=last_check_str, inline=True)
@@ -3132,11 +3082,5 @@ class AIModeration(commands.Cog):
 
 
 async def setup(bot: commands.Bot):
-    # Ensure the database has the necessary column
-    if hasattr(bot, 'pool') and bot.pool:
-        async with bot.pool.acquire() as conn:
-            await conn.execute(
-                "ALTER TABLE general_server ADD COLUMN IF NOT EXISTS ai_moderation_enabled BOOLEAN NOT NULL DEFAULT TRUE"
-            )
-    
+    # general_server.ai_moderation_enabled is part of the baseline migration
     await bot.add_cog(AIModeration(bot))
\ No newline at end of file
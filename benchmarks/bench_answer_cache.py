@@ -0,0 +1,78 @@
+"""
+/ask answer cache benchmark and key check.
+
+Checks that questions differing only in a negation or question word ("Can I
+advertise here?" / "Can I not advertise here?", "When is the event?" /
+"Where is the event?") miss each other's cached answers while close
+paraphrases still hit, then times `AnswerCache.get` on a full guild cache.
+Exits non-zero when a check fails. Run from the repository root:
+
+    python benchmarks/bench_answer_cache.py --rounds 20000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiassistantcog import AnswerCache  # noqa: E402
+
+# (cached question, asked question)
+MUST_MISS = (
+    ("Can I advertise here?", "Can I not advertise here?"),
+    ("Can I advertise here?", "Why can't I advertise here?"),
+    ("When is the event?", "Where is the event?"),
+    ("Who can post in announcements?", "Why can I not post in announcements?"),
+    ("How do I get the verified role?", "What is the verified role?"),
+    ("Are bots allowed?", "Are bots not allowed?"),
+)
+MUST_HIT = (
+    ("Can I advertise here?", "can i advertise here"),
+    ("Where is the event?", "Where's the event?"),
+    ("How do I get the verified role?", "How do I get verified role?"),
+    ("Why can't I post links?", "Why can't I post links here?"),
+)
+
+
+def check() -> int:
+    failures = 0
+    for cached, asked, want_hit in [(c, a, False) for c, a in MUST_MISS] + [(c, a, True) for c, a in MUST_HIT]:
+        cache = AnswerCache(ttl=3600)
+        cache.put(1, cached, 0, f"answer to {cached}", [])
+        hit = cache.get(1, asked, 0) is not None
+        if hit != want_hit:
+            failures += 1
+            print(f"  FAIL {'miss' if want_hit else 'hit'}: cached {cached!r}, asked {asked!r}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and time the /ask answer cache")
+    parser.add_argument("--rounds", type=int, default=10000, help="Lookups to time")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    failures = check()
+    print(f"key checks: {len(MUST_MISS)} must miss, {len(MUST_HIT)} must hit, {failures} failures")
+
+    cache = AnswerCache(ttl=3600)
+    for i in range(cache.max_entries):
+        cache.put(1, f"What is rule number {i} about channel {i * 7}?", 0, "answer", [])
+    started = time.perf_counter()
+    for i in range(args.rounds):
+        cache.get(1, f"Where can I read rule {i}?", 0)
+    per_call_us = (time.perf_counter() - started) / args.rounds * 1e6
+    print(f"get() on {cache.max_entries} entries: {per_call_us:.2f} us/call")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps({"failures": failures, "entries": cache.max_entries,
+                                                    "per_call_us": round(per_call_us, 2)}, indent=2))
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
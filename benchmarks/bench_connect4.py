@@ -0,0 +1,95 @@
+"""
+Connect 4 engine benchmark.
+
+Measures how many positions per second the alpha-beta search evaluates on a
+fixed, seeded set of mid-game positions, plus raw win-check throughput.
+Run from the repository root:
+
+    python benchmarks/bench_connect4.py --depth 8 --positions 20
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import connect4  # noqa: E402
+
+
+def sample_positions(count: int, seed: int, min_plies: int = 4, max_plies: int = 16):
+    """Random non-terminal positions from seeded playouts."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        x = o = 0
+        player = 0
+        plies = rng.randint(min_plies, max_plies)
+        for _ in range(plies):
+            cols = [c for c in range(connect4.WIDTH) if connect4.can_play(x | o, c)]
+            x, o = connect4.drop(x, o, rng.choice(cols), player)
+            if connect4.has_four(x) or connect4.has_four(o):
+                break
+            player ^= 1
+        else:
+            positions.append((x, o, player))
+    return positions
+
+
+def bench_search(positions, depth: int, shared_tt: bool):
+    total_nodes = 0
+    started = time.perf_counter()
+    for x, o, player in positions:
+        if not shared_tt:
+            connect4._TT.clear()
+        _, stats = connect4.best_move(x, o, player, max_depth=depth, time_limit=None)
+        total_nodes += int(stats["nodes"])
+    elapsed = time.perf_counter() - started
+    return {
+        "positions": len(positions),
+        "depth": depth,
+        "shared_tt": shared_tt,
+        "nodes": total_nodes,
+        "seconds": round(elapsed, 4),
+        "nodes_per_sec": round(total_nodes / elapsed) if elapsed else 0,
+    }
+
+
+def bench_win_check(positions, rounds: int):
+    boards = [b for x, o, _ in positions for b in (x, o)]
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for bb in boards:
+            connect4.has_four(bb)
+    elapsed = time.perf_counter() - started
+    checks = rounds * len(boards)
+    return {"checks": checks, "seconds": round(elapsed, 4), "checks_per_sec": round(checks / elapsed) if elapsed else 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FrostMod Connect 4 engine benchmark")
+    parser.add_argument("--depth", type=int, default=8, help="Fixed search depth (no time limit)")
+    parser.add_argument("--positions", type=int, default=20, help="Number of sampled positions")
+    parser.add_argument("--seed", type=int, default=1234, help="Seed for position sampling")
+    parser.add_argument("--shared-tt", action="store_true", help="Keep the transposition table between positions")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    positions = sample_positions(args.positions, args.seed)
+    results = {
+        "search": bench_search(positions, args.depth, args.shared_tt),
+        "win_check": bench_win_check(positions, rounds=2000),
+    }
+    s, w = results["search"], results["win_check"]
+    print(f"search    depth={s['depth']} positions={s['positions']} nodes={s['nodes']} "
+          f"time={s['seconds']}s -> {s['nodes_per_sec']:,} positions/s")
+    print(f"win check {w['checks']:,} checks in {w['seconds']}s -> {w['checks_per_sec']:,} checks/s")
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
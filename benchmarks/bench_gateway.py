@@ -0,0 +1,400 @@
+"""
+End-to-end gateway event benchmark.
+
+Generates synthetic gateway events (messages, edits, deletes, voice state
+changes, member joins and poll votes) for a configurable number of guilds
+and users, and dispatches them to the real cogs the way discord.py does
+(each listener in its own task):
+
+    ActivityCog, UserProfiles, AIModeration, DeletedMessageLogger, PollsCog
+
+with the real write-behind buffer, rank cache and timer scheduler. Discord
+REST calls are stubbed (benchmarks/fakes.py), the model API is the
+in-process stub (benchmarks/stub_model.py) unless --model-url is given, and
+the database is an in-memory stand-in unless --postgres is given (uses the
+bot's DB_* settings and migrations; point it at a scratch database).
+
+Reports events per second, event-loop lag, DB queries and REST calls per
+event, and p50/p99 latency per event type and per handler. Results are
+written as JSON (--json) and can be compared with an earlier run
+(--compare). Run from the repository root:
+
+    python benchmarks/bench_gateway.py --guilds 20 --users 500 --events 20000 --rate 2000 --json after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fakes import (  # noqa: E402
+    FakeBot, FakeChannel, FakeGuild, FakeInteraction, FakeMessage, FakePool, FakeVoiceState,
+)
+from stub_model import StubModelServer, add_stub_arguments, stub_from_args  # noqa: E402
+
+EVENT_TYPES = ("message", "edit", "delete", "voice", "join", "vote")
+DEFAULT_MIX = "message=70,edit=8,delete=6,voice=8,join=3,vote=5"
+
+WORDS = ("hello", "anyone", "up", "for", "a", "game", "tonight", "the", "event", "starts", "soon", "gg", "nice",
+         "thanks", "where", "is", "rules", "channel", "lol", "what", "do", "you", "think", "about", "this")
+TOXIC = ("you idiot", "shut up loser", "what a moron")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in EVENT_TYPES:
+            raise SystemExit(f"Unknown event type {name!r} (choose from {', '.join(EVENT_TYPES)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+class World:
+    """Synthetic guilds, channels and members, plus the bot and its cogs."""
+
+    def __init__(self, bot: FakeBot, guilds: int, users: int, channels: int, rng: random.Random):
+        self.bot = bot
+        self.rng = rng
+        self.guilds: List[FakeGuild] = []
+        self.members = {}
+        self.voice = {}
+        self.logs = {}
+        self.recent: Dict[int, List[FakeMessage]] = {}
+        self.polls = {}
+        for g in range(guilds):
+            guild = FakeGuild(f"guild-{g}", channels=channels)
+            logs = FakeChannel(guild, "logs")
+            guild.channels.append(logs)
+            self.voice[guild.id] = [FakeChannel(guild, f"voice-{i}") for i in range(2)]
+            guild.channels.extend(self.voice[guild.id])
+            self.logs[guild.id] = logs
+            self.members[guild.id] = [guild.add_member(f"user-{g}-{u}") for u in range(users)]
+            self.recent[guild.id] = []
+            self.guilds.append(guild)
+            bot.guilds.append(guild)
+
+    def log_settings(self, guild_id: int) -> Optional[dict]:
+        """Row for the shared `log_settings` query: every log type on, pointing at the guild's logs channel."""
+        logs = self.logs.get(guild_id)
+        if logs is None:
+            return None
+        row = {"logs_channel_id": logs.id}
+        for key in ("message_delete", "message_edit", "bulk_delete", "channel_create", "channel_delete",
+                    "channel_update", "thread_create", "thread_delete", "thread_update", "voice_join",
+                    "voice_leave", "nickname_change", "role_change", "avatar_change", "member_join", "member_leave"):
+            row[f"log_{key}"] = True
+        return row
+
+    def text(self) -> str:
+        if self.rng.random() < 0.05:
+            return self.rng.choice(TOXIC)
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(2, 12)))
+
+    def event(self, kind: str):
+        """(event name, args) for one synthetic gateway event of `kind`."""
+        guild = self.rng.choice(self.guilds)
+        member = self.rng.choice(self.members[guild.id])
+        channel = self.rng.choice(guild.text_channels)
+        recent = self.recent[guild.id]
+        if kind in ("edit", "delete") and recent:
+            message = recent.pop(self.rng.randrange(len(recent))) if kind == "delete" else self.rng.choice(recent)
+            if kind == "delete":
+                return "message_delete", (message,)
+            after = FakeMessage(message.channel, message.author, message.content + " (edited)")
+            after.id = message.id
+            return "message_edit", (message, after)
+        if kind == "voice":
+            before = getattr(member, "voice", None) or FakeVoiceState(None)
+            target = None if before.channel is not None and self.rng.random() < 0.5 else self.rng.choice(self.voice[guild.id])
+            after = FakeVoiceState(target)
+            member.voice = after
+            return "voice_state_update", (member, before, after)
+        if kind == "join":
+            joined = guild.add_member(f"joiner-{len(guild.members)}")
+            return "member_join", (joined,)
+        if kind == "vote":
+            view = self.polls.get(guild.id)
+            if view is not None:
+                button = self.rng.choice([b for b in view.children if getattr(b, "idx", None) is not None])
+                return "poll_vote", (button, FakeInteraction(self.bot, channel, member))
+        message = FakeMessage(channel, member, self.text())
+        recent.append(message)
+        if len(recent) > 200:
+            del recent[0]
+        return "message", (message,)
+
+
+def responder_for(world: World):
+    import db
+
+    log_settings_sql = db.QUERIES["log_settings"]
+
+    def responder(kind, sql, args):
+        if kind == "fetchrow" and sql == log_settings_sql:
+            return world.log_settings(args[0])
+        return {"fetch": [], "execute": "OK"}.get(kind)
+
+    return responder
+
+
+async def load_cogs(bot) -> list:
+    from Activtycog import ActivityCog
+    from aimodcog import AIModeration
+    from deletedmescog import DeletedMessageLogger
+    from polls import PollsCog
+    from userprofilecog import UserProfiles
+
+    cogs = [ActivityCog(bot), UserProfiles(bot), AIModeration(bot), DeletedMessageLogger(bot), PollsCog(bot)]
+    for cog in cogs:
+        bot.cogs[cog.qualified_name] = cog
+    return cogs
+
+
+def listeners(cogs) -> Dict[str, list]:
+    table: Dict[str, list] = {}
+    for cog in cogs:
+        for name, method in cog.get_listeners():
+            table.setdefault(name.removeprefix("on_"), []).append((f"{cog.qualified_name}.{method.__name__}", method))
+    return table
+
+
+async def open_polls(world: World, cogs) -> None:
+    from polls import PollState, PollView
+
+    polls_cog = next(c for c in cogs if c.qualified_name == "PollsCog")
+    for guild in world.guilds:
+        message_id = FakeMessage(guild.text_channels[0], guild.me, "").id
+        state = PollState(question="Benchmark poll?", options=["Yes", "No", "Maybe"], votes={}, message_id=message_id)
+        view = PollView(state, message_id=message_id)
+        polls_cog.views[message_id] = view
+        world.polls[guild.id] = view
+
+
+async def run(args) -> dict:
+    import latency
+    from loopmonitor import LOOP_LAG, LoopMonitor
+    from metrics import DB_QUERY_SECONDS
+    from ranking import ActivityRanks
+    from scheduler import TimerScheduler
+    from writebehind import WriteBehind
+
+    rng = random.Random(args.seed)
+    stub = None
+    if not args.model_url:
+        stub = await StubModelServer(stub_from_args(args, prefix="stub-")).start()
+    os.environ["AI_API_URL"] = args.model_url or stub.url
+
+    if args.postgres:
+        import db
+        from dotenv import load_dotenv
+        from migrate import migrate
+
+        load_dotenv()
+        pool = await db.create_pool(user=os.getenv("DB_USER"), password=os.getenv("DB_PASSWORD"),
+                                    database=os.getenv("DB_NAME"), host=os.getenv("DB_HOST", "localhost"),
+                                    port=int(os.getenv("DB_PORT", "5432")))
+        async with pool.acquire() as conn:
+            await migrate(conn)
+        bot = FakeBot(pool)
+        bot.db = db.Database(pool)
+    else:
+        import db
+
+        bot = FakeBot(FakePool())
+        bot.db = db.Database(bot.pool)
+    world = World(bot, args.guilds, args.users, args.channels, rng)
+    if not args.postgres:
+        bot.pool.responder = responder_for(world)
+
+    bot.write_behind = WriteBehind(bot)
+    bot.activity_ranks = ActivityRanks(bot)
+    bot.scheduler = TimerScheduler(bot)
+    bot.write_behind.start()
+    cogs = await load_cogs(bot)
+    await open_polls(world, cogs)
+    table = listeners(cogs)
+
+    monitor = LoopMonitor()
+    monitor.start()
+    per_event = {kind: latency.LatencyStats(kind) for kind in table}
+    per_event["poll_vote"] = latency.LatencyStats("poll_vote")
+    per_handler: Dict[str, latency.LatencyStats] = {}
+    errors: Counter = Counter()
+    counts: Counter = Counter()
+
+    async def timed(name: str, coro) -> None:
+        started = time.perf_counter()
+        try:
+            await coro
+        except Exception as e:
+            errors[f"{name}: {type(e).__name__}"] += 1
+        stats = per_handler.get(name)
+        if stats is None:
+            stats = per_handler[name] = latency.LatencyStats(name)
+        stats.record((time.perf_counter() - started) * 1000)
+
+    async def dispatch(event: str, payload) -> None:
+        counts[event] += 1
+        started = time.perf_counter()
+        if event == "poll_vote":
+            button, interaction = payload
+            await timed("PollsCog.PollButton.callback", button.callback(interaction))
+        else:
+            # Like Client.dispatch: every listener runs as its own task
+            await asyncio.gather(*(timed(name, method(*payload)) for name, method in table.get(event, [])))
+        per_event[event].record((time.perf_counter() - started) * 1000)
+
+    mix = parse_mix(args.mix)
+    kinds, weights = list(mix), list(mix.values())
+    queries_before = bot.pool.total_queries if not args.postgres else DB_QUERY_SECONDS.total_count()
+    rest_before = sum(sum(g.rest.calls.values()) for g in world.guilds)
+    gate = asyncio.Semaphore(args.concurrency)
+    pending = set()
+
+    async def guarded(event, payload):
+        try:
+            await dispatch(event, payload)
+        finally:
+            gate.release()
+
+    started = time.perf_counter()
+    for i in range(args.events):
+        if args.rate:
+            # Open loop: events arrive on schedule whether or not handlers keep up
+            delay = started + i / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await gate.acquire()
+        event, payload = world.event(rng.choices(kinds, weights)[0])
+        task = asyncio.create_task(guarded(event, payload))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    await asyncio.gather(*pending)
+    elapsed = time.perf_counter() - started
+    flushed = await bot.write_behind.flush()
+
+    monitor.stop()
+    await bot.write_behind.stop()
+    await bot.scheduler.stop()
+    for cog in cogs:
+        unload = getattr(cog, "cog_unload", None)
+        if unload is not None and asyncio.iscoroutine(result := unload()):
+            await result
+    if stub is not None:
+        await stub.stop()
+    if args.postgres:
+        await bot.pool.close()
+
+    queries = (bot.pool.total_queries if not args.postgres else DB_QUERY_SECONDS.total_count()) - queries_before
+    rest = sum(sum(g.rest.calls.values()) for g in world.guilds) - rest_before
+    window = int(elapsed) + 60
+
+    def summary(stats: latency.LatencyStats) -> dict:
+        p = stats.percentiles(window)
+        return {"count": stats.count, "p50_ms": round(p.get("p50", 0.0), 3), "p99_ms": round(p.get("p99", 0.0), 3),
+                "max_ms": round(stats.max_ms, 3)}
+
+    lag = LOOP_LAG.percentiles(window)
+    return {
+        "revision": git_revision(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("json_path", "compare", "verbose")},
+        "events": args.events,
+        "seconds": round(elapsed, 3),
+        "events_per_sec": round(args.events / elapsed, 1) if elapsed else 0.0,
+        "event_counts": dict(counts),
+        "loop_lag_ms": {"p50": round(lag.get("p50", 0.0), 3), "p99": round(lag.get("p99", 0.0), 3),
+                        "max": round(LOOP_LAG.max_ms, 3)},
+        "db_queries": queries,
+        "db_queries_per_event": round(queries / args.events, 3) if args.events else 0.0,
+        "db_queries_by_label": dict(bot.pool.queries.most_common(15)) if not args.postgres else None,
+        "write_behind_final_flush": flushed,
+        "rest_calls": rest,
+        "rest_calls_per_event": round(rest / args.events, 3) if args.events else 0.0,
+        "per_event": {k: summary(v) for k, v in per_event.items() if v.count},
+        "per_handler": {k: summary(v) for k, v in sorted(per_handler.items())},
+        "handler_p99_ms": round(max((summary(v)["p99_ms"] for v in per_handler.values()), default=0.0), 3),
+        "errors": dict(errors),
+        "slow_callbacks": [{"where": s.where, "count": s.count, "max_ms": round(s.max_ms, 1)} for s in monitor.top_slow()],
+    }
+
+
+COMPARED = (("events_per_sec", True), ("handler_p99_ms", False), ("db_queries_per_event", False),
+            ("rest_calls_per_event", False))
+
+
+def compare(results: dict, baseline: dict) -> None:
+    print(f"vs {baseline.get('revision') or 'baseline'}:")
+    for key, higher_is_better in COMPARED:
+        old, new = baseline.get(key), results.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        better = change > 0 if higher_is_better else change < 0
+        print(f"  {key:<22} {old:>10} -> {new:>10} ({change:+.1%}{'' if not change else ', better' if better else ', worse'})")
+    for key in ("p99_ms",):
+        for event, stats in results["per_event"].items():
+            old = (baseline.get("per_event") or {}).get(event, {}).get(key)
+            if old:
+                print(f"  {event + ' ' + key:<22} {old:>10} -> {stats[key]:>10} ({(stats[key] - old) / old:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FrostMod gateway event benchmark")
+    parser.add_argument("--guilds", type=int, default=10, help="Number of guilds")
+    parser.add_argument("--users", type=int, default=200, help="Members per guild")
+    parser.add_argument("--channels", type=int, default=5, help="Text channels per guild")
+    parser.add_argument("--events", type=int, default=5000, help="Events to generate")
+    parser.add_argument("--rate", type=float, default=0.0, help="Target events per second (0 = as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=256, help="Maximum events being handled at once")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Event weights, default {DEFAULT_MIX}")
+    parser.add_argument("--seed", type=int, default=1234, help="Seed for the event generator")
+    parser.add_argument("--postgres", action="store_true", help="Use the database from DB_* settings instead of the in-memory stand-in")
+    parser.add_argument("--model-url", help="Model API base URL (default: in-process stub)")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show cog log output")
+    stub_options = parser.add_argument_group("bundled stub model (ignored with --model-url)")
+    add_stub_arguments(stub_options, prefix="stub-")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    os.environ.setdefault("AI_DEGRADED_MODE", "queue")
+    results = asyncio.run(run(args))
+
+    print(f"{results['events']} events in {results['seconds']}s -> {results['events_per_sec']} events/s")
+    print(f"loop lag  p50 {results['loop_lag_ms']['p50']}ms  p99 {results['loop_lag_ms']['p99']}ms  max {results['loop_lag_ms']['max']}ms")
+    print(f"db queries/event {results['db_queries_per_event']}  rest calls/event {results['rest_calls_per_event']}")
+    for event, s in results["per_event"].items():
+        print(f"  {event:<20} n={s['count']:<6} p50 {s['p50_ms']}ms  p99 {s['p99_ms']}ms")
+    print(f"handler p99 (worst) {results['handler_p99_ms']}ms")
+    if results["errors"]:
+        print(f"handler errors: {results['errors']}")
+    if args.compare:
+        compare(results, json.loads(Path(args.compare).read_text()))
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
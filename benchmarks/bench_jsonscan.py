@@ -0,0 +1,165 @@
+"""
+JSON extraction benchmark and fuzz check.
+
+Times `jsonscan.extract_object` against the regex cascade it replaced, over
+the model-output corpus in benchmarks/data/model_outputs.jsonl (one
+{"output": ..., "expect": {...} | null} per line), and checks that every
+expected verdict is found. With --fuzz it also mutates the corpus
+(truncation, stray braces and quotes, fences, long preambles) and checks
+that extraction never raises and never returns a non-dict, and that
+verdicts behind prose with an unbalanced `{` or `"` are still found. Run from the
+repository root:
+
+    python benchmarks/bench_jsonscan.py --rounds 2000 --fuzz 20000
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import jsonscan  # noqa: E402
+
+CORPUS = Path(__file__).resolve().parent / "data" / "model_outputs.jsonl"
+KEYS = ("inappropriate",)
+
+
+def legacy_extract(content: str):
+    """The regex cascade AIModeration used before jsonscan, including its parse/dump round trips."""
+    found = _legacy_search(content)
+    return json.loads(json.dumps(found)) if found is not None else None
+
+
+def _legacy_search(content: str):
+    for pattern, group in ((r'\{\s*"inappropriate"\s*:\s*(true|false).*?\}', 0),
+                           (r'```(?:json)?\s*({[\s\S]*?})\s*```', 1)):
+        m = re.search(pattern, content, re.DOTALL)
+        if m:
+            candidate = m.group(group).strip()
+            try:
+                json.loads(candidate)  # validated, then parsed again
+                return json.loads(candidate)
+            except ValueError:
+                pass
+    m = re.search(r'<think>\s*([\s\S]*?)\s*(?:</think>|$)', content)
+    if m:
+        inner = re.search(r'({\s*"[^"]+"\s*:.*?})', m.group(1).strip())
+        if inner:
+            try:
+                return json.loads(inner.group(1).strip())
+            except ValueError:
+                pass
+    m = re.search(r'\{[^}]*"inappropriate"\s*:\s*(true|false)[^}]*\}', content)
+    if m:
+        try:
+            return json.loads(re.sub(r',\s*}', '}', m.group(0)))
+        except ValueError:
+            pass
+    return None
+
+
+def load_corpus(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def matches(found, expect) -> bool:
+    if expect is None:
+        return found is None
+    return isinstance(found, dict) and all(found.get(k) == v for k, v in expect.items())
+
+
+def timed(extract, outputs, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in outputs:
+            extract(text)
+    return time.perf_counter() - started
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    choice = rng.randrange(6)
+    if choice == 0 and text:
+        return text[:rng.randrange(len(text))]
+    if choice == 1:
+        i = rng.randrange(len(text) + 1)
+        return text[:i] + rng.choice('{}"\\[],:') + text[i:]
+    if choice == 2:
+        return f"<think>\n{'Let me think about {this} carefully. ' * rng.randint(1, 200)}\n</think>\n{text}"
+    if choice == 3:
+        return f"```json\n{text}\n```"
+    if choice == 4:
+        return text.replace('"', "'", rng.randint(1, 3))
+    return "".join(rng.choice('{}" \\:,ab01') for _ in range(rng.randint(0, 200)))
+
+
+STRAY_PROSE = ("Note: { unbalanced. ", 'The message "{hey" is spam. ', "Careful with } and { here. ", 'He said "hi. ')
+
+
+def with_stray_prose(text: str, rng: random.Random) -> str:
+    """`text` after prose with an unbalanced brace or quote; the verdict must still be found."""
+    return rng.choice(STRAY_PROSE) + text
+
+
+def with_preamble(text: str) -> str:
+    """`text` after a ~4 KB reasoning preamble that mentions braces, like R1-style models produce."""
+    return f"<think>\n{'The user wrote {something}, so I need to decide. ' * 80}\n</think>\n{text}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON extraction from model responses")
+    parser.add_argument("--corpus", default=str(CORPUS), help="JSONL of model outputs")
+    parser.add_argument("--rounds", type=int, default=1000, help="Passes over the corpus per timing")
+    parser.add_argument("--fuzz", type=int, default=0, help="Mutated inputs to check (0 = skip)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for fuzzing")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    corpus = load_corpus(Path(args.corpus))
+    outputs = [row["output"] for row in corpus]
+    scan = lambda text: jsonscan.extract_object(text, KEYS)  # noqa: E731
+    results = {"corpus": len(corpus), "rounds": args.rounds, "orjson": jsonscan.orjson is not None}
+    for variant, texts in (("plain", outputs), ("think_preamble", [with_preamble(t) for t in outputs])):
+        for name, extract in (("jsonscan", scan), ("legacy_regex", legacy_extract)):
+            correct = sum(1 for text, row in zip(texts, corpus) if matches(extract(text), row["expect"]))
+            seconds = timed(extract, texts, args.rounds)
+            per_call_us = seconds / (args.rounds * len(texts)) * 1e6
+            results[f"{name}_{variant}"] = {"correct": correct, "seconds": round(seconds, 3),
+                                            "per_call_us": round(per_call_us, 2)}
+            print(f"{variant:<15} {name:<13} {correct}/{len(corpus)} correct  {per_call_us:8.2f} us/call")
+    for row in corpus:
+        if not matches(scan(row["output"]), row["expect"]):
+            print(f"  jsonscan missed: {row['output'][:80]!r}")
+
+    if args.fuzz:
+        rng = random.Random(args.seed)
+        failures = 0
+        for i in range(args.fuzz):
+            row = rng.choice(corpus)
+            # Every other input keeps the object intact behind stray prose and must still match
+            strict = i % 2 == 0 and row["expect"] is not None
+            text = with_stray_prose(row["output"], rng) if strict else mutate(row["output"], rng)
+            try:
+                found = scan(text)
+                if found is not None and not isinstance(found, dict):
+                    raise TypeError(type(found).__name__)
+                if strict and not matches(found, row["expect"]):
+                    raise AssertionError("verdict not found")
+            except Exception as e:
+                failures += 1
+                if failures <= 5:
+                    print(f"  fuzz failure {type(e).__name__}: {text[:80]!r}")
+        results["fuzz"] = {"inputs": args.fuzz, "failures": failures}
+        print(f"fuzz: {args.fuzz} inputs, {failures} failures")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
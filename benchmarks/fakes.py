@@ -0,0 +1,318 @@
+"""
+Minimal fakes of the Discord and database layers for offline benchmarks.
+
+Cogs only touch a small part of discord.py objects and asyncpg connections,
+so duck-typed stand-ins are enough to drive their listeners directly:
+
+- `FakePool` answers every query with no rows (or with a custom responder),
+  counting queries by the same labels `db.py` uses;
+- `FakeGuild`, `FakeChannel`, `FakeMember`, `FakeMessage`, `FakeVoiceState`
+  and `FakeInteraction` record the REST calls a handler makes (deletes,
+  sends, responses) instead of performing them;
+- `FakeBot` provides the attributes cogs read at construction time.
+"""
+
+import itertools
+import time
+from collections import Counter
+from typing import Any, Callable, List, Optional
+
+import db
+
+_ids = itertools.count(10**17)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+class FakeConnection:
+    def __init__(self, pool: "FakePool"):
+        self.pool = pool
+
+    def _run(self, kind: str, sql: str, args):
+        self.pool.queries[db.query_label(sql)] += 1
+        self.pool.total_queries += 1
+        if self.pool.responder is not None:
+            return self.pool.responder(kind, sql, args)
+        return {"fetch": [], "execute": "OK"}.get(kind)
+
+    async def fetch(self, sql: str, *args, **kwargs) -> List[Any]:
+        return self._run("fetch", sql, args) or []
+
+    async def fetchrow(self, sql: str, *args, **kwargs):
+        return self._run("fetchrow", sql, args)
+
+    async def fetchval(self, sql: str, *args, **kwargs):
+        return self._run("fetchval", sql, args)
+
+    async def execute(self, sql: str, *args, **kwargs) -> str:
+        return self._run("execute", sql, args) or "OK"
+
+    async def executemany(self, sql: str, args, **kwargs) -> None:
+        for a in args:
+            self._run("execute", sql, a)
+
+    def transaction(self):
+        return _NullContext(self)
+
+
+class _NullContext:
+    def __init__(self, value=None):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakePool:
+    """In-memory stand-in for an asyncpg pool: no rows, every query counted.
+
+    `responder(kind, sql, args)` can return canned results ("fetch" ->
+    list, "fetchrow" -> dict or None, ...).
+    """
+
+    def __init__(self, responder: Optional[Callable[[str, str, tuple], Any]] = None):
+        self.responder = responder
+        self.queries: Counter = Counter()
+        self.total_queries = 0
+
+    def acquire(self, *, timeout: Optional[float] = None):
+        return _NullContext(FakeConnection(self))
+
+    async def fetch(self, sql, *args):
+        return await FakeConnection(self).fetch(sql, *args)
+
+    async def fetchrow(self, sql, *args):
+        return await FakeConnection(self).fetchrow(sql, *args)
+
+    async def fetchval(self, sql, *args):
+        return await FakeConnection(self).fetchval(sql, *args)
+
+    async def execute(self, sql, *args):
+        return await FakeConnection(self).execute(sql, *args)
+
+    async def close(self):
+        pass
+
+
+class RestLog:
+    """REST calls handlers made, instead of sending them to Discord."""
+
+    def __init__(self):
+        self.calls: Counter = Counter()
+
+    def record(self, name: str) -> None:
+        self.calls[name] += 1
+
+
+class FakeRole:
+    def __init__(self, guild: "FakeGuild", name: str, position: int = 1):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.position = position
+        self.members: List["FakeMember"] = []
+
+    def is_default(self) -> bool:
+        return False
+
+    def is_bot_managed(self) -> bool:
+        return False
+
+
+class FakeMember:
+    def __init__(self, guild: "FakeGuild", name: str, bot: bool = False):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.display_name = name
+        self.global_name = name
+        self.discriminator = "0"
+        self.bot = bot
+        self.roles: List[FakeRole] = []
+        self.mention = f"<@{self.id}>"
+        self.avatar = None
+        self.display_avatar = None
+        self.created_at = guild.created_at
+        self.joined_at = guild.created_at
+
+    def __str__(self) -> str:
+        return self.name
+
+    async def send(self, *args, **kwargs):
+        self.guild.rest.record("member.send")
+
+
+class FakeChannel:
+    def __init__(self, guild: "FakeGuild", name: str):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.topic = None
+        self.category = None
+        self.mention = f"<#{self.id}>"
+
+    async def send(self, *args, **kwargs):
+        self.guild.rest.record("channel.send")
+        return FakeMessage(self, self.guild.me, "")
+
+    async def fetch_message(self, message_id: int):
+        self.guild.rest.record("channel.fetch_message")
+        raise LookupError(message_id)
+
+    def permissions_for(self, member):
+        return _AllPermissions()
+
+
+class _AllPermissions:
+    def __getattr__(self, name):
+        return True
+
+
+class FakeGuild:
+    def __init__(self, name: str = "bench", channels: int = 3):
+        from datetime import datetime, timezone
+
+        self.id = next_id()
+        self.name = name
+        self.created_at = datetime.now(timezone.utc)
+        self.rest = RestLog()
+        self.me = FakeMember(self, "FrostMod", bot=True)
+        self.text_channels = [FakeChannel(self, f"channel-{i}") for i in range(channels)]
+        self.channels = list(self.text_channels)
+        self.roles: List[FakeRole] = []
+        self.members: List[FakeMember] = [self.me]
+        self.rules_channel = None
+        self.member_count = 1
+
+    def get_channel(self, channel_id: int):
+        return next((c for c in self.channels if c.id == channel_id), None)
+
+    def get_member(self, user_id: int):
+        return next((m for m in self.members if m.id == user_id), None)
+
+    def audit_logs(self, *args, **kwargs):
+        self.rest.record("guild.audit_logs")
+        return _NoEntries()
+
+    def add_member(self, name: str) -> FakeMember:
+        member = FakeMember(self, name)
+        self.members.append(member)
+        self.member_count = len(self.members)
+        return member
+
+
+class FakeMessage:
+    def __init__(self, channel: FakeChannel, author: FakeMember, content: str):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.attachments = []
+        self.embeds = []
+        self.mentions = []
+        self.created_at = channel.guild.created_at
+        self.jump_url = f"https://discord.com/channels/{self.guild.id}/{channel.id}/{self.id}"
+
+    async def delete(self, *args, **kwargs):
+        self.guild.rest.record("message.delete")
+
+    async def add_reaction(self, *args, **kwargs):
+        self.guild.rest.record("message.add_reaction")
+
+
+class _NoEntries:
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+
+class FakeVoiceState:
+    def __init__(self, channel: Optional[FakeChannel] = None):
+        self.channel = channel
+        self.self_mute = self.self_deaf = self.mute = self.deaf = False
+        self.self_stream = self.self_video = False
+        self.afk = False
+
+
+class _FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self, name: str, *args, **kwargs):
+        self._done = True
+        self.interaction.guild.rest.record(f"interaction.{name}")
+
+    async def send_message(self, *args, **kwargs):
+        await self._respond("send_message")
+
+    async def defer(self, *args, **kwargs):
+        await self._respond("defer")
+
+    async def edit_message(self, *args, **kwargs):
+        await self._respond("edit_message")
+
+
+class FakeInteraction:
+    """Component/command interaction from `user` in `channel`."""
+
+    def __init__(self, client, channel: FakeChannel, user: FakeMember):
+        self.id = next_id()
+        self.client = client
+        self.channel = channel
+        self.channel_id = channel.id
+        self.guild = channel.guild
+        self.guild_id = channel.guild.id
+        self.user = user
+        self.response = _FakeResponse(self)
+
+
+class FakeLoop:
+    """Swallows tasks cogs schedule from __init__ (startup checks, warm-ups)."""
+
+    def create_task(self, coro, *args, **kwargs):
+        coro.close()
+        return None
+
+
+class FakeBot:
+    def __init__(self, pool: Optional[FakePool] = None):
+        self.pool = pool if pool is not None else FakePool()
+        self.db = None
+        self.loop = FakeLoop()
+        self.guilds: List[FakeGuild] = []
+        self.cogs = {}
+        self.started = time.monotonic()
+
+    def get_guild(self, guild_id: int):
+        return next((g for g in self.guilds if g.id == guild_id), None)
+
+    def get_channel(self, channel_id: int):
+        for g in self.guilds:
+            c = g.get_channel(channel_id)
+            if c is not None:
+                return c
+        return None
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+    def get_user(self, user_id: int):
+        return None
+
+    async def fetch_channel(self, channel_id: int):
+        raise LookupError(channel_id)
+
+    async def wait_until_ready(self):
+        return None
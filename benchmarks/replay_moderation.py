@@ -0,0 +1,225 @@
+"""
+Offline replay of a message corpus through the AI moderation pipeline.
+
+Each message is delivered to `AIModeration.on_message` exactly as a gateway
+event would be (settings lookup, pre-filter/degraded mode, breaker and
+limiter, model call, pattern check, violation recording), with Discord and
+the database replaced by the fakes in benchmarks/fakes.py. Reports messages
+per second, handler latency percentiles and, for labelled messages,
+agreement and false-positive rates. Live checks the backend sheds (rejected
+for anything but an open circuit) fail the run unless --allow-shed is given:
+a burst the model can keep up with must queue, not pass unmoderated.
+
+The corpus is JSONL, one message per line. Recognised fields:
+    content | message_content   message text (required)
+    label                        true = should be flagged, false = clean
+    is_false_positive            from ai_mod_violations exports (label = not it)
+    violation_id                 rows from ai_mod_violations count as flagged
+                                 unless an ai_mod_feedback row (--feedback)
+                                 has an accepted appeal for them
+Exports can be produced with psql, e.g.:
+    \\copy (SELECT row_to_json(v) FROM ai_mod_violations v) TO 'violations.jsonl'
+    \\copy (SELECT row_to_json(f) FROM ai_mod_feedback f) TO 'feedback.jsonl'
+
+By default a deterministic stub model (benchmarks/stub_model.py) is started
+in-process; pass --model-url to replay against a real backend. The stub's
+latency, error injection and batching options are available as --stub-*,
+so breaker and limiter behaviour can be stress-tested too. Run from the
+repository root:
+
+    python benchmarks/replay_moderation.py corpus.jsonl --concurrency 8 --json results.json
+    python benchmarks/replay_moderation.py corpus.jsonl --stub-latency lognormal:300,0.6 --stub-error-503 0.05 --stub-max-batch 4
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fakes import FakeBot, FakeGuild, FakeMessage, FakePool  # noqa: E402
+from stub_model import StubModelServer, add_stub_arguments, stub_from_args  # noqa: E402
+
+# Index of the corpus message the current handler task is processing
+_current = contextvars.ContextVar("replay_message", default=None)
+
+
+def _label(row: dict, appeals_accepted: set) -> Optional[bool]:
+    if isinstance(row.get("label"), bool):
+        return row["label"]
+    if row.get("is_false_positive") is not None:
+        return not row["is_false_positive"]
+    if row.get("violation_id") is not None:
+        return row["violation_id"] not in appeals_accepted
+    return None
+
+
+def load_corpus(path: str, feedback_path: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+    appeals_accepted = set()
+    if feedback_path:
+        with open(feedback_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    fb = json.loads(line)
+                    if fb.get("feedback_type") == "appeal" and fb.get("review_status") == "accepted":
+                        appeals_accepted.add(fb.get("violation_id"))
+    corpus = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            content = row.get("content") or row.get("message_content")
+            if not content:
+                continue
+            corpus.append({"content": content, "label": _label(row, appeals_accepted)})
+            if limit and len(corpus) >= limit:
+                break
+    return corpus
+
+
+def _flagging_pool() -> FakePool:
+    """Fake DB that remembers which corpus messages produced a violation row."""
+    flagged = set()
+
+    def responder(kind, sql, args):
+        if kind == "execute" and "INSERT INTO ai_mod_violations" in sql and _current.get() is not None:
+            flagged.add(_current.get())
+        return {"fetch": [], "execute": "OK"}.get(kind)
+
+    pool = FakePool(responder)
+    pool.flagged = flagged
+    return pool
+
+
+async def replay(corpus: List[dict], model_url: str, model: str, concurrency: int, users: int) -> Dict:
+    import latency
+    from aibackend import LIVE, PRIORITY_NAMES, REJECTED
+    from aimodcog import AIModeration
+
+    os.environ["AI_API_URL"] = model_url
+    os.environ["Local_model"] = model
+    bot = FakeBot(_flagging_pool())
+    guild = FakeGuild("replay")
+    bot.guilds.append(guild)
+    members = [guild.add_member(f"user{i}") for i in range(max(1, users))]
+    cog = AIModeration(bot)
+    bot.cogs["AIModeration"] = cog
+
+    handler = latency.LatencyStats("replay_handler")
+    gate = asyncio.Semaphore(concurrency)
+
+    async def deliver(i: int, item: dict) -> None:
+        message = FakeMessage(guild.text_channels[i % len(guild.text_channels)], members[i % len(members)], item["content"])
+        async with gate:
+            _current.set(i)
+            started = time.perf_counter()
+            await cog.on_message(message)
+            handler.record((time.perf_counter() - started) * 1000)
+
+    shed_reasons = ("saturated", "queue_full", "deadline", "expired")
+    live = PRIORITY_NAMES[LIVE]
+    shed_before = sum(REJECTED.value(live, r) for r in shed_reasons)
+    started = time.perf_counter()
+    await asyncio.gather(*(deliver(i, item) for i, item in enumerate(corpus)))
+    elapsed = time.perf_counter() - started
+    results = [i in bot.pool.flagged for i in range(len(corpus))]
+
+    labelled = [(r, item["label"]) for r, item in zip(results, corpus) if item["label"] is not None]
+    tp = sum(1 for r, l in labelled if r and l)
+    fp = sum(1 for r, l in labelled if r and not l)
+    fn = sum(1 for r, l in labelled if not r and l)
+    tn = sum(1 for r, l in labelled if not r and not l)
+    window = int(elapsed) + 60
+    return {
+        "messages": len(corpus),
+        "concurrency": concurrency,
+        "model_url": model_url,
+        "seconds": round(elapsed, 3),
+        "messages_per_sec": round(len(corpus) / elapsed, 1) if elapsed else 0.0,
+        "handler_ms": {k: round(v, 2) for k, v in handler.percentiles(window).items()},
+        "inference_ms": {k: round(v, 2) for k, v in cog.inference_stats.percentiles(window).items()},
+        "flagged": sum(1 for r in results if r),
+        "degraded": cog.stats.get("degraded_responses", 0),
+        "shed": int(sum(REJECTED.value(live, r) for r in shed_reasons) - shed_before),
+        "connection_errors": cog.stats.get("connection_errors", 0),
+        "db_queries": bot.pool.total_queries,
+        "rest_calls": dict(guild.rest.calls),
+        "labelled": len(labelled),
+        "agreement": round((tp + tn) / len(labelled), 4) if labelled else None,
+        "false_positive_rate": round(fp / (fp + tn), 4) if fp + tn else None,
+        "false_negative_rate": round(fn / (fn + tp), 4) if fn + tp else None,
+        "confusion": {"tp": tp, "fp": fp, "fn": fn, "tn": tn},
+    }
+
+
+async def run(args) -> Dict:
+    corpus = load_corpus(args.corpus, args.feedback, args.limit)
+    if not corpus:
+        raise SystemExit(f"No messages in {args.corpus}")
+    stub = None
+    model_url = args.model_url
+    if not model_url:
+        stub = await StubModelServer(stub_from_args(args, prefix="stub-")).start()
+        model_url = stub.url
+    try:
+        results = await replay(corpus, model_url, args.model, args.concurrency, args.users)
+        if stub is not None:
+            results["stub"] = dict(stub.model.stats)
+        return results
+    finally:
+        if stub is not None:
+            await stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a message corpus through FrostMod's AI moderation")
+    parser.add_argument("corpus", help="JSONL file of messages")
+    parser.add_argument("--feedback", help="JSONL export of ai_mod_feedback (accepted appeals become negatives)")
+    parser.add_argument("--model-url", help="Model API base URL (default: in-process deterministic stub)")
+    parser.add_argument("--model", default=os.getenv("Local_model", "stub"), help="Model name sent to the API")
+    parser.add_argument("--concurrency", type=int, default=8, help="Messages handled at once")
+    parser.add_argument("--degraded-mode", choices=("queue", "prefilter"), default=os.getenv("AI_DEGRADED_MODE", "queue"),
+                        help="AI_DEGRADED_MODE for the run (only matters while the circuit is open)")
+    parser.add_argument("--allow-shed", action="store_true",
+                        help="Do not fail when live checks are shed (e.g. against a real backend that is too slow)")
+    parser.add_argument("--users", type=int, default=50, help="Distinct authors the messages are spread over")
+    parser.add_argument("--limit", type=int, help="Replay at most this many messages")
+    parser.add_argument("--json", dest="json_path", help="Also write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the cog's log output")
+    stub_options = parser.add_argument_group("bundled stub model (ignored with --model-url)")
+    add_stub_arguments(stub_options, prefix="stub-")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    # Read by aibackend at import time
+    os.environ["AI_DEGRADED_MODE"] = args.degraded_mode
+    results = asyncio.run(run(args))
+    print(f"{results['messages']} messages in {results['seconds']}s -> {results['messages_per_sec']} msg/s "
+          f"(concurrency {results['concurrency']})")
+    print(f"handler   {results['handler_ms']}")
+    print(f"inference {results['inference_ms']}")
+    print(f"flagged {results['flagged']}, degraded {results['degraded']}, shed {results['shed']}, "
+          f"errors {results['connection_errors']}, db queries {results['db_queries']}")
+    if results["labelled"]:
+        print(f"labelled {results['labelled']}: agreement {results['agreement']:.2%}, "
+              f"false positives {results['false_positive_rate'] or 0:.2%}, "
+              f"false negatives {results['false_negative_rate'] or 0:.2%}")
+    if "stub" in results:
+        print(f"stub {results['stub']}")
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+    if results["shed"] and not args.allow_shed:
+        raise SystemExit(f"FAIL: {results['shed']} live moderation check(s) shed instead of queued")
+
+
+if __name__ == "__main__":
+    main()
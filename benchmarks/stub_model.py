@@ -0,0 +1,256 @@
+"""
+Local stand-in for the OpenAI-compatible `/v1/chat/completions` API.
+
+Moderation requests (`response_format: json_object`) get a verdict from a
+fixed word list, with a confidence derived from a hash of the message, so a
+replay gives the same answers on every run. Other requests get a short
+canned text answer, streamed as SSE chunks when `stream: true`.
+
+For load testing, the stub can also imitate a real inference server:
+- latency distributions: "fixed:20", "uniform:10-50", "normal:100,20",
+  "lognormal:80,0.5" (median ms, sigma);
+- error injection: a fraction of requests answer 429 (with Retry-After),
+  500/503, or hang past the client's timeout;
+- a batch-aware cost model: at most --max-batch requests run at once (the
+  rest queue), each generated token costs --token-ms, and every extra
+  request in the running batch slows the batch by --batch-penalty;
+- streaming: the first chunk arrives after the sampled latency, then one
+  chunk per token.
+
+GET /stats returns request, error and batch counters. Run it standalone:
+
+    python benchmarks/stub_model.py --port 5055 --latency lognormal:80,0.5 --error-503 0.02
+    AI_API_URL=http://127.0.0.1:5055 ...
+
+or start it in-process with `StubModelServer` (see replay_moderation.py).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from aiohttp import web
+
+DEFAULT_BLOCKLIST = ("idiot", "stupid", "hate you", "kill yourself", "kys", "moron", "loser", "shut up")
+ERROR_KINDS = ("429", "500", "503", "timeout")
+
+
+def _unit(text: str) -> float:
+    """Stable pseudo-random number in [0, 1) for `text`."""
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big") / 2**64
+
+
+class LatencyModel:
+    """Samples a base latency in milliseconds from a distribution spec like "lognormal:80,0.5"."""
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, _, params = spec.partition(":")
+        self.spec = spec
+        self.kind = kind.strip().lower()
+        values = [float(v) for v in re.split(r"[,-]", params) if v.strip()] if params else []
+        if self.kind == "fixed":
+            self.params = (values or [0.0])[:1]
+        elif self.kind in ("uniform", "normal", "lognormal") and len(values) == 2:
+            self.params = values
+        else:
+            raise ValueError(f"Unknown latency spec {spec!r} (fixed:MS, uniform:LO-HI, normal:MEAN,SD, lognormal:MEDIAN,SIGMA)")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        a, b = self.params
+        if self.kind == "uniform":
+            return rng.uniform(a, b)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(a, b))
+        return a * math.exp(rng.gauss(0.0, b))
+
+
+class StubModel:
+    def __init__(self, blocklist: Iterable[str] = DEFAULT_BLOCKLIST, latency_ms: float = 0.0,
+                 latency: Optional[str] = None, errors: Optional[Dict[str, float]] = None,
+                 hang_seconds: float = 30.0, max_batch: int = 0, batch_penalty: float = 0.0,
+                 token_ms: float = 0.0, seed: int = 0):
+        self.patterns = [re.compile(rf"\b{re.escape(w)}\b", re.IGNORECASE) for w in blocklist]
+        self.latency = LatencyModel(latency or f"fixed:{latency_ms}")
+        self.errors = {k: v for k, v in (errors or {}).items() if v > 0}
+        unknown = set(self.errors) - set(ERROR_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown error kinds: {', '.join(sorted(unknown))}")
+        self.hang_seconds = hang_seconds
+        self.batch_penalty = batch_penalty
+        self.token_ms = token_ms
+        self.rng = random.Random(seed)
+        self._slots = asyncio.Semaphore(max_batch) if max_batch > 0 else None
+        self.running = 0
+        self.stats: Counter = Counter()
+
+    def verdict(self, text: str) -> dict:
+        hits = [p.pattern for p in self.patterns if p.search(text)]
+        if hits:
+            return {"inappropriate": True, "confidence": round(0.8 + 0.19 * _unit(text), 3),
+                    "reason": "Harassment or insulting language"}
+        return {"inappropriate": False, "confidence": round(0.05 + 0.15 * _unit(text), 3), "reason": ""}
+
+    def complete(self, payload: dict) -> str:
+        messages = payload.get("messages") or []
+        text = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        if (payload.get("response_format") or {}).get("type") == "json_object":
+            return json.dumps(self.verdict(text))
+        return f"(stub answer) {text[:200]}"
+
+    def _pick_error(self) -> Optional[str]:
+        roll = self.rng.random()
+        for kind, rate in self.errors.items():
+            if roll < rate:
+                return kind
+            roll -= rate
+        return None
+
+    def _cost_seconds(self, tokens: int) -> float:
+        """Sampled base latency plus per-token cost, slowed by the size of the running batch."""
+        slowdown = 1 + self.batch_penalty * max(0, self.running - 1)
+        return (self.latency.sample(self.rng) + self.token_ms * tokens) * slowdown / 1000
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        self.stats["requests"] += 1
+        payload = await request.json()
+        error = self._pick_error()
+        if error == "429":
+            self.stats["error_429"] += 1
+            return web.json_response({"error": {"message": "rate limited"}}, status=429, headers={"Retry-After": "1"})
+        if error in ("500", "503"):
+            self.stats[f"error_{error}"] += 1
+            return web.json_response({"error": {"message": "injected failure"}}, status=int(error))
+        if error == "timeout":
+            self.stats["error_timeout"] += 1
+            await asyncio.sleep(self.hang_seconds)
+            return web.json_response({"error": {"message": "timed out"}}, status=504)
+
+        if self._slots is not None:
+            if self._slots.locked():
+                self.stats["queued"] += 1
+            await self._slots.acquire()
+        self.running += 1
+        self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], self.running)
+        try:
+            content = self.complete(payload)
+            tokens = content.split(" ")
+            if payload.get("stream"):
+                return await self._stream(request, payload, tokens)
+            await asyncio.sleep(self._cost_seconds(len(tokens)))
+            return web.json_response({
+                "id": f"stub-{self.stats['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in payload.get("messages") or []),
+                          "completion_tokens": len(tokens)},
+            })
+        finally:
+            self.running -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    async def _stream(self, request: web.Request, payload: dict, tokens) -> web.StreamResponse:
+        self.stats["streams"] += 1
+        # Time to first token is the sampled latency; every later chunk costs token_ms (batch-scaled)
+        first = self._cost_seconds(0)
+        per_token = self.token_ms * (1 + self.batch_penalty * max(0, self.running - 1)) / 1000
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        await asyncio.sleep(first)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(per_token)
+            chunk = {"choices": [{"index": 0, "delta": {"content": token if i == 0 else f" {token}"}, "finish_reason": None}],
+                     "model": payload.get("model", "stub")}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats, running=self.running))
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.handle)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+
+class StubModelServer:
+    """Run a StubModel on localhost inside the current event loop."""
+
+    def __init__(self, model: Optional[StubModel] = None, host: str = "127.0.0.1", port: int = 0):
+        self.model = model or StubModel()
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "StubModelServer":
+        self._runner = web.AppRunner(self.model.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self.port == 0:
+            self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser, prefix: str = "") -> None:
+    """Register the stub's behaviour options (shared by the load harnesses)."""
+    p = f"--{prefix}"
+    parser.add_argument(f"{p}latency", default="fixed:20", help="Latency distribution, e.g. lognormal:80,0.5")
+    for kind in ERROR_KINDS:
+        parser.add_argument(f"{p}error-{kind}", type=float, default=0.0, help=f"Fraction of requests answered with {kind}")
+    parser.add_argument(f"{p}hang-seconds", type=float, default=30.0, help="How long injected timeouts hang")
+    parser.add_argument(f"{p}max-batch", type=int, default=0, help="Requests processed at once (0 = unlimited)")
+    parser.add_argument(f"{p}batch-penalty", type=float, default=0.0, help="Slowdown per extra request in the batch")
+    parser.add_argument(f"{p}token-ms", type=float, default=0.0, help="Cost of each generated token")
+    parser.add_argument(f"{p}seed", type=int, default=0, help="Seed for latency and error sampling")
+
+
+def stub_from_args(args: argparse.Namespace, prefix: str = "") -> StubModel:
+    p = prefix.replace("-", "_")
+    get = lambda name: getattr(args, f"{p}{name}")  # noqa: E731
+    return StubModel(
+        latency=get("latency"),
+        errors={kind: get(f"error_{kind}") for kind in ERROR_KINDS},
+        hang_seconds=get("hang_seconds"),
+        max_batch=get("max_batch"),
+        batch_penalty=get("batch_penalty"),
+        token_ms=get("token_ms"),
+        seed=get("seed"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub for the FrostMod model API (OpenAI-compatible)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(stub_from_args(args).app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
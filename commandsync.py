@@ -0,0 +1,77 @@
+"""
+App-command sync that only talks to Discord when the command tree changed.
+
+`tree.sync()` is heavily rate limited and was called on every start (once
+globally, once for the developer guild). The tree is now serialized into a
+stable SHA-256 fingerprint per scope and compared with the fingerprint stored
+in `command_sync_state` after the last successful sync; unchanged scopes are
+skipped. Set `FORCE_COMMAND_SYNC=1` to sync regardless.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+from typing import List, Optional
+
+import discord
+
+log = logging.getLogger("frostmod")
+
+# discord.py 2.4 added the tree argument (for translations); 2.3 serializes commands without it
+_TO_DICT_TAKES_TREE = "tree" in inspect.signature(discord.app_commands.Command.to_dict).parameters
+
+
+def force_sync_requested() -> bool:
+    return os.getenv("FORCE_COMMAND_SYNC", "0") == "1"
+
+
+def tree_fingerprint(bot, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Hash of the command payloads `tree.sync()` would send for this scope."""
+    commands = bot.tree.get_commands(guild=guild)
+    payload = [cmd.to_dict(bot.tree) if _TO_DICT_TAKES_TREE else cmd.to_dict() for cmd in commands]
+    payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+    blob = json.dumps({"application_id": bot.application_id, "commands": payload}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+async def _stored_fingerprint(pool, scope: str) -> Optional[str]:
+    async with pool.acquire() as conn:
+        return await conn.fetchval("SELECT fingerprint FROM command_sync_state WHERE scope = $1", scope)
+
+
+async def _store_fingerprint(pool, scope: str, fingerprint: str) -> None:
+    async with pool.acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO command_sync_state (scope, fingerprint, synced_at)
+            VALUES ($1, $2, NOW())
+            ON CONFLICT (scope) DO UPDATE SET fingerprint = EXCLUDED.fingerprint, synced_at = NOW()
+            """,
+            scope,
+            fingerprint,
+        )
+
+
+async def sync_if_changed(bot, guild: Optional[discord.abc.Snowflake] = None, force: bool = False) -> Optional[List[discord.app_commands.AppCommand]]:
+    """Sync one scope (global, or a guild) if its fingerprint changed; returns None when skipped."""
+    scope = "global" if guild is None else f"guild:{guild.id}"
+    fingerprint = tree_fingerprint(bot, guild)
+    pool = getattr(bot, "pool", None)
+    if not force and pool is not None:
+        try:
+            if await _stored_fingerprint(pool, scope) == fingerprint:
+                return None
+        except Exception as e:
+            log.warning(f"[SYNC] Could not read stored fingerprint for {scope}: {e}")
+
+    synced = await bot.tree.sync(guild=guild)
+    if pool is not None:
+        try:
+            await _store_fingerprint(pool, scope, fingerprint)
+        except Exception as e:
+            log.warning(f"[SYNC] Could not store fingerprint for {scope}: {e}")
+    return synced
@@ -0,0 +1,267 @@
+"""
+Bitboard Connect 4 engine.
+
+Each side is one integer bitboard. Columns are 7 bits tall (6 playable cells
+plus a sentinel bit) and laid out bottom-to-top, so column c occupies bits
+c*7 .. c*7+5. With this layout a four-in-a-row is detected with a handful of
+shifts and ANDs, no matter how full the board is, and a whole position fits
+in two BIGINT columns.
+
+The search is a depth-limited negamax with alpha-beta pruning, a
+transposition table, centre-first move ordering and iterative deepening under
+a time budget. It is pure CPU work, so the bot runs it through
+`search_async`, which hands it to a worker process instead of the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+WIDTH = 7
+HEIGHT = 6
+H1 = HEIGHT + 1
+SIZE = WIDTH * HEIGHT
+
+BOTTOM_MASK = sum(1 << (c * H1) for c in range(WIDTH))
+BOARD_MASK = BOTTOM_MASK * ((1 << HEIGHT) - 1)
+# Centre columns take part in the most lines, so search them first
+MOVE_ORDER = (3, 2, 4, 1, 5, 0, 6)
+
+WIN_SCORE = 1000
+DEFAULT_MAX_DEPTH = 12
+DEFAULT_TIME_LIMIT = 1.5
+TT_MAX_ENTRIES = 1_000_000
+
+
+def column_mask(col: int) -> int:
+    return ((1 << HEIGHT) - 1) << (col * H1)
+
+
+def top_mask(col: int) -> int:
+    return 1 << (HEIGHT - 1 + col * H1)
+
+
+def bottom_mask(col: int) -> int:
+    return 1 << (col * H1)
+
+
+def has_four(bb: int) -> bool:
+    """True if the bitboard contains four in a row in any direction."""
+    for shift in (1, H1, H1 - 1, H1 + 1):  # vertical, horizontal, both diagonals
+        m = bb & (bb >> shift)
+        if m & (m >> (2 * shift)):
+            return True
+    return False
+
+
+def can_play(mask: int, col: int) -> bool:
+    return 0 <= col < WIDTH and not (mask & top_mask(col))
+
+
+def drop(x: int, o: int, col: int, player: int) -> Tuple[int, int]:
+    """Drop a piece for `player` (0 = X, 1 = O); raises ValueError if the column is full."""
+    mask = x | o
+    if not can_play(mask, col):
+        raise ValueError("column full")
+    move = (mask + bottom_mask(col)) & column_mask(col)
+    if player == 0:
+        return x | move, o
+    return x, o | move
+
+
+def is_full(x: int, o: int) -> bool:
+    return (x | o) == BOARD_MASK
+
+
+def to_grid(x: int, o: int) -> List[List[str]]:
+    """Rows top-to-bottom of "X"/"O"/" " cells, as rendered in the embed."""
+    grid = [[" "] * WIDTH for _ in range(HEIGHT)]
+    for col in range(WIDTH):
+        for r in range(HEIGHT):
+            bit = 1 << (col * H1 + r)
+            if x & bit:
+                grid[HEIGHT - 1 - r][col] = "X"
+            elif o & bit:
+                grid[HEIGHT - 1 - r][col] = "O"
+    return grid
+
+
+def from_grid(grid: List[List[str]]) -> Tuple[int, int]:
+    """Convert a legacy top-to-bottom string grid into (x, o) bitboards."""
+    x = o = 0
+    for row_idx, row in enumerate(grid):
+        r = HEIGHT - 1 - row_idx
+        for col, cell in enumerate(row):
+            bit = 1 << (col * H1 + r)
+            if cell == "X":
+                x |= bit
+            elif cell == "O":
+                o |= bit
+    return x, o
+
+
+# ------------------------------------------------------------------ search
+
+def _winning_cells(pos: int, mask: int) -> int:
+    """Empty cells that would complete four for the stones in `pos`."""
+    # vertical
+    r = (pos << 1) & (pos << 2) & (pos << 3)
+    for s in (H1, H1 - 1, H1 + 1):
+        p = (pos << s) & (pos << (2 * s))
+        r |= p & (pos << (3 * s))
+        r |= p & (pos >> s)
+        p = (pos >> s) & (pos >> (2 * s))
+        r |= p & (pos << s)
+        r |= p & (pos >> (3 * s))
+    return r & (BOARD_MASK ^ mask)
+
+
+class _Timeout(Exception):
+    pass
+
+
+class Searcher:
+    """Negamax over (current, mask) positions: `current` holds the side to move."""
+
+    def __init__(self, tt: Optional[Dict[int, Tuple[int, int, int]]] = None):
+        self.tt: Dict[int, Tuple[int, int, int]] = tt if tt is not None else {}
+        self.nodes = 0
+        self.deadline: Optional[float] = None
+
+    def negamax(self, current: int, mask: int, moves: int, depth: int, alpha: int, beta: int) -> int:
+        self.nodes += 1
+        if self.deadline is not None and not (self.nodes & 1023) and time.perf_counter() > self.deadline:
+            raise _Timeout()
+        possible = (mask + BOTTOM_MASK) & BOARD_MASK
+        if _winning_cells(current, mask) & possible:
+            return WIN_SCORE + (SIZE - moves)
+        if moves >= SIZE - 1:
+            return 0
+        opponent = current ^ mask
+        opp_wins = _winning_cells(opponent, mask)
+        forced = possible & opp_wins
+        if forced & (forced - 1):
+            # Two immediate threats cannot both be blocked
+            return -(WIN_SCORE + SIZE - moves - 1)
+        candidates = forced or possible
+        # Never play directly under a cell the opponent wins on
+        candidates &= ~(opp_wins >> 1)
+        if not candidates:
+            return -(WIN_SCORE + SIZE - moves - 1)
+        if depth <= 0:
+            return bin(_winning_cells(current, mask)).count("1") - bin(opp_wins).count("1")
+
+        key = current + mask
+        alpha0 = alpha
+        entry = self.tt.get(key)
+        if entry is not None and entry[0] >= depth:
+            _, value, flag = entry
+            if flag == 0:
+                return value
+            if flag > 0:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        best = -10 * WIN_SCORE
+        for col in MOVE_ORDER:
+            move = candidates & column_mask(col)
+            if not move:
+                continue
+            score = -self.negamax(opponent, mask | move, moves + 1, depth - 1, -beta, -alpha)
+            if score > best:
+                best = score
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if len(self.tt) >= TT_MAX_ENTRIES:
+            self.tt.clear()
+        flag = 0
+        if best <= alpha0:
+            flag = -1  # upper bound
+        elif best >= beta:
+            flag = 1  # lower bound
+        self.tt[key] = (depth, best, flag)
+        return best
+
+    def root(self, current: int, mask: int, moves: int, depth: int) -> Tuple[int, int]:
+        best_col, best = -1, -10 * WIN_SCORE
+        alpha, beta = -10 * WIN_SCORE, 10 * WIN_SCORE
+        for col in MOVE_ORDER:
+            if not can_play(mask, col):
+                continue
+            move = (mask + bottom_mask(col)) & column_mask(col)
+            if has_four(current | move):
+                return col, WIN_SCORE + SIZE - moves
+            score = -self.negamax(current ^ mask, mask | move, moves + 1, depth - 1, -beta, -alpha)
+            if score > best or best_col < 0:
+                best_col, best = col, score
+            alpha = max(alpha, score)
+        return best_col, best
+
+
+# Reused across calls inside one worker process; entries stay valid because keys are positions
+_TT: Dict[int, Tuple[int, int, int]] = {}
+
+
+def best_move(x: int, o: int, player: int, *, max_depth: int = DEFAULT_MAX_DEPTH, time_limit: Optional[float] = DEFAULT_TIME_LIMIT) -> Tuple[int, Dict[str, float]]:
+    """Pick a column for `player` (0 = X, 1 = O) with iterative deepening.
+
+    Returns (column, stats) where stats holds nodes, completed depth and elapsed seconds.
+    """
+    mask = x | o
+    current = x if player == 0 else o
+    moves = bin(mask).count("1")
+    searcher = Searcher(_TT)
+    started = time.perf_counter()
+    searcher.deadline = (started + time_limit) if time_limit else None
+    col, depth_done = next(c for c in MOVE_ORDER if can_play(mask, c)), 0
+    for depth in range(1, max_depth + 1):
+        try:
+            col, score = searcher.root(current, mask, moves, depth)
+        except _Timeout:
+            break
+        depth_done = depth
+        if abs(score) >= WIN_SCORE or moves + depth >= SIZE:
+            break
+    elapsed = time.perf_counter() - started
+    return col, {"nodes": searcher.nodes, "depth": depth_done, "elapsed": elapsed}
+
+
+_executor: Optional[Executor] = None
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=1)
+    return _executor
+
+
+async def search_async(x: int, o: int, player: int, **kwargs) -> Tuple[int, Dict[str, float]]:
+    """Run `best_move` in a worker process so the search never blocks the event loop."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), _search_job, x, o, player, kwargs)
+    except Exception:
+        # e.g. process pools unavailable on this host: fall back to a thread
+        return await asyncio.to_thread(best_move, x, o, player, **kwargs)
+
+
+def shutdown_executor() -> None:
+    """Stop the search worker process (on shutdown); a later search starts a new one."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _search_job(x: int, o: int, player: int, kwargs: dict) -> Tuple[int, Dict[str, float]]:
+    return best_move(x, o, player, **kwargs)
@@ -0,0 +1,201 @@
+"""
+Thin data-access layer over the asyncpg pool.
+
+- `create_pool()` sizes the pool from the environment (DB_POOL_MIN_SIZE,
+  DB_POOL_MAX_SIZE, DB_COMMAND_TIMEOUT, DB_STATEMENT_CACHE_SIZE) and returns a
+  `TimedPool`, so every `pool.acquire()` records its wait and every query run
+  on a pooled connection is timed.
+- Queries are labelled for metrics: named queries (`query(name, sql)`) by
+  their name, inline SQL by verb and table (e.g. "select general_server").
+  Queries slower than DB_SLOW_QUERY_MS are logged with parameters redacted
+  (types and lengths only).
+- `Database` (`bot.db`) runs named queries: `await bot.db.fetchrow("log_settings", guild_id)`.
+  Named queries always send the same text, so asyncpg's per-connection
+  prepared statement cache serves them after the first use.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import asyncpg
+
+import latency
+from metrics import DB_ACQUIRE_SECONDS, DB_QUERY_ERRORS, DB_QUERY_SECONDS, DB_SLOW_QUERIES
+
+log = logging.getLogger("frostmod")
+
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+# Bound on distinct inline-SQL labels (inline SQL is static text, so this is generous)
+MAX_LABELS = 1000
+
+DB_QUERY_LATENCY = latency.tracker("db_query")
+
+QUERIES: Dict[str, str] = {}
+_LABELS: Dict[str, str] = {}
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+([A-Za-z_][\w.]*)", re.IGNORECASE)
+
+
+def query(name: str, sql: str) -> str:
+    """Register a named query; returns the name for use with `Database`."""
+    existing = QUERIES.get(name)
+    if existing is not None and existing != sql:
+        raise ValueError(f"Query {name!r} already registered with different SQL")
+    QUERIES[name] = sql
+    _LABELS[sql] = name
+    return name
+
+
+def query_label(sql: str) -> str:
+    label = _LABELS.get(sql)
+    if label is not None:
+        return label
+    words = sql.split(None, 1)
+    verb = words[0].lower() if words else "?"
+    table = _TABLE_RE.search(sql)
+    label = f"{verb} {table.group(1)}" if table else verb
+    if len(_LABELS) < MAX_LABELS:
+        _LABELS[sql] = label
+    return label
+
+
+def redact(args: Sequence[Any]) -> str:
+    """Describe query parameters without their values."""
+    parts = []
+    for a in args:
+        if a is None:
+            parts.append("NULL")
+        elif isinstance(a, (str, bytes, list, tuple)):
+            parts.append(f"{type(a).__name__}[{len(a)}]")
+        else:
+            parts.append(type(a).__name__)
+    return "(" + ", ".join(parts) + ")"
+
+
+class TimedConnection(asyncpg.Connection):
+    """asyncpg connection that times every query (installed via `connection_class`)."""
+
+    async def _timed(self, sql: str, args: Sequence[Any], call):
+        started = time.perf_counter()
+        label = query_label(sql)
+        try:
+            return await call
+        except Exception:
+            DB_QUERY_ERRORS.inc(label)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            DB_QUERY_SECONDS.observe(elapsed, label)
+            DB_QUERY_LATENCY.record(elapsed * 1000)
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                DB_SLOW_QUERIES.inc(label)
+                text = " ".join(sql.split())
+                log.warning(f"[DB] Slow query '{label}' took {elapsed * 1000:.0f} ms: {text[:300]} args={redact(args)}")
+
+    async def execute(self, query, *args, timeout=None):
+        return await self._timed(query, args, super().execute(query, *args, timeout=timeout))
+
+    async def executemany(self, command, args, *, timeout=None):
+        return await self._timed(command, (), super().executemany(command, args, timeout=timeout))
+
+    async def fetch(self, query, *args, timeout=None, record_class=None):
+        return await self._timed(query, args, super().fetch(query, *args, timeout=timeout, record_class=record_class))
+
+    async def fetchrow(self, query, *args, timeout=None, record_class=None):
+        return await self._timed(query, args, super().fetchrow(query, *args, timeout=timeout, record_class=record_class))
+
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        return await self._timed(query, args, super().fetchval(query, *args, column=column, timeout=timeout))
+
+
+class _TimedAcquire:
+    def __init__(self, ctx):
+        self._ctx = ctx
+
+    async def _acquire(self):
+        started = time.perf_counter()
+        try:
+            return await self._ctx.__aenter__()
+        finally:
+            DB_ACQUIRE_SECONDS.observe(time.perf_counter() - started)
+
+    def __await__(self):
+        return self._acquire().__await__()
+
+    async def __aenter__(self):
+        return await self._acquire()
+
+    async def __aexit__(self, *exc):
+        return await self._ctx.__aexit__(*exc)
+
+
+class TimedPool:
+    """Wraps an asyncpg pool so `acquire()` records how long callers waited for a connection."""
+
+    def __init__(self, pool: asyncpg.Pool):
+        self._pool = pool
+
+    def acquire(self, *, timeout: Optional[float] = None) -> _TimedAcquire:
+        return _TimedAcquire(self._pool.acquire(timeout=timeout))
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+
+async def create_pool(**connect_kwargs) -> TimedPool:
+    min_size = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+    max_size = max(min_size, int(os.getenv("DB_POOL_MAX_SIZE", "5")))
+    # No statement timeout unless configured (migrations may legitimately run long)
+    command_timeout = os.getenv("DB_COMMAND_TIMEOUT")
+    pool = await asyncpg.create_pool(
+        min_size=min_size,
+        max_size=max_size,
+        command_timeout=float(command_timeout) if command_timeout else None,
+        statement_cache_size=int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")),
+        connection_class=TimedConnection,
+        **connect_kwargs,
+    )
+    log.info(f"[DB] Pool size {min_size}-{max_size}")
+    return TimedPool(pool)
+
+
+class Database:
+    """Runs named queries (see `query()`) on a pooled connection."""
+
+    def __init__(self, pool: TimedPool):
+        self.pool = pool
+
+    def acquire(self, *, timeout: Optional[float] = None) -> _TimedAcquire:
+        return self.pool.acquire(timeout=timeout)
+
+    async def fetch(self, name: str, *args):
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(QUERIES[name], *args)
+
+    async def fetchrow(self, name: str, *args):
+        async with self.pool.acquire() as conn:
+            return await conn.fetchrow(QUERIES[name], *args)
+
+    async def fetchval(self, name: str, *args):
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval(QUERIES[name], *args)
+
+    async def execute(self, name: str, *args) -> str:
+        async with self.pool.acquire() as conn:
+            return await conn.execute(QUERIES[name], *args)
+
+
+# Shared named queries
+
+# Logging toggles, read by every logging listener (one statement for all of them)
+LOG_SETTINGS = query(
+    "log_settings",
+    "SELECT logs_channel_id, log_message_delete, log_nickname_change, log_role_change, log_avatar_change, "
+    "log_message_edit, log_member_join, log_member_leave, log_voice_join, log_voice_leave, log_bulk_delete, "
+    "log_channel_create, log_channel_delete, log_channel_update, log_thread_create, log_thread_delete, "
+    "log_thread_update FROM general_server WHERE guild_id = $1",
+)
@@ -12,6 +12,7 @@ from discord import app_commands
 from discord.ext import commands
 
 from branding import BRAND_COLOR, FOOTER_TEXT
+from db import LOG_SETTINGS
 
 
 class LogsConfigView(discord.ui.View):
@@ -573,16 +574,12 @@ class DeletedMessageLogger(commands.Cog):
         if message.guild is None or message.author.bot:
             return
 
-        pool = getattr(self.bot, "pool", None)
-        if not pool:
+        db = getattr(self.bot, "db", None)
+        if not db:
             return
 
         # Fetch settings
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_message_delete FROM general_server WHERE guild_id = $1",
-                message.guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, message.guild.id)
         if not row or not row["log_message_delete"]:
             return
 
@@ -631,14 +628,10 @@ class DeletedMessageLogger(commands.Cog):
             return
         if before.content == after.content:
             return
-        pool = getattr(self.bot, "pool", None)
-        if not pool:
+        db = getattr(self.bot, "db", None)
+        if not db:
             return
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_message_edit FROM general_server WHERE guild_id = $1",
-                before.guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, before.guild.id)
         if not row or not row["log_message_edit"] or not row["logs_channel_id"]:
             return
         channel = before.guild.get_channel(row["logs_channel_id"]) or await self.bot.fetch_channel(row["logs_channel_id"])  # type: ignore
@@ -673,14 +666,10 @@ class DeletedMessageLogger(commands.Cog):
         guild = self.bot.get_guild(payload.guild_id) if payload.guild_id else None
         if guild is None:
             return
-        pool = getattr(self.bot, "pool", None)
-        if not pool:
+        db = getattr(self.bot, "db", None)
+        if not db:
             return
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_bulk_delete FROM general_server WHERE guild_id = $1",
-                guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, guild.id)
         if not row or not row["logs_channel_id"] or not row["log_bulk_delete"]:
             return
         channel = guild.get_channel(row["logs_channel_id"]) or await self.bot.fetch_channel(row["logs_channel_id"])  # type: ignore
@@ -706,14 +695,10 @@ class DeletedMessageLogger(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
         guild = channel.guild
-        pool = getattr(self.bot, "pool", None)
-        if not pool:
+        db = getattr(self.bot, "db", None)
+        if not db:
             return
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_channel_create FROM general_server WHERE guild_id = $1",
-                guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, guild.id)
         if not row or not row["logs_channel_id"] or not row["log_channel_create"]:
             return
         logs_ch = guild.get_channel(row["logs_channel_id"]) or await self.bot.fetch_channel(row["logs_channel_id"])  # type: ignore
@@ -746,14 +731,10 @@ class DeletedMessageLogger(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
         guild = channel.guild
-        pool = getattr(self.bot, "pool", None)
-        if not pool:
+        db = getattr(self.bot, "db", None)
+        if not db:
             return
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_channel_delete FROM general_server WHERE guild_id = $1",
-                guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, guild.id)
         if not row or not row["logs_channel_id"] or not row["log_channel_delete"]:
             return
         logs_ch = guild.get_channel(row["logs_channel_id"]) or await self.bot.fetch_channel(row["logs_channel_id"])  # type: ignore
@@ -780,14 +761,10 @@ class DeletedMessageLogger(commands.Cog):
     @commands.Cog.listener()
     async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
         guild = after.guild
-        pool = getattr(self.bot, "pool", None)
-        if not pool:
+        db = getattr(self.bot, "db", None)
+        if not db:
             return
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_channel_update FROM general_server WHERE guild_id = $1",
-                guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, guild.id)
         if not row or not row["logs_channel_id"] or not row["log_channel_update"]:
             return
         logs_ch = guild.get_channel(row["logs_channel_id"]) or await self.bot.fetch_channel(row["logs_channel_id"])  # type: ignore
@@ -824,14 +801,10 @@ class DeletedMessageLogger(commands.Cog):
     @commands.Cog.listener()
     async def on_thread_create(self, thread: discord.Thread):
         guild = thread.guild
-        pool = getattr(self.bot, "pool", None)
-        if not pool or guild is None:
+        db = getattr(self.bot, "db", None)
+        if not db or guild is None:
             return
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_thread_create FROM general_server WHERE guild_id = $1",
-                guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, guild.id)
         if not row or not row["logs_channel_id"] or not row["log_thread_create"]:
             return
         logs_ch = guild.get_channel(row["logs_channel_id"]) or await self.bot.fetch_channel(row["logs_channel_id"])  # type: ignore
@@ -861,14 +834,10 @@ class DeletedMessageLogger(commands.Cog):
     @commands.Cog.listener()
     async def on_thread_delete(self, thread: discord.Thread):
         guild = thread.guild
-        pool = getattr(self.bot, "pool", None)
-        if not pool or guild is None:
+        db = getattr(self.bot, "db", None)
+        if not db or guild is None:
             return
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_thread_delete FROM general_server WHERE guild_id = $1",
-                guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, guild.id)
         if not row or not row["logs_channel_id"] or not row["log_thread_delete"]:
             return
         logs_ch = guild.get_channel(row["logs_channel_id"]) or await self.bot.fetch_channel(row["logs_channel_id"])  # type: ignore
@@ -895,14 +864,10 @@ class DeletedMessageLogger(commands.Cog):
     @commands.Cog.listener()
     async def on_thread_update(self, before: discord.Thread, after: discord.Thread):
         guild = after.guild
-        pool = getattr(self.bot, "pool", None)
-        if not pool or guild is None:
+        db = getattr(self.bot, "db", None)
+        if not db or guild is None:
             return
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_thread_update FROM general_server WHERE guild_id = $1",
-                guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, guild.id)
         if not row or not row["logs_channel_id"] or not row["log_thread_update"]:
             return
         logs_ch = guild.get_channel(row["logs_channel_id"]) or await self.bot.fetch_channel(row["logs_channel_id"])  # type: ignore
@@ -937,14 +902,10 @@ class DeletedMessageLogger(commands.Cog):
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
         guild = member.guild
-        pool = getattr(self.bot, "pool", None)
-        if not pool:
+        db = getattr(self.bot, "db", None)
+        if not db:
             return
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_voice_join, log_voice_leave FROM general_server WHERE guild_id = $1",
-                guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, guild.id)
         if not row or not row["logs_channel_id"]:
             return
         logs_channel_id = row["logs_channel_id"]
@@ -984,14 +945,10 @@ class DeletedMessageLogger(commands.Cog):
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         guild = member.guild
-        pool = getattr(self.bot, "pool", None)
-        if not pool:
+        db = getattr(self.bot, "db", None)
+        if not db:
             return
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_member_join FROM general_server WHERE guild_id = $1",
-                guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, guild.id)
         if not row or not row["log_member_join"] or not row["logs_channel_id"]:
             return
         channel = guild.get_channel(row["logs_channel_id"]) or await self.bot.fetch_channel(row["logs_channel_id"])  # type: ignore
@@ -1020,14 +977,10 @@ class DeletedMessageLogger(commands.Cog):
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
         guild = member.guild
-        pool = getattr(self.bot, "pool", None)
-        if not pool:
+        db = getattr(self.bot, "db", None)
+        if not db:
             return
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT logs_channel_id, log_member_leave FROM general_server WHERE guild_id = $1",
-                guild.id,
-            )
+        row = await db.fetchrow(LOG_SETTINGS, guild.id)
         if not row or not row["log_member_leave"] or not row["logs_channel_id"]:
             return
         channel = guild.get_channel(row["logs_channel_id"]) or await self.bot.fetch_channel(row["logs_channel_id"])  # type: ignore
@@ -0,0 +1,159 @@
+"""
+Per-user violation escalation for AI moderation.
+
+Every flagged message extends the author's warning duration: the first
+violation starts at a severity-dependent duration, repeats while the previous
+one is still active double it (up to MAX_DURATION), and a repeat after it has
+expired restarts at most at RESET_DURATION.
+
+This used to be a SELECT followed by an UPDATE or INSERT on
+`ai_mod_rate_limits` for every violation, which raced when the same user was
+flagged several times at once. The state now lives in memory per (guild,
+user): it is loaded from the table the first time a user is flagged, updated
+without awaiting anything in between (so concurrent violations apply one after
+another), and persisted through the write-behind buffer as a single upsert
+that collapses a burst of violations into one row write.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import discord
+
+BASE_DURATION = 5
+INITIAL_DURATIONS = {"low": BASE_DURATION, "med": 10, "high": 15}
+MAX_DURATION = 300
+RESET_DURATION = 30
+# Users whose state is kept in memory; older entries are reloaded from the table when needed
+MAX_ENTRIES = int(os.getenv("AI_ESCALATION_CACHE_SIZE", "10000"))
+
+UPSERT_SQL = (
+    "INSERT INTO ai_mod_rate_limits "
+    "(guild_id, user_id, violation_count, last_violation_at, current_limit_duration, expires_at) "
+    "VALUES ($1, $2, $3, $4, $5, $6) "
+    "ON CONFLICT (guild_id, user_id) DO UPDATE SET violation_count = EXCLUDED.violation_count, "
+    "last_violation_at = EXCLUDED.last_violation_at, current_limit_duration = EXCLUDED.current_limit_duration, "
+    "expires_at = EXCLUDED.expires_at"
+)
+
+Key = Tuple[int, int]
+
+
+@dataclass
+class Escalation:
+    count: int
+    duration: int  # seconds
+    last_violation_at: datetime.datetime
+    expires_at: Optional[datetime.datetime]
+
+    def escalated(self, now: datetime.datetime) -> "Escalation":
+        if self.expires_at is not None and self.expires_at > now:
+            duration = min(self.duration * 2, MAX_DURATION)
+        else:
+            duration = min(self.duration, RESET_DURATION)
+        return Escalation(self.count + 1, duration, now, now + datetime.timedelta(seconds=duration))
+
+
+def first_violation(severity: str, now: datetime.datetime) -> Escalation:
+    duration = INITIAL_DURATIONS.get(severity, BASE_DURATION)
+    return Escalation(1, duration, now, now + datetime.timedelta(seconds=duration))
+
+
+class ViolationEscalation:
+    """In-memory escalation state per (guild, user), written behind to `ai_mod_rate_limits`."""
+
+    def __init__(self, bot: discord.Client, max_entries: int = MAX_ENTRIES):
+        self.bot = bot
+        self.max_entries = max_entries
+        self.log = logging.getLogger("aimoderation")
+        # None = loaded, no previous violations
+        self._states: "OrderedDict[Key, Optional[Escalation]]" = OrderedDict()
+        self._loading: Dict[Key, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    async def record(self, guild_id: int, user_id: int, severity: str) -> int:
+        """Count a violation and return the author's warning duration in seconds."""
+        key = (guild_id, user_id)
+        if key not in self._states:
+            try:
+                await self._load(key)
+            except Exception as e:
+                self.log.error(f"[AI] Could not load escalation state for {user_id} in {guild_id}: {e}")
+                return BASE_DURATION
+        # No awaits from here on: read, escalate and store happen as one step
+        now = discord.utils.utcnow()
+        previous = self._states.get(key)
+        state = previous.escalated(now) if previous is not None else first_violation(severity, now)
+        self._states[key] = state
+        self._states.move_to_end(key)
+        self._evict()
+        await self._persist(key, state)
+        return state.duration
+
+    async def _load(self, key: Key) -> None:
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key))
+            self._loading[key] = task
+        await asyncio.shield(task)
+
+    async def _fetch(self, key: Key) -> None:
+        try:
+            pool = getattr(self.bot, "pool", None)
+            row = None
+            if pool is not None:
+                wb = getattr(self.bot, "write_behind", None)
+                if wb is not None:
+                    # An evicted user may still have an upsert pending; write it before reading
+                    async with wb.hold():
+                        row = await self._select(pool, key)
+                else:
+                    row = await self._select(pool, key)
+            if key not in self._states:
+                self._states[key] = Escalation(
+                    int(row["violation_count"]),
+                    int(row["current_limit_duration"]),
+                    row["last_violation_at"],
+                    row["expires_at"],
+                ) if row else None
+                self._evict()
+        finally:
+            self._loading.pop(key, None)
+
+    @staticmethod
+    async def _select(pool, key: Key):
+        async with pool.acquire() as conn:
+            return await conn.fetchrow(
+                "SELECT violation_count, current_limit_duration, last_violation_at, expires_at "
+                "FROM ai_mod_rate_limits WHERE guild_id = $1 AND user_id = $2",
+                *key,
+            )
+
+    async def _persist(self, key: Key, state: Escalation) -> None:
+        args = (*key, state.count, state.last_violation_at, state.duration, state.expires_at)
+        wb = getattr(self.bot, "write_behind", None)
+        if wb is not None:
+            # Replaces any pending upsert for this user, so a burst costs one row write
+            wb.submit(("ai_mod_rate_limits", *key), UPSERT_SQL, *args)
+            return
+        pool = getattr(self.bot, "pool", None)
+        if pool is None:
+            return
+        try:
+            async with pool.acquire() as conn:
+                await conn.execute(UPSERT_SQL, *args)
+        except Exception as e:
+            self.log.error(f"[AI] Could not save escalation state for {key[1]} in {key[0]}: {e}")
+
+    def _evict(self) -> None:
+        while len(self._states) > self.max_entries:
+            self._states.popitem(last=False)
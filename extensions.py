@@ -0,0 +1,146 @@
+"""
+Startup orchestration for FrostMod extensions.
+
+Extensions used to be loaded one after another inside `setup_hook`, so the
+bot could not connect to the gateway until every cog had imported and run its
+`setup()` (several of which query the database to restore state). Now:
+
+- Core extensions load concurrently before the bot connects; their `setup()`
+  coroutines overlap instead of queueing behind each other.
+- Rarely used extensions (games, memes, animal images) are deferred: they load
+  in the background once the core is up, so moderation and logging are
+  serving as early as possible. If one of their commands is invoked before
+  they finish loading, `LazyCommandTree` waits for them first.
+- Each extension's load time is recorded in `bot.extension_load_times` and
+  the slowest ones are logged.
+
+The loader is created in `setup_hook` and exposed as `bot.extension_loader`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, Optional
+
+import discord
+from discord import app_commands
+
+import latency
+from metrics import COMMAND_SECONDS, COMMANDS
+
+# Needed as soon as the bot connects: moderation, logging, settings and core commands
+CORE_EXTENSIONS = (
+    "purgecog", "Welcomecog", "Leavecog", "autorolecog", "help", "Webserver", "rules", "deletedmescog", "usrchangcog",
+    "dbcheckcog", "statuscog", "serverinfocog", "dadjokecog", "Activtycog", "publicinfo", "polls", "utilityimages",
+    # New enhancements
+    "errors", "diagnostics", "setup", "settings", "activity_digest", "housekeeping", "moderation", "support",
+    "aimodcog", "aihelpcog", "userprofilecog", "aiassistantcog", "ticketscog",
+)
+
+# Loaded in the background after startup (or on first use)
+DEFERRED_EXTENSIONS = (
+    "minigames", "memes", "catcog", "dogcog",
+    # Fun cogs
+    "trivia", "hangman", "scramble", "wyr",
+)
+
+COMMAND_LATENCY = latency.tracker("command")
+
+# How long an early command waits for deferred extensions (interactions must be answered within 3s)
+DEFERRED_WAIT_SECONDS = 2.5
+
+
+class ExtensionLoader:
+    def __init__(self, bot):
+        self.bot = bot
+        self.log = logging.getLogger("frostmod")
+        self.load_times: Dict[str, float] = {}
+        self.failed: Dict[str, str] = {}
+        self._deferred: Optional[asyncio.Task] = None
+        bot.extension_load_times = self.load_times
+
+    async def _load_one(self, name: str) -> None:
+        started = time.perf_counter()
+        try:
+            await self.bot.load_extension(name)
+        except Exception as e:
+            self.failed[name] = str(e)
+            self.log.warning(f"Failed to load extension '{name}': {e}")
+            return
+        self.load_times[name] = time.perf_counter() - started
+        self.log.info(f"[EXT] Loaded extension: {name} ({self.load_times[name] * 1000:.0f} ms)")
+
+    async def load(self, names: Iterable[str]) -> float:
+        """Load extensions concurrently; returns the wall time in seconds."""
+        started = time.perf_counter()
+        await asyncio.gather(*(self._load_one(n) for n in names))
+        return time.perf_counter() - started
+
+    async def load_core(self) -> None:
+        elapsed = await self.load(CORE_EXTENSIONS)
+        self.log.info(f"[EXT] Core extensions ready in {elapsed:.2f}s")
+        self.log_slowest()
+
+    def start_deferred(self) -> asyncio.Task:
+        if self._deferred is None:
+            self._deferred = asyncio.create_task(self._load_deferred(), name="deferred-extensions")
+        return self._deferred
+
+    async def _load_deferred(self) -> None:
+        elapsed = await self.load(DEFERRED_EXTENSIONS)
+        self.log.info(f"[EXT] Deferred extensions ready in {elapsed:.2f}s")
+
+    @property
+    def deferred_pending(self) -> bool:
+        return self._deferred is not None and not self._deferred.done()
+
+    async def wait_deferred(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the deferred extensions; returns False on timeout."""
+        if self._deferred is None:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(self._deferred), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def log_slowest(self, count: int = 5) -> None:
+        slowest = sorted(self.load_times.items(), key=lambda kv: kv[1], reverse=True)[:count]
+        if slowest:
+            self.log.info("[EXT] Slowest: " + ", ".join(f"{n} {t * 1000:.0f} ms" for n, t in slowest))
+
+
+class LazyCommandTree(app_commands.CommandTree):
+    """Command tree that holds early invocations of deferred commands until their extension is loaded, and times every command."""
+
+    async def _call(self, interaction: discord.Interaction) -> None:
+        if interaction.type is discord.InteractionType.autocomplete:
+            # Must answer within Discord's 3 s limit, so never held; keystrokes are not command runs
+            await super()._call(interaction)
+            return
+        loader: Optional[ExtensionLoader] = getattr(self.client, "extension_loader", None)
+        if loader is not None and loader.deferred_pending:
+            data = interaction.data or {}
+            name = data.get("name")
+            if not name or self.get_command(name) is None:
+                await loader.wait_deferred(DEFERRED_WAIT_SECONDS)
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            await super()._call(interaction)
+        except app_commands.CommandNotFound:
+            status = "not_found"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            if status == "ok" and interaction.command_failed:
+                status = "error"
+            command = (interaction.data or {}).get("name") or "unknown"
+            elapsed = time.perf_counter() - started
+            COMMAND_SECONDS.observe(elapsed, command)
+            COMMAND_LATENCY.record(elapsed * 1000)
+            COMMANDS.inc(command, status)
@@ -0,0 +1,81 @@
+"""
+In-memory registry of running games.
+
+The registry is the authoritative copy of a game while it is being played:
+button callbacks take the per-game lock, mutate the state object in memory and
+queue the row update on `bot.write_behind`. The database stays a recovery
+copy; a game missing from memory (after a restart or eviction) is loaded from
+it on first use.
+
+Created in `setup_hook` and exposed as `bot.games`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+Key = Tuple[str, int]
+
+
+class GameRegistry:
+    """Game state and locks keyed by (kind, game_id)."""
+
+    # Idle games are evicted well after their last write has been flushed
+    IDLE_SECONDS = 3600
+    PRUNE_EVERY = 300
+
+    def __init__(self) -> None:
+        self._games: Dict[Key, Any] = {}
+        self._locks: Dict[Key, asyncio.Lock] = {}
+        self._touched: Dict[Key, float] = {}
+        self._last_prune = time.monotonic()
+
+    def lock(self, kind: str, game_id: int) -> asyncio.Lock:
+        """Per-game lock; hold it across read-modify-write of the state."""
+        return self._locks.setdefault((kind, int(game_id)), asyncio.Lock())
+
+    def get(self, kind: str, game_id: int) -> Optional[Any]:
+        key = (kind, int(game_id))
+        state = self._games.get(key)
+        if state is not None:
+            self._touched[key] = time.monotonic()
+        return state
+
+    def put(self, kind: str, game_id: int, state: Any) -> None:
+        key = (kind, int(game_id))
+        self._games[key] = state
+        self._touched[key] = time.monotonic()
+
+    def drop(self, kind: str, game_id: int) -> None:
+        key = (kind, int(game_id))
+        self._games.pop(key, None)
+        self._touched.pop(key, None)
+        lock = self._locks.get(key)
+        if lock is not None and not lock.locked():
+            del self._locks[key]
+
+    async def load(self, kind: str, game_id: int, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """Return the cached state, or fetch it with `loader` and cache it."""
+        self._maybe_prune()
+        state = self.get(kind, game_id)
+        if state is None:
+            state = await loader()
+            if state is not None:
+                self.put(kind, game_id, state)
+        return state
+
+    def active(self, kind: str) -> List[Tuple[int, Any]]:
+        return [(gid, state) for (k, gid), state in self._games.items() if k == kind]
+
+    def _maybe_prune(self) -> None:
+        now = time.monotonic()
+        if now - self._last_prune < self.PRUNE_EVERY:
+            return
+        self._last_prune = now
+        for key, seen in list(self._touched.items()):
+            lock = self._locks.get(key)
+            if now - seen > self.IDLE_SECONDS and (lock is None or not lock.locked()):
+                self.drop(*key)
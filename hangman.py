@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import string
 import random
+from dataclasses import dataclass
 from typing import Optional, List
 import json
 import datetime
@@ -13,12 +14,16 @@ from discord.app_commands import checks
 from discord.ext import commands
 
 from branding import BRAND_COLOR, FOOTER_TEXT
+from scheduler import message_ref
 
 DEFAULT_WORDS = [
     "python", "discord", "frostmod", "hangman", "database", "asyncio", "embed",
     "moderation", "channel", "message", "heartbeat", "support"
 ]
 
+# Round length; expiry is a durable scheduler timer of kind "hangman_expire"
+GAME_SECONDS = 120
+
 
 def render_hangman(word: str, guessed: List[str]) -> str:
     display = " ".join([c if c in guessed or not c.isalpha() else "_" for c in word])
@@ -26,6 +31,70 @@ def render_hangman(word: str, guessed: List[str]) -> str:
     return display, ", ".join(wrong) if wrong else "(none)"
 
 
+def parse_guessed(raw) -> List[str]:
+    if isinstance(raw, list):
+        return list(raw)
+    try:
+        return list(json.loads(str(raw)))
+    except Exception:
+        return []
+
+
+def hangman_embed(word: str, guessed: List[str], attempts_left: int, *, time_left: Optional[int] = None) -> discord.Embed:
+    disp, wrong = render_hangman(word, guessed)
+    # Hearts visualization (total 6 lives)
+    hearts = "❤️" * attempts_left + "🤍" * (6 - attempts_left)
+    desc = f"Word: {disp}\nWrong: {wrong}\nLives: {hearts}"
+    if time_left is not None:
+        desc += f"\nTime left: {time_left}s"
+    embed = discord.Embed(title="Hangman", description=desc, color=BRAND_COLOR)
+    embed.set_footer(text=FOOTER_TEXT)
+    return embed
+
+
+@dataclass
+class HangmanGame:
+    game_id: int
+    channel_id: int
+    message_id: int
+    word: str
+    guessed: List[str]
+    attempts_left: int
+    finished: bool = False
+    winner_id: Optional[int] = None
+
+
+SAVE_SQL = "UPDATE games_hangman SET guessed=$1::jsonb, attempts_left=$2, finished=$3, winner_id=$4 WHERE game_id=$5"
+
+
+async def load_game(client: discord.Client, game_id: int) -> Optional[HangmanGame]:
+    pool = getattr(client, "pool", None)
+    if pool is None:
+        return None
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            "SELECT channel_id, message_id, word, guessed, attempts_left, finished, winner_id FROM games_hangman WHERE game_id=$1",
+            game_id,
+        )
+    if row is None:
+        return None
+    return HangmanGame(game_id, int(row[0]), int(row[1]), str(row[2]), parse_guessed(row[3]), int(row[4]), bool(row[5]), row[6])
+
+
+async def get_game(client: discord.Client, game_id: int) -> Optional[HangmanGame]:
+    return await client.games.load("hangman", game_id, lambda: load_game(client, game_id))  # type: ignore[attr-defined]
+
+
+async def save_game(client: discord.Client, game: HangmanGame) -> None:
+    """Queue the row update; a finished game is checkpointed immediately."""
+    args = (json.dumps(game.guessed), game.attempts_left, game.finished, game.winner_id, game.game_id)
+    key = ("games_hangman", game.game_id)
+    if game.finished:
+        await client.write_behind.write_now(key, SAVE_SQL, *args)  # type: ignore[attr-defined]
+    else:
+        client.write_behind.submit(key, SAVE_SQL, *args)  # type: ignore[attr-defined]
+
+
 class HangmanView(discord.ui.View):
     def __init__(self, game_id: int, guessed: Optional[List[str]] = None):
         super().__init__(timeout=None)  # persistent
@@ -39,32 +108,6 @@ class HangmanView(discord.ui.View):
         if letters_nz:
             self.add_item(HangmanSelect(game_id, "N-Z", letters_nz))
 
-    @staticmethod
-    async def load_state(client: discord.Client, game_id: int):
-        pool = getattr(client, "pool", None)
-        if pool is None:
-            return None
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT guild_id, channel_id, message_id, starter_id, word, guessed, attempts_left, finished, winner_id "
-                "FROM games_hangman WHERE game_id=$1",
-                game_id,
-            )
-        return row
-
-    @staticmethod
-    async def save_state(client: discord.Client, game_id: int, *, guessed: List[str], attempts_left: int, finished: bool, winner_id: Optional[int]):
-        pool = getattr(client, "pool", None)
-        async with pool.acquire() as conn:
-            await conn.execute(
-                "UPDATE games_hangman SET guessed=$1::jsonb, attempts_left=$2, finished=$3, winner_id=$4 WHERE game_id=$5",
-                json.dumps(guessed),
-                attempts_left,
-                finished,
-                winner_id,
-                game_id,
-            )
-
 
 class HangmanSelect(discord.ui.Select):
     def __init__(self, game_id: int, label: str, letters: list[str]):
@@ -83,61 +126,57 @@ class HangmanSelect(discord.ui.Select):
         self._last_by_user[interaction.user.id] = now
         letter = self.values[0].lower()
         game_id = self.game_id
-        row = await HangmanView.load_state(interaction.client, game_id)
-        if row is None:
-            await interaction.response.send_message("Game not found.", ephemeral=True)
-            return
-        word = str(row[4])
-        raw_guessed = row[5]
-        if isinstance(raw_guessed, list):
-            guessed: List[str] = list(raw_guessed)
-        else:
-            try:
-                guessed = list(json.loads(str(raw_guessed)))
-            except Exception:
-                guessed = []
-        attempts_left = int(row[6])
-        finished = bool(row[7])
-        winner_id = row[8]
+        client = interaction.client
+        # Moves are applied to the in-memory game under its lock; the DB write is queued
+        async with client.games.lock("hangman", game_id):  # type: ignore[attr-defined]
+            game = await get_game(client, game_id)
+            if game is None:
+                await interaction.response.send_message("Game not found.", ephemeral=True)
+                return
+            if game.finished:
+                await interaction.response.send_message("This game has finished.", ephemeral=True)
+                return
+            if letter in game.guessed:
+                await interaction.response.send_message("Already guessed.", ephemeral=True)
+                return
 
-        if finished:
-            await interaction.response.send_message("This game has finished.", ephemeral=True)
-            return
-        if letter in guessed:
-            await interaction.response.send_message("Already guessed.", ephemeral=True)
-            return
+            word = game.word
+            game.guessed.append(letter)
+            if letter not in word:
+                game.attempts_left -= 1
 
-        guessed.append(letter)
-        if letter not in word:
-            attempts_left -= 1
-
-        # Check win/lose
-        all_revealed = all((not c.isalpha()) or (c in guessed) for c in word)
-        if all_revealed:
-            finished = True
-            winner_id = interaction.user.id
-        elif attempts_left <= 0:
-            finished = True
-
-        await HangmanView.save_state(interaction.client, game_id, guessed=guessed, attempts_left=attempts_left, finished=finished, winner_id=winner_id)
-
-        # Build embed
-        disp, wrong = render_hangman(word, guessed)
-        desc = f"Word: {disp}\nWrong: {wrong}\nAttempts left: {attempts_left}"
-        embed = discord.Embed(title="Hangman", description=desc, color=BRAND_COLOR)
-        if finished:
-            if attempts_left > 0:
-                embed.add_field(name="Winner", value=f"<@{winner_id}>")
-            else:
-                embed.add_field(name="Result", value=f"You lost! The word was `{word}`")
-        embed.set_footer(text=FOOTER_TEXT)
+            # Check win/lose
+            all_revealed = all((not c.isalpha()) or (c in game.guessed) for c in word)
+            if all_revealed:
+                game.finished = True
+                game.winner_id = interaction.user.id
+            elif game.attempts_left <= 0:
+                game.finished = True
 
-        view = HangmanView(game_id, guessed=guessed)
-        if finished:
-            for c in view.children:
-                if isinstance(c, (discord.ui.Button, discord.ui.Select)):
-                    c.disabled = True
-        await interaction.response.edit_message(embed=embed, view=view)
+            # Build embed
+            disp, wrong = render_hangman(word, game.guessed)
+            desc = f"Word: {disp}\nWrong: {wrong}\nAttempts left: {game.attempts_left}"
+            embed = discord.Embed(title="Hangman", description=desc, color=BRAND_COLOR)
+            if game.finished:
+                if game.attempts_left > 0:
+                    embed.add_field(name="Winner", value=f"<@{game.winner_id}>")
+                else:
+                    embed.add_field(name="Result", value=f"You lost! The word was `{word}`")
+            embed.set_footer(text=FOOTER_TEXT)
+
+            view = HangmanView(game_id, guessed=game.guessed)
+            if game.finished:
+                for c in view.children:
+                    if isinstance(c, (discord.ui.Button, discord.ui.Select)):
+                        c.disabled = True
+            try:
+                await interaction.response.edit_message(embed=embed, view=view)
+            finally:
+                await save_game(client, game)
+        if game.finished:
+            cog = client.get_cog("HangmanCog")
+            if cog is not None:
+                await cog.finish(game_id)
 
 
 class HangmanCog(commands.Cog):
@@ -145,6 +184,7 @@ class HangmanCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        bot.scheduler.register("hangman_expire", self._expire)  # type: ignore[attr-defined]
 
     @app_commands.command(name="hangman", description="Start a Hangman game. Optionally provide a word; otherwise random.")
     @app_commands.describe(word="Optional custom word (letters and spaces only).")
@@ -178,90 +218,81 @@ class HangmanCog(commands.Cog):
             game_id = int(rec[0])
 
         view = HangmanView(game_id, guessed=guessed)
-        disp, wrong = render_hangman(word, guessed)
-        # Hearts visualization (total 6 lives)
-        hearts = "❤️" * attempts_left + "🤍" * (6 - attempts_left)
-        desc = f"Word: {disp}\nWrong: {wrong}\nLives: {hearts}"
-        embed = discord.Embed(title="Hangman", description=desc, color=BRAND_COLOR)
-        embed.set_footer(text=FOOTER_TEXT)
-        await interaction.response.send_message(embed=embed, view=view)
+        await interaction.response.send_message(embed=hangman_embed(word, guessed, attempts_left), view=view)
         msg = await interaction.original_response()
         async with pool.acquire() as conn:  # type: ignore
             await conn.execute("UPDATE games_hangman SET message_id=$1 WHERE game_id=$2", msg.id, game_id)
+        self.bot.games.put("hangman", game_id, HangmanGame(game_id, interaction.channel_id, msg.id, word, guessed, attempts_left))  # type: ignore[attr-defined]
 
-        # Start a 2-minute countdown with auto-close
-        total_secs = 120
-        async def countdown_task():
-            nonlocal total_secs
-            try:
-                while total_secs > 0:
-                    await discord.utils.sleep_until(discord.utils.utcnow() + datetime.timedelta(seconds=5))
-                    total_secs = max(0, total_secs - 5)
-                    # Fetch state
-                    row2 = await HangmanView.load_state(self.bot, game_id)  # type: ignore
-                    if row2 is None:
-                        return
-                    word2 = str(row2[4])
-                    raw_guessed2 = row2[5]
-                    if isinstance(raw_guessed2, list):
-                        guessed2: List[str] = list(raw_guessed2)
-                    else:
-                        try:
-                            guessed2 = list(json.loads(str(raw_guessed2)))
-                        except Exception:
-                            guessed2 = []
-                    attempts_left2 = int(row2[6])
-                    finished2 = bool(row2[7])
-                    if finished2 or attempts_left2 <= 0:
-                        return
-                    disp2, wrong2 = render_hangman(word2, guessed2)
-                    hearts2 = "❤️" * attempts_left2 + "🤍" * (6 - attempts_left2)
-                    desc2 = f"Word: {disp2}\nWrong: {wrong2}\nLives: {hearts2}\nTime left: {total_secs}s"
-                    v2 = HangmanView(game_id, guessed=guessed2)
-                    e2 = discord.Embed(title="Hangman", description=desc2, color=BRAND_COLOR)
-                    e2.set_footer(text=FOOTER_TEXT)
-                    try:
-                        await msg.edit(embed=e2, view=v2)
-                    except Exception:
-                        pass
-                # Time up; end the game if not already finished
-                row3 = await HangmanView.load_state(self.bot, game_id)  # type: ignore
-                if row3 is None:
-                    return
-                word3 = str(row3[4])
-                attempts_left3 = int(row3[6])
-                finished3 = bool(row3[7])
-                if not finished3:
-                    await HangmanView.save_state(self.bot, game_id, guessed=[], attempts_left=attempts_left3, finished=True, winner_id=None)  # type: ignore
-                    vdone = HangmanView(game_id, guessed=[])
-                    for c in vdone.children:
-                        if isinstance(c, (discord.ui.Button, discord.ui.Select)):
-                            c.disabled = True
-                    ef = discord.Embed(title="Hangman — Time's Up", description=f"You ran out of time. The word was `{word3}`", color=discord.Color.orange())
-                    ef.set_footer(text=FOOTER_TEXT)
-                    try:
-                        await msg.edit(embed=ef, view=vdone)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+        # 2-minute round: durable expiry timer plus a shared countdown refresh
+        ends_at = discord.utils.utcnow() + datetime.timedelta(seconds=GAME_SECONDS)
+        await self.bot.scheduler.schedule("hangman_expire", game_id, ends_at)  # type: ignore[attr-defined]
+        self.track(game_id, msg, ends_at)
+
+    def track(self, game_id: int, message, ends_at: datetime.datetime) -> None:
+        self.bot.scheduler.add_countdown(  # type: ignore[attr-defined]
+            f"hangman:{game_id}", message, ends_at, lambda secs: self._render_countdown(game_id, secs)
+        )
+
+    async def finish(self, game_id: int) -> None:
+        self.bot.games.drop("hangman", game_id)  # type: ignore[attr-defined]
+        self.bot.scheduler.remove_countdown(f"hangman:{game_id}")  # type: ignore[attr-defined]
+        await self.bot.scheduler.cancel("hangman_expire", game_id)  # type: ignore[attr-defined]
+
+    def _render_countdown(self, game_id: int, secs: int):
+        game = self.bot.games.get("hangman", game_id)  # type: ignore[attr-defined]
+        if game is None or game.finished:
+            return None
+        embed = hangman_embed(game.word, game.guessed, game.attempts_left, time_left=secs)
+        return embed, HangmanView(game_id, guessed=game.guessed)
+
+    async def _expire(self, game_id: int, payload: dict) -> None:
+        # Time up; end the game if not already finished
+        self.bot.scheduler.remove_countdown(f"hangman:{game_id}")  # type: ignore[attr-defined]
+        async with self.bot.games.lock("hangman", game_id):  # type: ignore[attr-defined]
+            game = await get_game(self.bot, game_id)
+            if game is None or game.finished:
+                return
+            game.finished = True
+            await save_game(self.bot, game)
+        self.bot.games.drop("hangman", game_id)  # type: ignore[attr-defined]
+        vdone = HangmanView(game_id, guessed=[])
+        for c in vdone.children:
+            if isinstance(c, (discord.ui.Button, discord.ui.Select)):
+                c.disabled = True
+        ef = discord.Embed(title="Hangman — Time's Up", description=f"You ran out of time. The word was `{game.word}`", color=discord.Color.orange())
+        ef.set_footer(text=FOOTER_TEXT)
         try:
-            self.bot.loop.create_task(countdown_task())
+            await message_ref(self.bot, game.channel_id, game.message_id).edit(embed=ef, view=vdone)
         except Exception:
             pass
 
+    async def resume(self, game: HangmanGame) -> None:
+        """Re-attach a game that was running before a restart."""
+        self.bot.games.put("hangman", game.game_id, game)  # type: ignore[attr-defined]
+        ends_at = self.bot.scheduler.fire_time("hangman_expire", game.game_id)  # type: ignore[attr-defined]
+        if ends_at is None:
+            # Games started before timers were persisted get a fresh round
+            ends_at = discord.utils.utcnow() + datetime.timedelta(seconds=GAME_SECONDS)
+            await self.bot.scheduler.schedule("hangman_expire", game.game_id, ends_at)  # type: ignore[attr-defined]
+        self.track(game.game_id, message_ref(self.bot, game.channel_id, game.message_id), ends_at)
+
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(HangmanCog(bot))
+    cog = HangmanCog(bot)
+    await bot.add_cog(cog)
     # Restore unfinished games
     pool = getattr(bot, "pool", None)
     if pool is not None:
         async with pool.acquire() as conn:
-            rows = await conn.fetch("SELECT game_id, message_id FROM games_hangman WHERE finished=FALSE")
+            rows = await conn.fetch(
+                "SELECT game_id, channel_id, message_id, word, guessed, attempts_left FROM games_hangman WHERE finished=FALSE"
+            )
         for r in rows:
-            gid = int(r[0]); mid = int(r[1])
+            game = HangmanGame(int(r[0]), int(r[1]), int(r[2]), str(r[3]), parse_guessed(r[4]), int(r[5]))
             try:
-                bot.add_view(HangmanView(gid), message_id=mid)
+                bot.add_view(HangmanView(game.game_id, guessed=game.guessed), message_id=game.message_id)
+                await cog.resume(game)
             except Exception:
                 async with pool.acquire() as conn:
-                    await conn.execute("UPDATE games_hangman SET finished=TRUE WHERE game_id=$1", gid)
+                    await conn.execute("UPDATE games_hangman SET finished=TRUE WHERE game_id=$1", game.game_id)
@@ -0,0 +1,257 @@
+"""
+Partition maintenance and data retention for FrostMod.
+
+High-volume time-series tables are range-partitioned by month:
+
+- `user_activity_daily` on `day`
+- `ai_mod_acknowledgments` on `created_at`
+
+Schema migration 0002 creates the partitioned parents (converting plain
+tables left by older versions) with partitions for the current month and a
+few months ahead; from then on partitions are only created here.
+
+The housekeeping cog makes sure upcoming partitions exist when it loads and
+then runs once a day on the shared scheduler. It keeps partitions created
+ahead of time, drops (or, with HOUSEKEEPING_DETACH_ONLY=1, only detaches)
+partitions past their retention, and deletes expired rows in small batches
+from tables that cannot be partitioned (violations referenced by feedback
+rows, finished games, closed polls, weekly rollups).
+
+Retention is configured per table in days via env vars; 0 keeps data forever.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from discord.ext import commands
+
+log = logging.getLogger("housekeeping")
+
+MONTHS_AHEAD = 3
+DELETE_BATCH = 5000
+HOUSEKEEPING_HOUR = 4  # UTC
+
+
+def _days(env: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(env, str(default))))
+    except ValueError:
+        return default
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    name: str
+    retention_env: str
+    retention_default: int
+
+
+PARTITIONED: Tuple[PartitionedTable, ...] = (
+    PartitionedTable(
+        name="user_activity_daily",
+        # Must stay above the 30-day window used by /activity and /leaderboard
+        retention_env="RETENTION_ACTIVITY_DAYS",
+        retention_default=400,
+    ),
+    PartitionedTable(
+        name="ai_mod_acknowledgments",
+        retention_env="RETENTION_ACK_DAYS",
+        retention_default=180,
+    ),
+)
+
+# (env var, default days, table, batched delete with $1 = cutoff timestamp)
+ROW_RETENTION: Tuple[Tuple[str, int, str, str], ...] = (
+    (
+        "RETENTION_VIOLATIONS_DAYS", 365, "ai_mod_feedback",
+        "DELETE FROM ai_mod_feedback WHERE feedback_id IN ("
+        " SELECT f.feedback_id FROM ai_mod_feedback f JOIN ai_mod_violations v ON v.violation_id = f.violation_id"
+        " WHERE v.created_at < $1 LIMIT $2)",
+    ),
+    (
+        "RETENTION_VIOLATIONS_DAYS", 365, "ai_mod_violations",
+        "DELETE FROM ai_mod_violations WHERE violation_id IN ("
+        " SELECT violation_id FROM ai_mod_violations WHERE created_at < $1 ORDER BY created_at LIMIT $2)",
+    ),
+    (
+        "RETENTION_POLLS_DAYS", 90, "polls_votes",
+        "DELETE FROM polls_votes WHERE ctid IN ("
+        " SELECT pv.ctid FROM polls_votes pv JOIN polls_active p ON p.message_id = pv.message_id"
+        " WHERE p.closed AND p.created_at < $1 LIMIT $2)",
+    ),
+    (
+        "RETENTION_POLLS_DAYS", 90, "polls_active",
+        "DELETE FROM polls_active WHERE message_id IN ("
+        " SELECT p.message_id FROM polls_active p WHERE p.closed AND p.created_at < $1"
+        " AND NOT EXISTS (SELECT 1 FROM polls_votes pv WHERE pv.message_id = p.message_id) LIMIT $2)",
+    ),
+    *(
+        (
+            "RETENTION_GAMES_DAYS", 30, table,
+            f"DELETE FROM {table} WHERE game_id IN ("
+            f" SELECT game_id FROM {table} WHERE finished AND created_at < $1 LIMIT $2)",
+        )
+        for table in ("games_connect4", "games_hangman", "games_scramble", "games_wyr")
+    ),
+    (
+        "RETENTION_ROLLUP_DAYS", 180, "channel_activity_weekly",
+        "DELETE FROM channel_activity_weekly WHERE ctid IN ("
+        " SELECT ctid FROM channel_activity_weekly WHERE week_start < $1::date LIMIT $2)",
+    ),
+    (
+        "RETENTION_ROLLUP_DAYS", 180, "activity_weekly",
+        "DELETE FROM activity_weekly WHERE ctid IN ("
+        " SELECT ctid FROM activity_weekly WHERE week_start < $1::date LIMIT $2)",
+    ),
+)
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def partition_name(table: str, start: date) -> str:
+    return f"{table}_p{start:%Y%m}"
+
+
+def _parse_partition(table: str, name: str) -> Optional[date]:
+    suffix = name[len(table) + 2:] if name.startswith(f"{table}_p") else ""
+    try:
+        return datetime.strptime(suffix, "%Y%m").date()
+    except ValueError:
+        return None
+
+
+async def _ensure_month(conn, spec: PartitionedTable, start: date) -> None:
+    end = add_months(start, 1)
+    await conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(spec.name, start)} PARTITION OF {spec.name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+async def ensure_partitions(conn, spec: PartitionedTable, *, months_ahead: int = MONTHS_AHEAD) -> None:
+    """Create monthly partitions from this month through `months_ahead` months out."""
+    start = month_start(datetime.now(timezone.utc).date())
+    last = add_months(start, months_ahead)
+    while start <= last:
+        await _ensure_month(conn, spec, start)
+        start = add_months(start, 1)
+
+
+async def drop_expired_partitions(conn, spec: PartitionedTable, today: date, *, detach_only: bool = False) -> List[str]:
+    days = _days(spec.retention_env, spec.retention_default)
+    if not days:
+        return []
+    cutoff = today - timedelta(days=days)
+    rows = await conn.fetch(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass($1)",
+        spec.name,
+    )
+    removed = []
+    for r in rows:
+        start = _parse_partition(spec.name, r[0])
+        # Only whole months that ended before the cutoff
+        if start is None or add_months(start, 1) > cutoff:
+            continue
+        await conn.execute(f"ALTER TABLE {spec.name} DETACH PARTITION {r[0]}")
+        if not detach_only:
+            await conn.execute(f"DROP TABLE {r[0]}")
+        removed.append(r[0])
+    return removed
+
+
+async def delete_expired_rows(conn, today: date) -> Dict[str, int]:
+    deleted: Dict[str, int] = {}
+    for env, default, table, sql in ROW_RETENTION:
+        days = _days(env, default)
+        if not days:
+            continue
+        cutoff = datetime.combine(today - timedelta(days=days), datetime.min.time(), tzinfo=timezone.utc)
+        total = 0
+        # Short batches keep locks and WAL bursts small on large tables
+        while True:
+            status = await conn.execute(sql, cutoff, DELETE_BATCH)
+            n = int(status.split()[-1]) if status else 0
+            total += n
+            if n < DELETE_BATCH:
+                break
+        if total:
+            deleted[table] = total
+    return deleted
+
+
+def next_run_time(after: datetime) -> datetime:
+    slot = after.replace(hour=HOUSEKEEPING_HOUR, minute=0, second=0, microsecond=0)
+    return slot if slot > after else slot + timedelta(days=1)
+
+
+class Housekeeping(commands.Cog):
+    """Daily partition upkeep and retention."""
+
+    TIMER_KIND = "housekeeping"
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        bot.scheduler.register(self.TIMER_KIND, self._on_timer)  # type: ignore[attr-defined]
+
+    async def upkeep_partitions(self) -> None:
+        """Create this month's and upcoming partitions (covers long downtimes)."""
+        pool = getattr(self.bot, "pool", None)
+        if pool is None:
+            return
+        async with pool.acquire() as conn:
+            for spec in PARTITIONED:
+                try:
+                    await ensure_partitions(conn, spec)
+                except Exception as e:
+                    log.error(f"[HK] Partition upkeep failed for {spec.name}: {e}")
+
+    async def ensure_scheduled(self) -> None:
+        if self.bot.scheduler.fire_time(self.TIMER_KIND, 0) is None:  # type: ignore[attr-defined]
+            await self.bot.scheduler.schedule(self.TIMER_KIND, 0, next_run_time(datetime.now(timezone.utc)))  # type: ignore[attr-defined]
+
+    async def _on_timer(self, ref_id: int, payload: dict) -> None:
+        now = datetime.now(timezone.utc)
+        await self.bot.scheduler.schedule(self.TIMER_KIND, 0, next_run_time(now))  # type: ignore[attr-defined]
+        await self.run(now.date())
+
+    async def run(self, today: date) -> None:
+        pool = getattr(self.bot, "pool", None)
+        if pool is None:
+            return
+        detach_only = os.getenv("HOUSEKEEPING_DETACH_ONLY", "0") == "1"
+        await self.upkeep_partitions()
+        async with pool.acquire() as conn:
+            for spec in PARTITIONED:
+                try:
+                    removed = await drop_expired_partitions(conn, spec, today, detach_only=detach_only)
+                    if removed:
+                        verb = "Detached" if detach_only else "Dropped"
+                        log.info(f"[HK] {verb} {len(removed)} partition(s) of {spec.name}: {', '.join(removed)}")
+                except Exception as e:
+                    log.error(f"[HK] Partition upkeep failed for {spec.name}: {e}")
+            try:
+                deleted = await delete_expired_rows(conn, today)
+                if deleted:
+                    log.info("[HK] Pruned " + ", ".join(f"{t}={n}" for t, n in deleted.items()))
+            except Exception as e:
+                log.error(f"[HK] Retention pass failed: {e}")
+
+
+async def setup(bot: commands.Bot):
+    cog = Housekeeping(bot)
+    await bot.add_cog(cog)
+    await cog.upkeep_partitions()
+    await cog.ensure_scheduled()
@@ -0,0 +1,131 @@
+"""
+Pulling JSON objects out of free-form model output.
+
+Models wrap their JSON in markdown fences, prose, or an R1-style
+`<think>...</think>` preamble, and sometimes stop mid-object when they run
+out of tokens. `extract_object()` finds balanced `{...}` spans left to
+right: between objects it jumps to the next `{`, inside one a regex with
+possessive quantifiers steps over whole string literals and stops only at
+braces, so nested objects and braces inside strings are handled correctly
+(unlike `\\{.*?\\}`). A span that does not parse (a stray `{` or quote in
+prose) is retried from just past its opening brace.
+
+`loads` is orjson's when it is installed, the standard library's otherwise.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Iterable, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+if orjson is not None:
+    loads = orjson.loads
+else:
+    loads = json.loads
+
+# orjson.JSONDecodeError is a ValueError, like json.JSONDecodeError
+DecodeError = ValueError
+
+# Inside an object: a whole string literal (possessive, so it never backtracks), a brace,
+# or the lone quote of a string the text cuts off
+_INSIDE = re.compile(r'"(?:[^"\\]++|\\.)*+"|[{}]|"', re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_THINK_END = "</think>"
+
+
+def next_span(text: str, pos: int = 0) -> Optional[Tuple[int, int, str]]:
+    """(start, end, closer) of the first `{...}` starting at or after `pos`, or None.
+
+    `closer` is empty for a balanced span. If the text ends inside the
+    object, the span runs to the end and `closer` holds the quote and braces
+    that would close it.
+    """
+    begin = text.find("{", pos)
+    if begin < 0:
+        return None
+    depth = 1
+    pos = begin + 1
+    while depth:
+        m = _INSIDE.search(text, pos)
+        if m is None:
+            return begin, len(text), "}" * depth
+        token = m.group()
+        if token == "{":
+            depth += 1
+        elif token == "}":
+            depth -= 1
+        elif token == '"':
+            # Unterminated string: the text ends mid-value
+            return begin, len(text), '"' + "}" * depth
+        pos = m.end()
+    return begin, pos, ""
+
+
+def _parse(text: str, start: int, end: int, closer: str, keys: Tuple[str, ...]) -> Optional[dict]:
+    candidate = text[start:end]
+    # Cheap substring test first: most stray objects in prose never reach the parser
+    if keys and not any(f'"{k}"' in candidate for k in keys):
+        return None
+    if closer:
+        # Output cut off by max_tokens: close the open string and braces
+        if not closer.startswith('"'):
+            candidate = candidate.rstrip().rstrip(",")
+        candidate += closer
+    for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+        try:
+            value = loads(attempt)
+        except DecodeError:
+            continue
+        if isinstance(value, dict) and (not keys or any(k in value for k in keys)):
+            return value
+        return None
+    return None
+
+
+def _first(text: str, start: int, stop: int, keys: Tuple[str, ...]) -> Optional[dict]:
+    pos = start
+    while True:
+        span = next_span(text, pos)
+        if span is None or span[0] >= stop:
+            return None
+        begin, end, closer = span
+        if keys and not any(f'"{k}"' in text[begin:end] for k in keys):
+            # Nothing inside can match either
+            if closer:
+                return None
+            pos = end
+            continue
+        value = _parse(text, begin, end, closer, keys)
+        if value is not None:
+            return value
+        # A stray "{" or quote in prose swallowed what follows: retry just past it
+        pos = begin + 1
+
+
+def extract_object(text: str, keys: Iterable[str] = ()) -> Optional[dict]:
+    """First JSON object in `text` that parses (and has one of `keys`, if given).
+
+    Objects after a `</think>` preamble win over objects inside it, so a
+    model "thinking out loud" in JSON does not shadow its actual answer;
+    the preamble is only scanned when the answer has no object.
+    """
+    if not text:
+        return None
+    keys = tuple(keys)
+    stripped = text.strip()
+    if stripped.startswith("{") and stripped.endswith("}"):
+        # Fast path: the whole response is the object (response_format json_object)
+        value = _parse(stripped, 0, len(stripped), "", keys)
+        if value is not None:
+            return value
+    think_end = text.rfind(_THINK_END)
+    if think_end < 0:
+        return _first(text, 0, len(text), keys)
+    answer_from = think_end + len(_THINK_END)
+    return _first(text, answer_from, len(text), keys) or _first(text, 0, answer_from, keys)
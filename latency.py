@@ -0,0 +1,149 @@
+"""
+Constant-memory latency statistics shared by inference, DB queries and commands.
+
+Each series (`tracker("inference")`, ...) keeps:
+- a log-bucketed histogram (HDR-style, ~2% relative error) per 10-second
+  slot for the last hour, merged on demand for p50/p95/p99 over sliding
+  windows (1m, 5m, 1h);
+- an exponentially weighted mean and lifetime count/sum/max.
+
+Memory is bounded by the slot count times the number of buckets, whatever the
+request rate; recording a sample is O(1).
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+# Relative bucket width; reported percentiles are within ~PRECISION of the true value
+PRECISION = 0.02
+MIN_MS = 0.01
+MAX_MS = 600_000.0
+SLOT_SECONDS = 10
+HORIZON_SECONDS = 3600
+WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+QUANTILES = (0.5, 0.95, 0.99)
+EWMA_ALPHA = 0.1
+
+_LOG_BASE = math.log1p(PRECISION)
+_MAX_INDEX = int(math.log(MAX_MS / MIN_MS) / _LOG_BASE) + 1
+
+
+def _index(ms: float) -> int:
+    if ms <= MIN_MS:
+        return 0
+    return min(int(math.log(ms / MIN_MS) / _LOG_BASE) + 1, _MAX_INDEX)
+
+
+def _value(index: int) -> float:
+    # Geometric midpoint of the bucket
+    if index == 0:
+        return MIN_MS
+    return MIN_MS * math.exp((index - 0.5) * _LOG_BASE)
+
+
+class LatencyHistogram:
+    """Sparse log-bucketed histogram of millisecond values."""
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+
+    def add(self, ms: float) -> None:
+        i = _index(ms)
+        self.counts[i] = self.counts.get(i, 0) + 1
+        self.total += 1
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for i, c in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + c
+        self.total += other.total
+
+    def quantiles(self, qs: Iterable[float] = QUANTILES) -> Dict[float, float]:
+        if not self.total:
+            return {}
+        out: Dict[float, float] = {}
+        targets = sorted(qs)
+        running = 0
+        t = 0
+        for i in sorted(self.counts):
+            running += self.counts[i]
+            while t < len(targets) and running >= math.ceil(targets[t] * self.total):
+                out[targets[t]] = _value(i)
+                t += 1
+            if t == len(targets):
+                break
+        return out
+
+
+class LatencyStats:
+    def __init__(self, name: str, slot_seconds: int = SLOT_SECONDS, horizon_seconds: int = HORIZON_SECONDS):
+        self.name = name
+        self.slot_seconds = slot_seconds
+        self._slots: Deque[Tuple[int, LatencyHistogram]] = deque(maxlen=max(1, horizon_seconds // slot_seconds))
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.ewma: Optional[float] = None
+
+    def record(self, ms: float, now: Optional[float] = None) -> None:
+        slot = int((time.monotonic() if now is None else now) // self.slot_seconds)
+        if not self._slots or self._slots[-1][0] != slot:
+            self._slots.append((slot, LatencyHistogram()))
+        self._slots[-1][1].add(ms)
+        self.count += 1
+        self.sum_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.ewma = ms if self.ewma is None else self.ewma + EWMA_ALPHA * (ms - self.ewma)
+
+    def window(self, seconds: int, now: Optional[float] = None) -> LatencyHistogram:
+        oldest = int((time.monotonic() if now is None else now) // self.slot_seconds) - seconds // self.slot_seconds
+        merged = LatencyHistogram()
+        for slot, hist in reversed(self._slots):
+            if slot <= oldest:
+                break
+            merged.merge(hist)
+        return merged
+
+    def percentiles(self, seconds: int = 300, now: Optional[float] = None) -> Dict[str, float]:
+        """{"p50": ms, "p95": ms, "p99": ms} over the last `seconds`; empty when there were no samples."""
+        return {f"p{round(q * 100)}": v for q, v in self.window(seconds, now).quantiles(QUANTILES).items()}
+
+    def snapshot(self, now: Optional[float] = None) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum_ms / self.count, 3) if self.count else 0.0,
+            "ewma_ms": round(self.ewma, 3) if self.ewma is not None else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "windows": {
+                label: {k: round(v, 3) for k, v in self.percentiles(seconds, now).items()}
+                for label, seconds in WINDOWS.items()
+            },
+        }
+
+
+_TRACKERS: Dict[str, LatencyStats] = {}
+
+
+def tracker(name: str) -> LatencyStats:
+    stats = _TRACKERS.get(name)
+    if stats is None:
+        stats = _TRACKERS[name] = LatencyStats(name)
+    return stats
+
+
+def trackers() -> Dict[str, LatencyStats]:
+    return dict(_TRACKERS)
+
+
+def format_percentiles(stats: LatencyStats, seconds: int = 300) -> str:
+    p = stats.percentiles(seconds)
+    if not p:
+        return "No samples"
+    return " / ".join(f"{k} {v:.0f}ms" for k, v in p.items())
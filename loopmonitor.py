@@ -0,0 +1,171 @@
+"""
+Event-loop lag sampler and slow-callback detector.
+
+A heartbeat callback runs on the loop every `LOOP_MONITOR_INTERVAL_MS`; how
+late it fires is the loop lag, recorded in the shared "loop_lag" latency
+tracker. A watchdog thread watches the heartbeat: if the loop has not come
+back for longer than `LOOP_SLOW_CALLBACK_MS`, it snapshots the loop thread's
+stack (i.e. whatever is blocking) and, once the loop resumes, records the
+stall under the innermost FrostMod frame. The worst offenders are kept in a
+bounded table.
+
+Started in `setup_hook` as `bot.loop_monitor`; `/status details:True` shows
+the results together with pending tasks per cog.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import latency
+from metrics import REGISTRY
+
+log = logging.getLogger("frostmod")
+
+INTERVAL = int(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100")) / 1000
+SLOW_THRESHOLD = int(os.getenv("LOOP_SLOW_CALLBACK_MS", "100")) / 1000
+MAX_SLOW_ENTRIES = 50
+STACK_DEPTH = 12
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOOP_LAG = latency.tracker("loop_lag")
+STALLS = REGISTRY.counter("frostmod_loop_stalls_total", "Event-loop stalls longer than LOOP_SLOW_CALLBACK_MS")
+
+
+@dataclass
+class SlowCallback:
+    where: str
+    stack: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+def _culprit(frame) -> str:
+    """Innermost frame from FrostMod's own code (or the innermost frame at all)."""
+    innermost = None
+    while frame is not None:
+        if innermost is None:
+            innermost = frame
+        if frame.f_code.co_filename.startswith(_PROJECT_DIR) and not frame.f_code.co_filename.endswith("loopmonitor.py"):
+            break
+        frame = frame.f_back
+    frame = frame or innermost
+    if frame is None:
+        return "unknown"
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}:{frame.f_lineno}"
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = INTERVAL, threshold: float = SLOW_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.slow: Dict[str, SlowCallback] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._beat = 0.0
+        self._expected = 0.0
+        # Stall captured by the watchdog and not yet finished: (beat it started after, where, stack)
+        self._stall: Optional[Tuple[float, str, str]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._expected = self._beat + self.interval
+        self._handle = self._loop.call_later(self.interval, self._heartbeat)
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        log.info(f"[LOOP] Monitoring event loop (lag every {self.interval * 1000:.0f} ms, slow > {self.threshold * 1000:.0f} ms)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _heartbeat(self) -> None:
+        now = time.monotonic()
+        LOOP_LAG.record(max(0.0, now - self._expected) * 1000)
+        with self._lock:
+            stall, self._stall = self._stall, None
+            previous, self._beat = self._beat, now
+        if stall is not None and stall[0] == previous:
+            self._record_slow(stall[1], stall[2], (now - previous - self.interval) * 1000)
+        self._expected = now + self.interval
+        self._handle = self._loop.call_later(self.interval, self._heartbeat)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            with self._lock:
+                beat = self._beat
+                if self._stall is not None and self._stall[0] == beat:
+                    continue
+            if time.monotonic() - beat < self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            where = _culprit(frame)
+            stack = "".join(traceback.format_stack(frame, limit=STACK_DEPTH))
+            with self._lock:
+                # Only if the loop is still stuck on the same beat
+                if self._beat == beat:
+                    self._stall = (beat, where, stack)
+
+    def _record_slow(self, where: str, stack: str, duration_ms: float) -> None:
+        STALLS.inc()
+        entry = self.slow.get(where)
+        if entry is None:
+            if len(self.slow) >= MAX_SLOW_ENTRIES:
+                # Evict the least severe entry to stay bounded
+                weakest = min(self.slow.values(), key=lambda e: e.max_ms)
+                if weakest.max_ms >= duration_ms:
+                    return
+                del self.slow[weakest.where]
+            entry = self.slow[where] = SlowCallback(where, stack)
+        entry.count += 1
+        entry.total_ms += duration_ms
+        if duration_ms >= entry.max_ms:
+            entry.max_ms = duration_ms
+            entry.stack = stack
+        log.warning(f"[LOOP] Event loop blocked for {duration_ms:.0f} ms in {where}")
+
+    def top_slow(self, limit: int = 5) -> List[SlowCallback]:
+        return sorted(self.slow.values(), key=lambda e: e.total_ms, reverse=True)[:limit]
+
+
+def pending_tasks_by_cog(bot) -> Counter:
+    """Count pending asyncio tasks by the cog whose code they are suspended in."""
+    modules = {type(cog).__module__: name for name, cog in bot.cogs.items()}
+    counts: Counter = Counter()
+    for task in asyncio.all_tasks():
+        if task.done():
+            continue
+        owner = "other"
+        # Walk the await chain from the task's coroutine inwards
+        coro = task.get_coro()
+        while coro is not None:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+            if frame is not None and frame.f_globals.get("__name__") in modules:
+                owner = modules[frame.f_globals["__name__"]]
+                break
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+        counts[owner] += 1
+    return counts
@@ -0,0 +1,347 @@
+"""
+In-process metrics for FrostMod, exposed in Prometheus text format.
+
+A small registry of counters, gauges and fixed-bucket histograms. Recording a
+sample is a dict lookup plus a bisect, so instrumentation is cheap enough for
+the message hot path.
+
+`instrument_bot(bot)` hooks in before extensions load:
+- every cog listener (time and errors per event/listener)
+- Discord REST calls (time and errors per method/route template)
+
+Gateway events are counted by `InstrumentedBot.dispatch`: the connection state
+keeps its own reference to the bot's `dispatch`, so only an override in the
+class sees them (rebinding the attribute on the instance does not).
+
+App commands are timed by the command tree (see `extensions.LazyCommandTree`).
+DB pool acquire waits and per-query times are recorded by `db.py`. AI
+inference latency is recorded by the AI moderation cog.
+
+`MetricsServer` serves `/metrics` on 127.0.0.1 only (METRICS_HOST, METRICS_PORT;
+METRICS_PORT=0 disables it).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import discord
+from aiohttp import web
+from discord.ext import commands
+
+import latency
+
+log = logging.getLogger("frostmod")
+
+# Seconds; covers sub-millisecond listeners up to slow inference calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in self._values.items()]
+
+
+class Gauge(Metric):
+    """Gauge set by the caller, or computed at scrape time when `fn` is given."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._fn = fn
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def samples(self) -> List[str]:
+        if self._fn is not None:
+            try:
+                value = self._fn()
+            except Exception:
+                return []
+            return [] if value is None else [f"{self.name} {_format_value(value)}"]
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in self._values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def total_count(self) -> int:
+        """Observations across all label sets."""
+        return sum(series[2] for series in self._series.values())
+
+    def samples(self) -> List[str]:
+        out = []
+        for labels, (counts, total, n) in self._series.items():
+            running = 0
+            for bound, c in zip(self.buckets + (math.inf,), counts):
+                running += c
+                le = f'le="{_format_value(bound)}"'
+                out.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {running}")
+            out.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            out.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {n}")
+        return out
+
+
+class LatencySummaries(Metric):
+    """Exports the shared latency trackers (see latency.py) as windowed quantiles."""
+
+    kind = "gauge"
+
+    def samples(self) -> List[str]:
+        out = []
+        for name, stats in latency.trackers().items():
+            for window, seconds in latency.WINDOWS.items():
+                for q, value in stats.window(seconds).quantiles(latency.QUANTILES).items():
+                    labels = _format_labels(("series", "window", "quantile"), (name, window, _format_value(q)))
+                    out.append(f"{self.name}{labels} {_format_value(round(value, 3))}")
+        return out
+
+    def render(self) -> List[str]:
+        ewma = f"{self.name.removesuffix('_ms')}_ewma_ms"
+        lines = super().render() + [f"# HELP {ewma} Exponentially weighted mean latency (ms)", f"# TYPE {ewma} gauge"]
+        for name, stats in latency.trackers().items():
+            if stats.ewma is not None:
+                lines.append(f'{ewma}{{series="{_escape(name)}"}} {_format_value(round(stats.ewma, 3))}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (), fn: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames, fn=fn)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.setdefault(metric.name, metric)
+        return self._metrics[metric.name]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+EVENTS = REGISTRY.counter("frostmod_gateway_events_total", "Gateway events dispatched", ("event",))
+LISTENER_SECONDS = REGISTRY.histogram("frostmod_listener_seconds", "Cog listener run time", ("event", "listener"))
+LISTENER_ERRORS = REGISTRY.counter("frostmod_listener_errors_total", "Cog listener exceptions", ("event", "listener"))
+COMMAND_SECONDS = REGISTRY.histogram("frostmod_command_seconds", "App command handling time", ("command",))
+COMMANDS = REGISTRY.counter("frostmod_commands_total", "App command invocations", ("command", "status"))
+DB_ACQUIRE_SECONDS = REGISTRY.histogram("frostmod_db_acquire_seconds", "Time waiting for a pooled DB connection")
+DB_QUERY_SECONDS = REGISTRY.histogram("frostmod_db_query_seconds", "DB query time", ("query",))
+DB_QUERY_ERRORS = REGISTRY.counter("frostmod_db_query_errors_total", "DB query exceptions", ("query",))
+DB_SLOW_QUERIES = REGISTRY.counter("frostmod_db_slow_queries_total", "DB queries slower than DB_SLOW_QUERY_MS", ("query",))
+INFERENCE_SECONDS = REGISTRY.histogram("frostmod_inference_seconds", "AI inference request latency")
+AI_TTFT_SECONDS = REGISTRY.histogram("frostmod_ai_ttft_seconds", "Time to first streamed token")
+REST_SECONDS = REGISTRY.histogram("frostmod_discord_rest_seconds", "Discord REST call time", ("method", "route"))
+REST_ERRORS = REGISTRY.counter("frostmod_discord_rest_errors_total", "Discord REST call failures", ("method", "route", "status"))
+REGISTRY.register(LatencySummaries("frostmod_latency_ms", "Latency quantiles over sliding windows (ms)"))
+
+
+def _listener_name(func) -> str:
+    owner = getattr(func, "__self__", None)
+    if owner is not None:
+        return f"{type(owner).__name__}.{func.__name__}"
+    return getattr(func, "__qualname__", repr(func))
+
+
+def _timed_listener(func, event: str):
+    listener = _listener_name(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            LISTENER_ERRORS.inc(event, listener)
+            raise
+        finally:
+            LISTENER_SECONDS.observe(time.perf_counter() - started, event, listener)
+
+    wrapper.__metrics_wrapped__ = func
+    return wrapper
+
+
+class InstrumentedBot(commands.Bot):
+    """`commands.Bot` that counts every dispatched event in `frostmod_gateway_events_total`."""
+
+    def dispatch(self, event_name: str, /, *args, **kwargs) -> None:
+        EVENTS.inc(event_name)
+        super().dispatch(event_name, *args, **kwargs)
+
+
+def instrument_bot(bot) -> None:
+    """Install listener and REST instrumentation; call before any cog is added."""
+    add_listener = bot.add_listener
+    remove_listener = bot.remove_listener
+    request = bot.http.request
+
+    def instrumented_add_listener(func, name=discord.utils.MISSING):
+        name = func.__name__ if name is discord.utils.MISSING else name
+        add_listener(_timed_listener(func, name), name)
+
+    def instrumented_remove_listener(func, name=discord.utils.MISSING):
+        name = func.__name__ if name is discord.utils.MISSING else name
+        for registered in list(bot.extra_events.get(name, ())):
+            if getattr(registered, "__metrics_wrapped__", registered) == func:
+                remove_listener(registered, name)
+                return
+        remove_listener(func, name)
+
+    async def instrumented_request(route, **kwargs):
+        method, path = route.method, route.path
+        started = time.perf_counter()
+        try:
+            return await request(route, **kwargs)
+        except discord.HTTPException as e:
+            REST_ERRORS.inc(method, path, str(e.status))
+            raise
+        except Exception:
+            REST_ERRORS.inc(method, path, "error")
+            raise
+        finally:
+            REST_SECONDS.observe(time.perf_counter() - started, method, path)
+
+    bot.add_listener = instrumented_add_listener
+    bot.remove_listener = instrumented_remove_listener
+    bot.http.request = instrumented_request
+
+    REGISTRY.gauge("frostmod_uptime_seconds", "Seconds since start", fn=lambda: (discord.utils.utcnow() - bot.start_time).total_seconds())
+    REGISTRY.gauge("frostmod_gateway_latency_seconds", "Websocket heartbeat latency", fn=lambda: bot.latency if math.isfinite(bot.latency) else None)
+    REGISTRY.gauge("frostmod_guilds", "Guilds the bot is in", fn=lambda: len(bot.guilds))
+    REGISTRY.gauge("frostmod_asyncio_tasks", "Pending asyncio tasks", fn=lambda: len(asyncio.all_tasks()))
+    REGISTRY.gauge("frostmod_db_pool_size", "Open pooled DB connections", fn=lambda: bot.pool.get_size() if getattr(bot, "pool", None) else None)
+    REGISTRY.gauge("frostmod_db_pool_idle", "Idle pooled DB connections", fn=lambda: bot.pool.get_idle_size() if getattr(bot, "pool", None) else None)
+
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry = REGISTRY):
+        self.registry = registry
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.registry.render().encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    async def start(self) -> None:
+        port = int(os.getenv("METRICS_PORT", "9464"))
+        if port <= 0:
+            return
+        host = os.getenv("METRICS_HOST", "127.0.0.1")
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, host, port).start()
+        except OSError as e:
+            log.warning(f"[METRICS] Could not bind {host}:{port}: {e}")
+            await self._runner.cleanup()
+            self._runner = None
+            return
+        log.info(f"[METRICS] Serving http://{host}:{port}/metrics")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
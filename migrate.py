@@ -0,0 +1,174 @@
+"""
+Versioned schema migrations for FrostMod.
+
+Migrations live in `migrations/` as `NNNN_description.sql` or
+`NNNN_description.py` (the latter defines `async def upgrade(conn)`), and are
+applied in version order. Each one runs in its own transaction and is recorded
+in `schema_version` with a SHA-256 checksum of the file, so an applied
+migration that was edited afterwards is reported instead of silently skipped.
+
+When the database is already up to date, startup costs one query. Otherwise
+the runner takes a Postgres advisory lock before applying anything, so several
+bot processes can start at once without racing each other.
+
+Manual use (same .env as the bot):
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied / pending migrations
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import asyncpg
+
+log = logging.getLogger("migrate")
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+# pg_advisory_lock key: "FROSTMIG" as a 64-bit integer
+LOCK_KEY = int.from_bytes(b"FROSTMIG", "big")
+_NAME_RE = re.compile(r"^(\d+)_([\w-]+)\.(sql|py)$")
+
+SCHEMA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+    checksum: str
+
+    async def apply(self, conn) -> None:
+        if self.path.suffix == ".sql":
+            await conn.execute(self.path.read_text(encoding="utf-8"))
+            return
+        spec = importlib.util.spec_from_file_location(f"frostmod_migration_{self.version:04d}", self.path)
+        module = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
+        spec.loader.exec_module(module)  # type: ignore[union-attr]
+        await module.upgrade(conn)
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    migrations: Dict[int, Migration] = {}
+    for path in sorted(directory.iterdir()):
+        m = _NAME_RE.match(path.name)
+        if not m:
+            continue
+        version = int(m.group(1))
+        if version in migrations:
+            raise MigrationError(f"Duplicate migration version {version}: {migrations[version].path.name}, {path.name}")
+        checksum = hashlib.sha256(path.read_bytes()).hexdigest()
+        migrations[version] = Migration(version, m.group(2), path, checksum)
+    return [migrations[v] for v in sorted(migrations)]
+
+
+async def _applied(conn) -> Dict[int, str]:
+    rows = await conn.fetch("SELECT version, checksum FROM schema_version")
+    return {int(r[0]): str(r[1]) for r in rows}
+
+
+def _pending(migrations: List[Migration], applied: Dict[int, str]) -> List[Migration]:
+    drift = [m for m in migrations if m.version in applied and applied[m.version] != m.checksum]
+    if drift and os.getenv("MIGRATIONS_IGNORE_CHECKSUMS", "0") != "1":
+        names = ", ".join(m.path.name for m in drift)
+        raise MigrationError(f"Applied migration(s) changed on disk: {names}. Add a new migration instead of editing an applied one.")
+    return [m for m in migrations if m.version not in applied]
+
+
+async def migrate(conn, migrations: List[Migration] | None = None) -> List[Migration]:
+    """Apply pending migrations; returns the ones applied by this call."""
+    migrations = discover() if migrations is None else migrations
+    # Fast path: one query when nothing is pending
+    try:
+        if not _pending(migrations, await _applied(conn)):
+            return []
+    except asyncpg.UndefinedTableError:
+        pass
+
+    await conn.execute("SELECT pg_advisory_lock($1)", LOCK_KEY)
+    try:
+        await conn.execute(SCHEMA_VERSION_DDL)
+        # Re-read under the lock: another process may have migrated meanwhile
+        todo = _pending(migrations, await _applied(conn))
+        for m in todo:
+            log.info(f"[DB] Applying migration {m.path.name}")
+            async with conn.transaction():
+                await m.apply(conn)
+                await conn.execute(
+                    "INSERT INTO schema_version (version, name, checksum) VALUES ($1, $2, $3)",
+                    m.version,
+                    m.name,
+                    m.checksum,
+                )
+        return todo
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", LOCK_KEY)
+
+
+async def status(conn) -> List[Tuple[Migration, str]]:
+    try:
+        applied = await _applied(conn)
+    except asyncpg.UndefinedTableError:
+        applied = {}
+    out = []
+    for m in discover():
+        if m.version not in applied:
+            state = "pending"
+        elif applied[m.version] != m.checksum:
+            state = "applied (changed on disk!)"
+        else:
+            state = "applied"
+        out.append((m, state))
+    return out
+
+
+async def _main() -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="FrostMod schema migrations")
+    parser.add_argument("--status", action="store_true", help="Show applied and pending migrations")
+    args = parser.parse_args()
+    conn = await asyncpg.connect(
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME"),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", "5432")),
+    )
+    try:
+        if args.status:
+            for m, state in await status(conn):
+                print(f"{m.version:04d} {m.name:<40} {state}")
+        else:
+            applied = await migrate(conn)
+            print(f"Applied {len(applied)} migration(s)" + (": " + ", ".join(m.path.name for m in applied) if applied else ""))
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(_main())
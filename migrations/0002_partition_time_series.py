@@ -0,0 +1,92 @@
+"""Range-partition user_activity_daily and ai_mod_acknowledgments by month.
+
+Creates the partitioned parents on fresh databases and converts the plain
+tables left by older versions, with partitions through a few months ahead.
+Everything is spelled out here so the migration stays frozen; later
+partitions are created by housekeeping.py, which expects the same
+`<table>_pYYYYMM` naming.
+"""
+
+from datetime import date, datetime, timezone
+
+MONTHS_AHEAD = 3
+
+# (table, partition column, columns copied from a legacy table, DDL, indexes)
+TABLES = (
+    (
+        "user_activity_daily",
+        "day",
+        "guild_id, user_id, day, messages, voice_joins, voice_seconds",
+        """
+        CREATE TABLE IF NOT EXISTS user_activity_daily (
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            day DATE NOT NULL,
+            messages BIGINT NOT NULL DEFAULT 0,
+            voice_joins BIGINT NOT NULL DEFAULT 0,
+            voice_seconds BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, user_id, day)
+        ) PARTITION BY RANGE (day)
+        """,
+        ("CREATE INDEX IF NOT EXISTS idx_user_activity_daily_guild_day ON user_activity_daily (guild_id, day)",),
+    ),
+    (
+        "ai_mod_acknowledgments",
+        "created_at",
+        "guild_id, user_id, response_type, created_at",
+        """
+        CREATE TABLE IF NOT EXISTS ai_mod_acknowledgments (
+            guild_id BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            response_type TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (guild_id, user_id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """,
+        (),
+    ),
+)
+
+
+def _add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+async def _create_partitions(conn, table: str, first: date) -> None:
+    start = first.replace(day=1)
+    last = _add_months(datetime.now(timezone.utc).date(), MONTHS_AHEAD)
+    while start <= last:
+        end = _add_months(start, 1)
+        await conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_p{start:%Y%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        start = end
+
+
+async def _convert_legacy(conn, table: str, column: str, columns: str, ddl: str) -> None:
+    legacy = f"{table}_legacy"
+    await conn.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    # Index names are schema-wide; free them for the new parent
+    for idx in await conn.fetch("SELECT indexname FROM pg_indexes WHERE tablename = $1", legacy):
+        await conn.execute(f'ALTER INDEX "{idx[0]}" RENAME TO "{idx[0]}_legacy"')
+    await conn.execute(ddl)
+    lo = await conn.fetchval(f"SELECT MIN({column}) FROM {legacy}")
+    if isinstance(lo, datetime):
+        lo = lo.date()
+    await _create_partitions(conn, table, lo or datetime.now(timezone.utc).date())
+    await conn.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}")
+    await conn.execute(f"DROP TABLE {legacy}")
+
+
+async def upgrade(conn) -> None:
+    for table, column, columns, ddl, indexes in TABLES:
+        kind = await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass($1)", table)
+        if kind == "r":
+            await _convert_legacy(conn, table, column, columns, ddl)
+        else:
+            await conn.execute(ddl)
+            await _create_partitions(conn, table, datetime.now(timezone.utc).date())
+        for index in indexes:
+            await conn.execute(index)
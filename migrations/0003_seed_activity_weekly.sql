@@ -0,0 +1,7 @@
+-- Seed the current week on installs that predate the rollup
+INSERT INTO activity_weekly (guild_id, week_start, messages, voice_joins, voice_seconds)
+SELECT guild_id, date_trunc('week', day)::date, SUM(messages), SUM(voice_joins), SUM(voice_seconds)
+FROM user_activity_daily
+WHERE day >= date_trunc('week', NOW() AT TIME ZONE 'UTC')::date
+GROUP BY 1, 2
+ON CONFLICT (guild_id, week_start) DO NOTHING;
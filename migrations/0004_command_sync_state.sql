@@ -0,0 +1,6 @@
+-- Fingerprint of the app-command tree last synced per scope ('global' or 'guild:<id>')
+CREATE TABLE IF NOT EXISTS command_sync_state (
+    scope TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    synced_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import random
-from typing import Optional
+from dataclasses import dataclass
+from typing import Optional, Set
 import json
 
 import discord
@@ -9,7 +12,16 @@ from discord import app_commands
 from discord.app_commands import checks
 from discord.ext import commands
 
+import connect4 as c4engine
 from branding import BRAND_COLOR, FOOTER_TEXT
+from scheduler import message_ref, spawn
+
+log = logging.getLogger("frostmod")
+# Connect 4 AI turns run in the background; referenced here until they finish
+_c4_tasks: Set[asyncio.Task] = set()
+
+# Depth for the in-process fallback when the worker search fails (a few ms)
+C4_FALLBACK_DEPTH = 4
 
 
 class RPSView(discord.ui.View):
@@ -164,8 +176,8 @@ def _c4_embed_from_state(grid: list[list[str]], turn: Optional[int], winner: Opt
 
 
 class C4PersistentView(discord.ui.View):
-    COLS = 7
-    ROWS = 6
+    COLS = c4engine.WIDTH
+    ROWS = c4engine.HEIGHT
 
     def __init__(self, game_id: int, finished: bool = False, p1: Optional[int] = None, p2: Optional[int] = None):
         super().__init__(timeout=None)  # persistent
@@ -176,30 +188,147 @@ class C4PersistentView(discord.ui.View):
         if finished and p1 and p2:
             self.add_item(C4RematchButton(game_id, p1, p2))
 
-    @staticmethod
-    async def load_state(interaction: discord.Interaction, game_id: int):
-        pool = getattr(interaction.client, "pool", None)
-        if pool is None:
-            return None
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT guild_id, channel_id, message_id, p1, p2, turn, winner, grid, finished FROM games_connect4 WHERE game_id=$1",
-                game_id,
-            )
-        return row
-
-    @staticmethod
-    async def save_state(interaction: discord.Interaction, game_id: int, *, grid, turn, winner, finished: bool):
-        pool = getattr(interaction.client, "pool", None)
-        async with pool.acquire() as conn:
-            await conn.execute(
-                "UPDATE games_connect4 SET grid=$1::jsonb, turn=$2, winner=$3, finished=$4 WHERE game_id=$5",
-                json.dumps(grid),
-                turn,
-                winner,
-                finished,
-                game_id,
-            )
+
+@dataclass
+class C4Game:
+    game_id: int
+    channel_id: int
+    message_id: int
+    p1: int
+    p2: int
+    turn: int
+    winner: Optional[int] = None
+    # Bitboards for X (p1) and O (p2); see connect4.py for the layout
+    x: int = 0
+    o: int = 0
+    finished: bool = False
+
+
+C4_INSERT_SQL = (
+    "INSERT INTO games_connect4 (guild_id, channel_id, message_id, p1, p2, turn, winner, bb_x, bb_o, finished) "
+    "VALUES ($1,$2,$3,$4,$5,$6,NULL,0,0,FALSE) RETURNING game_id"
+)
+C4_SAVE_SQL = "UPDATE games_connect4 SET bb_x=$1, bb_o=$2, grid=NULL, turn=$3, winner=$4, finished=$5 WHERE game_id=$6"
+
+
+async def load_c4_game(client: discord.Client, game_id: int) -> Optional[C4Game]:
+    pool = getattr(client, "pool", None)
+    if pool is None:
+        return None
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            "SELECT channel_id, message_id, p1, p2, turn, winner, finished, bb_x, bb_o, grid FROM games_connect4 WHERE game_id=$1",
+            game_id,
+        )
+    if row is None:
+        return None
+    if row[7] is not None:
+        x, o = int(row[7]), int(row[8] or 0)
+    else:
+        # Rows written before bitboards only have the JSON grid
+        grid = row[9]
+        if isinstance(grid, str):
+            try:
+                grid = json.loads(grid)
+            except Exception:
+                grid = None
+        x, o = c4engine.from_grid(grid) if grid else (0, 0)
+    return C4Game(game_id, int(row[0]), int(row[1]), int(row[2]), int(row[3]), int(row[4]), row[5], x, o, bool(row[6]))
+
+
+async def save_c4_game(client: discord.Client, game: C4Game) -> None:
+    """Queue the board update; a finished game is checkpointed immediately."""
+    args = (game.x, game.o, game.turn, game.winner, game.finished, game.game_id)
+    key = ("games_connect4", game.game_id)
+    if game.finished:
+        await client.write_behind.write_now(key, C4_SAVE_SQL, *args)  # type: ignore[attr-defined]
+    else:
+        client.write_behind.submit(key, C4_SAVE_SQL, *args)  # type: ignore[attr-defined]
+
+
+def _c4_play(game: C4Game, col: int) -> bool:
+    """Drop a piece for the side to move and settle win/draw; False if the column is full."""
+    player = 0 if game.turn == game.p1 else 1
+    try:
+        game.x, game.o = c4engine.drop(game.x, game.o, col, player)
+    except ValueError:
+        return False
+    # Only the mover can have just completed a line
+    if c4engine.has_four(game.x if player == 0 else game.o):
+        game.winner = game.turn
+        game.finished = True
+    elif c4engine.is_full(game.x, game.o):
+        game.winner = 0
+        game.finished = True
+    else:
+        game.turn = game.p2 if player == 0 else game.p1
+    return True
+
+
+async def _c4_render(guild: Optional[discord.Guild], game: C4Game) -> tuple[discord.Embed, C4PersistentView]:
+    thumb = await _avatar_url(guild, game.turn)
+    embed = _c4_embed_from_state(c4engine.to_grid(game.x, game.o), None if game.finished else game.turn, game.winner, thumb_url=thumb)
+    # Keep buttons; disable visually when finished
+    view = C4PersistentView(game.game_id, finished=game.finished, p1=game.p1, p2=game.p2)
+    if game.finished:
+        for c in view.children:
+            if isinstance(c, discord.ui.Button):
+                c.disabled = True
+    return embed, view
+
+
+def _c4_bot_to_move(client: discord.Client, game: C4Game) -> bool:
+    return not game.finished and client.user is not None and game.turn == client.user.id
+
+
+def _c4_fallback_move(game: C4Game, player: int) -> int:
+    try:
+        col, _ = c4engine.best_move(game.x, game.o, player, max_depth=C4_FALLBACK_DEPTH, time_limit=0.05)
+        return col
+    except Exception as e:
+        log.error(f"[C4] Shallow search failed for game {game.game_id}: {e}; playing a random column")
+        mask = game.x | game.o
+        return random.choice([c for c in range(c4engine.WIDTH) if c4engine.can_play(mask, c)])
+
+
+async def _c4_resume_ai_games(client: discord.Client, games: list) -> None:
+    """After a restart, make the bot's pending moves in restored games vs the AI."""
+    await client.wait_until_ready()
+    for game_id, guild_id, turn in games:
+        if client.user is None or turn != client.user.id:
+            continue
+        try:
+            game = await client.games.load("connect4", game_id, lambda: load_c4_game(client, game_id))  # type: ignore[attr-defined]
+            if game is not None and _c4_bot_to_move(client, game):
+                await _c4_ai_turn(client, client.get_guild(guild_id), game_id)
+        except Exception as e:
+            log.error(f"[C4] Could not resume game {game_id}: {e}")
+
+
+async def _c4_ai_turn(client: discord.Client, guild: Optional[discord.Guild], game_id: int) -> None:
+    """Play the bot's move; the search runs in a worker process, off the event loop."""
+    game = client.games.get("connect4", game_id)  # type: ignore[attr-defined]
+    if game is None or not _c4_bot_to_move(client, game):
+        return
+    player = 0 if game.turn == game.p1 else 1
+    try:
+        col, _ = await c4engine.search_async(game.x, game.o, player)
+    except Exception as e:
+        # Never leave the human waiting on a move that will not come
+        log.error(f"[C4] Search failed for game {game_id}: {e}; using a shallow search")
+        col = _c4_fallback_move(game, player)
+    async with client.games.lock("connect4", game_id):  # type: ignore[attr-defined]
+        if not _c4_bot_to_move(client, game) or not _c4_play(game, col):
+            return
+        embed, view = await _c4_render(guild, game)
+        try:
+            await message_ref(client, game.channel_id, game.message_id).edit(embed=embed, view=view)
+        except Exception:
+            pass
+        finally:
+            await save_c4_game(client, game)
+    if game.finished:
+        client.games.drop("connect4", game_id)  # type: ignore[attr-defined]
 
 
 class C4PersistentButton(discord.ui.Button):
@@ -216,76 +345,36 @@ class C4PersistentButton(discord.ui.Button):
             await interaction.response.send_message("Invalid game identifier.", ephemeral=True)
             return
 
-        row = await C4PersistentView.load_state(interaction, game_id)
-        if row is None:
-            await interaction.response.send_message("Game could not be loaded.", ephemeral=True)
-            return
-        if row[8]:  # finished
-            await interaction.response.send_message("This game has finished.", ephemeral=True)
-            return
-
-        p1, p2 = int(row[3]), int(row[4])
-        turn = int(row[5])
-        winner = row[6]
-        grid = row[7]
-        if isinstance(grid, str):
+        client = interaction.client
+        # The move is applied to the in-memory board under the game's lock; the row is written behind
+        async with client.games.lock("connect4", game_id):  # type: ignore[attr-defined]
+            game = await client.games.load("connect4", game_id, lambda: load_c4_game(client, game_id))  # type: ignore[attr-defined]
+            if game is None:
+                await interaction.response.send_message("Game could not be loaded.", ephemeral=True)
+                return
+            if game.finished:
+                await interaction.response.send_message("This game has finished.", ephemeral=True)
+                return
+
+            # Validate turn
+            if interaction.user.id != game.turn:
+                await interaction.response.send_message("Not your turn.", ephemeral=True)
+                return
+
+            # Drop logic
+            if not _c4_play(game, self.col):
+                await interaction.response.send_message("That column is full.", ephemeral=True)
+                return
+
+            embed, view = await _c4_render(interaction.guild, game)
             try:
-                grid = json.loads(grid)
-            except Exception:
-                grid = [[" "] * C4PersistentView.COLS for _ in range(C4PersistentView.ROWS)]
-        grid: list[list[str]]
-
-        # Validate turn
-        if interaction.user.id != turn:
-            await interaction.response.send_message("Not your turn.", ephemeral=True)
-            return
-
-        # Drop logic
-        row_idx = None
-        for r in range(C4PersistentView.ROWS - 1, -1, -1):
-            if grid[r][self.col] == " ":
-                row_idx = r
-                break
-        if row_idx is None:
-            await interaction.response.send_message("That column is full.", ephemeral=True)
-            return
-
-        piece = "X" if turn == p1 else "O"
-        grid[row_idx][self.col] = piece
-
-        # Determine next state
-        if check_c4_win(grid):
-            winner = interaction.user.id
-            finished = True
-            next_turn = None
-        elif all(grid[0][c] != " " for c in range(C4PersistentView.COLS)):
-            winner = 0
-            finished = True
-            next_turn = None
-        else:
-            next_turn = p2 if turn == p1 else p1
-            finished = False
-
-        # Persist
-        await C4PersistentView.save_state(
-            interaction,
-            game_id,
-            grid=grid,
-            turn=next_turn if next_turn is not None else (turn),
-            winner=winner,
-            finished=finished,
-        )
-
-        # Edit message
-        thumb = await _avatar_url(interaction.guild, next_turn if next_turn is not None else (turn))
-        embed = _c4_embed_from_state(grid, next_turn, winner, thumb_url=thumb)
-        # Keep buttons; disable visually when finished
-        view = C4PersistentView(game_id, finished=finished, p1=p1, p2=p2)
-        if finished:
-            for c in view.children:
-                if isinstance(c, discord.ui.Button):
-                    c.disabled = True
-        await interaction.response.edit_message(embed=embed, view=view)
+                await interaction.response.edit_message(embed=embed, view=view)
+            finally:
+                await save_c4_game(client, game)
+        if game.finished:
+            client.games.drop("connect4", game_id)  # type: ignore[attr-defined]
+        elif _c4_bot_to_move(client, game):
+            spawn(_c4_tasks, _c4_ai_turn(client, interaction.guild, game_id), log, f"[C4] AI turn in game {game_id}")
 
 
 class C4RematchButton(discord.ui.Button):
@@ -297,48 +386,25 @@ class C4RematchButton(discord.ui.Button):
 
     async def callback(self, interaction: discord.Interaction):
         # Start a fresh game with same players (swap order so loser can start if desired)
-        p1, p2 = self.p2, self.p1
-        pool = getattr(interaction.client, "pool", None)
-        grid = [[" "] * C4PersistentView.COLS for _ in range(C4PersistentView.ROWS)]
-        async with pool.acquire() as conn:  # type: ignore
-            rec = await conn.fetchrow(
-                "INSERT INTO games_connect4 (guild_id, channel_id, message_id, p1, p2, turn, winner, grid, finished) VALUES ($1,$2,$3,$4,$5,$6,$7,$8::jsonb,$9) RETURNING game_id",
-                interaction.guild_id,
-                interaction.channel_id,
-                0,
-                p1,
-                p2,
-                p1,
-                None,
-                json.dumps(grid),
-                False,
-            )
-            new_game_id = int(rec[0])
-        thumb = await _avatar_url(interaction.guild, p1)
-        embed = _c4_embed_from_state(grid, p1, None, thumb_url=thumb)
-        view = C4PersistentView(new_game_id)
-        await interaction.response.send_message(content=f"<@{p1}> vs <@{p2}>", embed=embed, view=view)
-        msg = await interaction.original_response()
-        pool = getattr(interaction.client, "pool", None)
-        async with pool.acquire() as conn:  # type: ignore
-            await conn.execute("UPDATE games_connect4 SET message_id=$1 WHERE game_id=$2", msg.id, new_game_id)
-
-
-def check_c4_win(g: list[list[str]]) -> bool:
-    R, C = len(g), len(g[0])
-    def four(a, b, c, d):
-        return a != " " and a == b == c == d
-    for r in range(R):
-        for c in range(C):
-            if c + 3 < C and four(g[r][c], g[r][c+1], g[r][c+2], g[r][c+3]):
-                return True
-            if r + 3 < R and four(g[r][c], g[r+1][c], g[r+2][c], g[r+3][c]):
-                return True
-            if r + 3 < R and c + 3 < C and four(g[r][c], g[r+1][c+1], g[r+2][c+2], g[r+3][c+3]):
-                return True
-            if r - 3 >= 0 and c + 3 < C and four(g[r][c], g[r-1][c+1], g[r-2][c+2], g[r-3][c+3]):
-                return True
-    return False
+        await _c4_start(interaction, self.p2, self.p1)
+
+
+async def _c4_start(interaction: discord.Interaction, p1: int, p2: int) -> None:
+    client = interaction.client
+    pool = getattr(client, "pool", None)
+    async with pool.acquire() as conn:  # type: ignore
+        rec = await conn.fetchrow(C4_INSERT_SQL, interaction.guild_id, interaction.channel_id, 0, p1, p2, p1)
+        game_id = int(rec[0])
+    game = C4Game(game_id, interaction.channel_id, 0, p1, p2, p1)
+    embed, view = await _c4_render(interaction.guild, game)
+    await interaction.response.send_message(content=f"<@{p1}> vs <@{p2}>", embed=embed, view=view)
+    msg = await interaction.original_response()
+    game.message_id = msg.id
+    async with pool.acquire() as conn:  # type: ignore
+        await conn.execute("UPDATE games_connect4 SET message_id=$1 WHERE game_id=$2", msg.id, game_id)
+    client.games.put("connect4", game_id, game)  # type: ignore[attr-defined]
+    if _c4_bot_to_move(client, game):
+        spawn(_c4_tasks, _c4_ai_turn(client, interaction.guild, game_id), log, f"[C4] AI turn in game {game_id}")
 
 
 class MiniGamesCog(commands.Cog):
@@ -347,6 +413,10 @@ class MiniGamesCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    def cog_unload(self):
+        # Stop the Connect 4 search worker process with the cog
+        c4engine.shutdown_executor()
+
     @app_commands.command(name="rps", description="Play Rock-Paper-Scissors vs the bot (buttons)")
     @checks.cooldown(1, 5.0)
     async def rps(self, interaction: discord.Interaction):
@@ -368,45 +438,16 @@ class MiniGamesCog(commands.Cog):
         embed = view.render_embed()
         await interaction.response.send_message(content=f"<@{p1}> vs <@{p2}>", embed=embed, view=view)
 
-    @app_commands.command(name="connect4", description="Start Connect 4 vs another member")
-    @app_commands.describe(opponent="The member to challenge")
+    @app_commands.command(name="connect4", description="Start Connect 4 vs another member (or vs the bot)")
+    @app_commands.describe(opponent="The member to challenge; pick the bot itself to play against the AI")
     @app_commands.guild_only()
     @checks.cooldown(1, 10.0)
     async def connect4(self, interaction: discord.Interaction, opponent: discord.Member):
-        if opponent.bot:
-            await interaction.response.send_message("Please challenge a human member.", ephemeral=True)
+        vs_ai = self.bot.user is not None and opponent.id == self.bot.user.id
+        if opponent.bot and not vs_ai:
+            await interaction.response.send_message("Please challenge a human member (or me, for a game against the AI).", ephemeral=True)
             return
-        p1, p2 = interaction.user.id, opponent.id
-        # Initialize DB row first
-        pool = getattr(self.bot, "pool", None)
-        grid = [[" "] * C4PersistentView.COLS for _ in range(C4PersistentView.ROWS)]
-        async with pool.acquire() as conn:  # type: ignore
-            rec = await conn.fetchrow(
-                "INSERT INTO games_connect4 (guild_id, channel_id, message_id, p1, p2, turn, winner, grid, finished) VALUES ($1,$2,$3,$4,$5,$6,$7,$8::jsonb,$9) RETURNING game_id",
-                interaction.guild_id,
-                interaction.channel_id,
-                0,
-                p1,
-                p2,
-                p1,
-                None,
-                json.dumps(grid),
-                False,
-            )
-            game_id = int(rec[0])
-
-        view = C4PersistentView(game_id)
-        thumb = await _avatar_url(interaction.guild, p1)
-        embed = _c4_embed_from_state(grid, p1, None, thumb_url=thumb)
-        await interaction.response.send_message(content=f"<@{p1}> vs <@{p2}>", embed=embed, view=view)
-        # Update message_id in DB
-        msg = await interaction.original_response()
-        async with pool.acquire() as conn:  # type: ignore
-            await conn.execute(
-                "UPDATE games_connect4 SET message_id=$1 WHERE game_id=$2",
-                msg.id,
-                game_id,
-            )
+        await _c4_start(interaction, interaction.user.id, opponent.id)
 
 
 async def setup(bot: commands.Bot):
@@ -416,7 +457,8 @@ async def setup(bot: commands.Bot):
     pool = getattr(bot, "pool", None)
     if pool is not None:
         async with pool.acquire() as conn:
-            rows = await conn.fetch("SELECT game_id, message_id FROM games_connect4 WHERE finished=FALSE")
+            rows = await conn.fetch("SELECT game_id, message_id, guild_id, turn FROM games_connect4 WHERE finished=FALSE")
+        resume = []
         for r in rows:
             gid = int(r[0])
             mid = int(r[1])
@@ -426,3 +468,8 @@ async def setup(bot: commands.Bot):
                 # If message no longer exists, mark finished to clean up
                 async with pool.acquire() as conn:
                     await conn.execute("UPDATE games_connect4 SET finished=TRUE WHERE game_id=$1", gid)
+                continue
+            resume.append((gid, int(r[2]), int(r[3])))
+        # Games vs the AI that were waiting on the bot's move when it stopped
+        if resume:
+            spawn(_c4_tasks, _c4_resume_ai_games(bot, resume), log, "[C4] Resuming AI games")
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import asyncio
+import datetime
 import re
 from dataclasses import dataclass
 from typing import Dict, List
@@ -10,6 +10,7 @@ from discord import app_commands
 from discord.ext import commands
 
 from branding import BRAND_COLOR, FOOTER_TEXT
+from scheduler import message_ref
 
 
 DURATION_RE = re.compile(r"^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?$", re.IGNORECASE)
@@ -52,7 +53,7 @@ class PollView(discord.ui.View):
         self.add_item(EndPollButton(message_id=message_id))
 
     async def on_timeout(self):
-        # We don't rely on view timeout; closing handled by task
+        # We don't rely on view timeout; closing is a "poll_close" scheduler timer
         pass
 
 
@@ -131,6 +132,9 @@ class EndPollButton(discord.ui.Button):
                 item.disabled = True
         # Persist closed state
         bot = interaction.client
+        cog = bot.get_cog("PollsCog")
+        if cog is not None:
+            await cog.forget(self._message_id)
         pool = getattr(bot, "pool", None)
         if pool:
             try:
@@ -180,6 +184,9 @@ class PollsCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # message_id -> live view for open polls, so the close timer can finalize them
+        self.views: Dict[int, PollView] = {}
+        bot.scheduler.register("poll_close", self._close_poll)  # type: ignore[attr-defined]
 
     @app_commands.command(name="poll", description="Create an interactive poll (admin only)")
     @app_commands.describe(
@@ -232,28 +239,38 @@ class PollsCog(commands.Cog):
             except Exception:
                 pass
 
-        async def closer():
-            await asyncio.sleep(seconds)
-            state.closed = True
+        # Durable close deadline; survives restarts via scheduled_timers
+        self.views[sent.id] = view
+        ends_at = discord.utils.utcnow() + datetime.timedelta(seconds=seconds)
+        await self.bot.scheduler.schedule("poll_close", sent.id, ends_at, {"channel_id": interaction.channel_id})  # type: ignore[attr-defined]
+
+    async def forget(self, message_id: int) -> None:
+        self.views.pop(message_id, None)
+        await self.bot.scheduler.cancel("poll_close", message_id)  # type: ignore[attr-defined]
+
+    async def _close_poll(self, message_id: int, payload: dict) -> None:
+        view = self.views.pop(message_id, None)
+        if view is not None and not view.state.closed:
+            view.state.closed = True
             # Disable buttons
             for item in list(view.children):
                 if isinstance(item, discord.ui.Button):
                     item.disabled = True
             # Edit message with final results
-            try:
-                await sent.edit(embed=build_poll_embed(state), view=view)
-            except Exception:
-                pass
-            # Persist closed
-            pool = getattr(self.bot, "pool", None)
-            if pool:
+            channel_id = payload.get("channel_id")
+            if channel_id:
                 try:
-                    async with pool.acquire() as conn:
-                        await conn.execute("UPDATE polls_active SET closed=TRUE WHERE message_id=$1", sent.id)
+                    await message_ref(self.bot, channel_id, message_id).edit(embed=build_poll_embed(view.state), view=view)
                 except Exception:
                     pass
-
-        asyncio.create_task(closer())
+        # Persist closed
+        pool = getattr(self.bot, "pool", None)
+        if pool:
+            try:
+                async with pool.acquire() as conn:
+                    await conn.execute("UPDATE polls_active SET closed=TRUE WHERE message_id=$1", message_id)
+            except Exception:
+                pass
 
     @poll.autocomplete("duration")
     async def duration_autocomplete(self, interaction: discord.Interaction, current: str):
@@ -287,7 +304,9 @@ class PollsCog(commands.Cog):
                     votes = {int(r["user_id"]): int(r["option_idx"]) for r in votes_rows}
                     state = PollState(question=question, options=options, votes=votes, message_id=message_id, closed=False)
                     # Register a persistent view for this message id
-                    self.bot.add_view(PollView(state, message_id=message_id), message_id=message_id)
+                    view = PollView(state, message_id=message_id)
+                    self.views[message_id] = view
+                    self.bot.add_view(view, message_id=message_id)
         except Exception:
             pass
 
@@ -21,6 +21,7 @@ MEMBER_COMMANDS = [
     ("/serverinfo", "Show server stats (name, members, boosts, channels, roles)."),
     ("/webstatus", "Check frostlinesolutions.com response and uptime color."),
     ("/activity", "View your or another user's activity with period filters."),
+    ("/leaderboard", "Most active members (all time, week or month), paged."),
     ("/avatar", "Show a user's avatar with quick Open/Copy ID buttons."),
     ("/banner", "Show a user's banner if available."),
     ("/userinfo", "Compact profile summary: ID, created, joined, roles."),
@@ -0,0 +1,191 @@
+"""
+In-memory activity rankings for FrostMod.
+
+`/activity` used to compute a user's rank with COUNT(*) / GROUP BY scans over
+`user_activity` and `user_activity_daily`, so every call cost a pass over the
+whole guild. Instead, each guild that has been looked at keeps its message
+counts in sorted arrays (all time, rolling 7 days, rolling 30 days). Rank is a
+binary search, leaderboard pages are slices, and the live message stream
+updates the arrays as it is written behind to the database.
+
+A guild is loaded the first time it is queried, under `WriteBehind.hold()` so
+the snapshot and the live increments neither overlap nor miss anything. Guilds
+nobody has queried for a while are evicted (and reloaded on the next query),
+as are guilds the bot leaves.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+PERIOD_DAYS = {"week": 7, "month": 30}
+# Keep enough daily buckets for the longest rolling window
+KEEP_DAYS = max(PERIOD_DAYS.values())
+
+
+def utc_today() -> datetime.date:
+    return discord.utils.utcnow().date()
+
+
+def week_start(day: datetime.date) -> datetime.date:
+    """Monday of the (UTC) week containing `day`."""
+    return day - datetime.timedelta(days=day.weekday())
+
+
+class RankBoard:
+    """Scores kept sorted as (-score, user_id) so rank and pages are bisect/slice operations."""
+
+    def __init__(self):
+        self.scores: Dict[int, int] = {}
+        self._order: List[Tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def add(self, user_id: int, delta: int) -> None:
+        old = self.scores.get(user_id)
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old, user_id))]
+        new = (old or 0) + delta
+        if new <= 0 and delta < 0:
+            # Fell out of a rolling window
+            self.scores.pop(user_id, None)
+            return
+        self.scores[user_id] = new
+        insort(self._order, (-new, user_id))
+
+    def score(self, user_id: int) -> Optional[int]:
+        return self.scores.get(user_id)
+
+    def rank_of_score(self, score: int) -> int:
+        """1 + number of users with strictly more than `score` (ties share a rank)."""
+        return bisect_left(self._order, (-score,)) + 1
+
+    def rank(self, user_id: int) -> Optional[int]:
+        score = self.scores.get(user_id)
+        return None if score is None else self.rank_of_score(score)
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, int]]:
+        """(user_id, score) pairs starting at `offset`, highest first."""
+        return [(uid, -neg) for neg, uid in self._order[offset:offset + limit]]
+
+
+class GuildRanks:
+    """All-time and rolling-window boards for one guild."""
+
+    def __init__(self, today: datetime.date):
+        self.all_time = RankBoard()
+        self.windows: Dict[str, RankBoard] = {p: RankBoard() for p in PERIOD_DAYS}
+        self.daily: Dict[datetime.date, Dict[int, int]] = {}
+        self.today = today
+
+    def board(self, period: str) -> RankBoard:
+        self.roll(utc_today())
+        return self.all_time if period == "all" else self.windows[period]
+
+    def add_messages(self, user_id: int, day: datetime.date, count: int, *, all_time: bool = True) -> None:
+        self.roll(max(day, self.today))
+        if all_time:
+            self.all_time.add(user_id, count)
+        age = (self.today - day).days
+        # Rolling windows only rank users who actually posted in them
+        if age >= KEEP_DAYS or count <= 0:
+            return
+        bucket = self.daily.setdefault(day, {})
+        bucket[user_id] = bucket.get(user_id, 0) + count
+        for period, days in PERIOD_DAYS.items():
+            if age < days:
+                self.windows[period].add(user_id, count)
+
+    def roll(self, today: datetime.date) -> None:
+        """Advance the rolling windows, expiring the days that slid out of each."""
+        while self.today < today:
+            self.today += datetime.timedelta(days=1)
+            for period, days in PERIOD_DAYS.items():
+                expired = self.daily.get(self.today - datetime.timedelta(days=days))
+                for uid, n in (expired or {}).items():
+                    self.windows[period].add(uid, -n)
+            self.daily.pop(self.today - datetime.timedelta(days=KEEP_DAYS), None)
+
+
+class ActivityRanks:
+    """Per-guild rank structures, loaded lazily from the activity tables."""
+
+    # Boards cost memory per member, so only recently queried guilds keep theirs
+    IDLE_SECONDS = 3600
+    PRUNE_EVERY = 300
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self.guilds: Dict[int, GuildRanks] = {}
+        self._loading: Dict[int, asyncio.Task] = {}
+        self._touched: Dict[int, float] = {}
+        self._last_prune = time.monotonic()
+
+    def record_message(self, guild_id: int, user_id: int, day: datetime.date) -> None:
+        ranks = self.guilds.get(guild_id)
+        if ranks is not None:
+            ranks.add_messages(user_id, day, 1)
+
+    async def get(self, guild_id: int) -> GuildRanks:
+        self._maybe_prune()
+        self._touched[guild_id] = time.monotonic()
+        ranks = self.guilds.get(guild_id)
+        if ranks is not None and guild_id not in self._loading:
+            return ranks
+        task = self._loading.get(guild_id)
+        if task is None:
+            task = asyncio.create_task(self._load(guild_id))
+            self._loading[guild_id] = task
+        return await asyncio.shield(task)
+
+    def drop(self, guild_id: int) -> None:
+        """Forget a guild's boards; the next query reloads them."""
+        self.guilds.pop(guild_id, None)
+        self._touched.pop(guild_id, None)
+
+    def _maybe_prune(self) -> None:
+        now = time.monotonic()
+        if now - self._last_prune < self.PRUNE_EVERY:
+            return
+        self._last_prune = now
+        for guild_id, seen in list(self._touched.items()):
+            if now - seen > self.IDLE_SECONDS and guild_id not in self._loading:
+                self.drop(guild_id)
+
+    async def _load(self, guild_id: int) -> GuildRanks:
+        today = utc_today()
+        since = today - datetime.timedelta(days=KEEP_DAYS - 1)
+        wb = self.bot.write_behind  # type: ignore[attr-defined]
+        try:
+            async with wb.hold():
+                # Registered before the snapshot: increments that arrive meanwhile stay
+                # pending in the buffer (not in the snapshot) and are counted here instead
+                ranks = GuildRanks(today)
+                self.guilds[guild_id] = ranks
+                async with self.bot.pool.acquire() as conn:  # type: ignore[attr-defined]
+                    totals = await conn.fetch(
+                        "SELECT user_id, messages_sent FROM user_activity WHERE guild_id=$1",
+                        guild_id,
+                    )
+                    days = await conn.fetch(
+                        "SELECT user_id, day, messages FROM user_activity_daily WHERE guild_id=$1 AND day >= $2",
+                        guild_id,
+                        since,
+                    )
+            for r in totals:
+                ranks.all_time.add(int(r[0]), int(r[1] or 0))
+            for r in days:
+                ranks.add_messages(int(r[0]), r[1], int(r[2] or 0), all_time=False)
+            return ranks
+        except Exception:
+            self.drop(guild_id)
+            raise
+        finally:
+            self._loading.pop(guild_id, None)
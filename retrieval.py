@@ -0,0 +1,161 @@
+"""
+Small in-memory BM25 index for picking relevant server context.
+
+The AI assistant used to paste the first 4000 characters of the whole server
+context (rules, every channel, every role) into each prompt. Instead the
+context is split into short passages and only the ones that score against the
+question are sent, within a character budget. Indexes are tiny (hundreds of
+passages per guild) and are rebuilt in memory when the guild changes.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i if in is it me my no not of on or our so "
+    "that the their there this to was we what when where which who why will with you your".split()
+)
+
+
+def _stem(t: str) -> str:
+    # Crude suffix folding so "rules"/"rule" and "advertising"/"advertise" match
+    for suffix in ("ing", "ed", "es", "s"):
+        if t.endswith(suffix) and len(t) - len(suffix) >= 3 and not t.endswith("ss"):
+            t = t[:-len(suffix)]
+            break
+    if len(t) > 3 and t.endswith("e"):
+        t = t[:-1]
+    return t
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for t in _TOKEN.findall(text.lower()):
+        if t in _STOPWORDS:
+            continue
+        tokens.append(_stem(t))
+    return tokens
+
+
+@dataclass(frozen=True)
+class Passage:
+    source: str  # "Rules", "Channels", "Roles", ...
+    text: str
+
+
+class BM25Index:
+    def __init__(self, passages: Iterable[Passage]):
+        self.passages: List[Passage] = list(passages)
+        self._tf: List[Counter] = []
+        self._len: List[int] = []
+        df: Counter = Counter()
+        for p in self.passages:
+            # The source label is indexed too, so "which roles..." finds role passages
+            tf = Counter(tokenize(f"{p.source} {p.text}"))
+            self._tf.append(tf)
+            self._len.append(sum(tf.values()))
+            df.update(tf.keys())
+        n = len(self.passages)
+        self._avg_len = (sum(self._len) / n) if n else 0.0
+        self._idf: Dict[str, float] = {t: math.log(1 + (n - c + 0.5) / (c + 0.5)) for t, c in df.items()}
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def search(self, query: str, limit: int = 8) -> List[Tuple[float, Passage]]:
+        """Passages scoring above zero for `query`, best first."""
+        terms = [t for t in set(tokenize(query)) if t in self._idf]
+        if not terms:
+            return []
+        scored = []
+        for i, tf in enumerate(self._tf):
+            score = 0.0
+            norm = K1 * (1 - B + B * self._len[i] / self._avg_len) if self._avg_len else K1
+            for t in terms:
+                f = tf.get(t)
+                if f:
+                    score += self._idf[t] * f * (K1 + 1) / (f + norm)
+            if score > 0:
+                scored.append((score, i))
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [(score, self.passages[i]) for score, i in scored[:limit]]
+
+    def select(self, query: str, budget: int, limit: int = 8) -> List[Passage]:
+        """Best matching passages whose combined text fits in `budget` characters.
+
+        Falls back to the leading passages (in index order) when nothing matches.
+        """
+        hits = [p for _, p in self.search(query, limit)] or self.passages[:limit]
+        chosen: List[Passage] = []
+        used = 0
+        for p in hits:
+            if used + len(p.text) > budget:
+                continue
+            chosen.append(p)
+            used += len(p.text)
+        return chosen
+
+
+def split_paragraphs(text: str, max_chars: int = 500) -> List[str]:
+    """Split free text (e.g. a rules message) into paragraph-sized passages."""
+    parts: List[str] = []
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if not block:
+            continue
+        if len(block) <= max_chars:
+            parts.append(block)
+            continue
+        # Long blocks: one passage per line, merged up to max_chars
+        current = ""
+        for line in block.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if current and len(current) + len(line) + 1 > max_chars:
+                parts.append(current)
+                current = ""
+            current = f"{current}\n{line}" if current else line[:max_chars]
+        if current:
+            parts.append(current)
+    return parts
+
+
+# Noise for retrieval, but they change what a question asks ("can I (not) ...", "when/where is ..."),
+# so the answer cache keeps them
+QUESTION_WORDS = frozenset("no not never nor how what when where which who whom whose why".split())
+_QUESTION_STOPWORDS = _STOPWORDS - QUESTION_WORDS
+_NEGATION = re.compile(r"\b(?:cannot|can't|won't)\b|n't\b")
+_APOSTROPHE_S = re.compile(r"'s\b")  # "where's", "server's"
+
+
+def question_tokens(text: str) -> List[str]:
+    """Like tokenize(), but negations and question words are kept (for the answer cache)."""
+    text = _APOSTROPHE_S.sub("", _NEGATION.sub(" not", text.lower().replace("\u2019", "'")))
+    return [t if t in QUESTION_WORDS else _stem(t) for t in _TOKEN.findall(text) if t not in _QUESTION_STOPWORDS]
+
+
+def normalize(text: str) -> str:
+    """Question text reduced to its stemmed content words and question words, for exact cache keys."""
+    return " ".join(question_tokens(text))
+
+
+def shingles(text: str) -> frozenset:
+    """Question tokens plus adjacent pairs; close paraphrases share most of them."""
+    tokens = question_tokens(text)
+    return frozenset(tokens) | frozenset(zip(tokens, tokens[1:]))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
@@ -0,0 +1,263 @@
+"""
+Shared timer scheduler for FrostMod.
+
+A single heap-backed scheduler replaces the per-game countdown loops and the
+per-poll closer tasks:
+
+- Deadlines ("close poll 123 at 18:05") are stored in `scheduled_timers`, so
+  they survive restarts and fire once the bot is ready again.
+- Live countdown embeds are refreshed by one shared tick that renders every
+  active countdown from in-memory state and edits the messages in a bounded
+  batch, instead of one task per game polling the database.
+
+The scheduler is created in `setup_hook` and exposed as `bot.scheduler`.
+Cogs register a handler per timer kind and schedule timers by (kind, ref_id).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Set, Tuple
+
+import discord
+
+
+TimerHandler = Callable[[int, Dict[str, Any]], Awaitable[None]]
+# Called with the remaining whole seconds; returns the embed/view to show or
+# None when the countdown should stop (e.g. the game already finished).
+CountdownRender = Callable[[int], Optional[Tuple[discord.Embed, Optional[discord.ui.View]]]]
+
+
+@dataclass
+class Timer:
+    kind: str
+    ref_id: int
+    fire_at: float  # epoch seconds
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Countdown:
+    message: discord.PartialMessage | discord.Message
+    ends_at: float  # epoch seconds
+    render: CountdownRender
+    last_shown: Optional[int] = None
+
+
+def message_ref(bot: discord.Client, channel_id: int, message_id: int) -> discord.PartialMessage:
+    """Editable handle to a message without fetching it (no cache or REST call)."""
+    return bot.get_partial_messageable(int(channel_id)).get_partial_message(int(message_id))
+
+
+def spawn(tasks: Set[asyncio.Task], coro: Coroutine[Any, Any, Any], log: logging.Logger, what: str) -> asyncio.Task:
+    """Start a background task, keeping it referenced in `tasks` until it ends and logging its failure.
+
+    The event loop only holds weak references to tasks, so an unreferenced one
+    can be garbage-collected mid-run and its exception is never reported.
+    """
+    task = asyncio.create_task(coro, name=what)
+    tasks.add(task)
+
+    def done(t: asyncio.Task) -> None:
+        tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            log.error(f"{what} failed: {t.exception()!r}", exc_info=t.exception())
+
+    task.add_done_callback(done)
+    return task
+
+
+class TimerScheduler:
+    """Heap of durable deadlines plus a batched countdown ticker."""
+
+    TICK_SECONDS = 5
+    MAX_CONCURRENT_EDITS = 5
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self.log = logging.getLogger("scheduler")
+        self._heap: List[Tuple[float, int, Tuple[str, int]]] = []
+        self._seq = itertools.count()
+        self._timers: Dict[Tuple[str, int], Timer] = {}
+        self._handlers: Dict[str, TimerHandler] = {}
+        self._orphans: Dict[str, List[Timer]] = {}
+        self._wakeup = asyncio.Event()
+        self._countdowns: Dict[str, Countdown] = {}
+        self._runner: Optional[asyncio.Task] = None
+        self._ticker: Optional[asyncio.Task] = None
+        self._firing: Set[asyncio.Task] = set()
+
+    # ------------------------------------------------------------------ timers
+
+    def register(self, kind: str, handler: TimerHandler) -> None:
+        """Register the coroutine called when a timer of `kind` fires."""
+        self._handlers[kind] = handler
+        # Timers restored before the owning cog loaded are re-armed now
+        for timer in self._orphans.pop(kind, []):
+            self._arm(timer)
+
+    async def schedule(self, kind: str, ref_id: int, fire_at: datetime, payload: Optional[Dict[str, Any]] = None) -> None:
+        """Create or move the timer for (kind, ref_id) and persist it."""
+        timer = Timer(kind=kind, ref_id=int(ref_id), fire_at=fire_at.timestamp(), payload=dict(payload or {}))
+        pool = getattr(self.bot, "pool", None)
+        if pool is not None:
+            try:
+                async with pool.acquire() as conn:
+                    await conn.execute(
+                        """
+                        INSERT INTO scheduled_timers (kind, ref_id, fire_at, payload)
+                        VALUES ($1, $2, $3, $4::jsonb)
+                        ON CONFLICT (kind, ref_id) DO UPDATE
+                        SET fire_at = EXCLUDED.fire_at, payload = EXCLUDED.payload
+                        """,
+                        kind,
+                        timer.ref_id,
+                        fire_at,
+                        json.dumps(timer.payload),
+                    )
+            except Exception as e:
+                self.log.warning(f"[SCHED] Could not persist timer {kind}:{ref_id}: {e}")
+        self._arm(timer)
+
+    async def cancel(self, kind: str, ref_id: int) -> None:
+        """Drop a pending timer; a no-op if it does not exist."""
+        self._timers.pop((kind, int(ref_id)), None)
+        await self._forget(kind, int(ref_id))
+
+    def fire_time(self, kind: str, ref_id: int) -> Optional[datetime]:
+        timer = self._timers.get((kind, int(ref_id)))
+        if timer is None:
+            return None
+        return datetime.fromtimestamp(timer.fire_at, tz=timezone.utc)
+
+    async def restore(self) -> int:
+        """Load persisted timers; call once after the pool is created."""
+        pool = getattr(self.bot, "pool", None)
+        if pool is None:
+            return 0
+        async with pool.acquire() as conn:
+            rows = await conn.fetch("SELECT kind, ref_id, fire_at, payload FROM scheduled_timers")
+        for row in rows:
+            payload = row["payload"]
+            if isinstance(payload, str):
+                try:
+                    payload = json.loads(payload)
+                except Exception:
+                    payload = {}
+            self._arm(Timer(kind=row["kind"], ref_id=int(row["ref_id"]), fire_at=row["fire_at"].timestamp(), payload=payload or {}))
+        if rows:
+            self.log.info(f"[SCHED] Restored {len(rows)} pending timer(s)")
+        return len(rows)
+
+    def start(self) -> None:
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run(), name="scheduler-timers")
+
+    async def stop(self) -> None:
+        for task in (self._runner, self._ticker):
+            if task is not None:
+                task.cancel()
+        self._runner = self._ticker = None
+
+    def _arm(self, timer: Timer) -> None:
+        key = (timer.kind, timer.ref_id)
+        self._timers[key] = timer
+        heapq.heappush(self._heap, (timer.fire_at, next(self._seq), key))
+        self._wakeup.set()
+
+    async def _forget(self, kind: str, ref_id: int) -> None:
+        pool = getattr(self.bot, "pool", None)
+        if pool is None:
+            return
+        try:
+            async with pool.acquire() as conn:
+                await conn.execute("DELETE FROM scheduled_timers WHERE kind=$1 AND ref_id=$2", kind, ref_id)
+        except Exception as e:
+            self.log.warning(f"[SCHED] Could not delete timer {kind}:{ref_id}: {e}")
+
+    async def _run(self) -> None:
+        # Handlers edit messages, so nothing fires before the gateway is ready
+        await self.bot.wait_until_ready()
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, _, key = heapq.heappop(self._heap)
+                timer = self._timers.get(key)
+                # Stale heap entries (cancelled or rescheduled) are skipped lazily
+                if timer is None or timer.fire_at != fire_at:
+                    continue
+                del self._timers[key]
+                if timer.kind not in self._handlers:
+                    self._orphans.setdefault(timer.kind, []).append(timer)
+                    continue
+                spawn(self._firing, self._fire(timer), self.log, f"[SCHED] Timer {timer.kind}:{timer.ref_id}")
+            delay = (self._heap[0][0] - time.time()) if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, timer: Timer) -> None:
+        handler = self._handlers[timer.kind]
+        try:
+            await handler(timer.ref_id, timer.payload)
+        except Exception as e:
+            self.log.error(f"[SCHED] Timer {timer.kind}:{timer.ref_id} handler failed: {e}")
+        # Only forget the row if nobody re-scheduled the same key meanwhile
+        if (timer.kind, timer.ref_id) not in self._timers:
+            await self._forget(timer.kind, timer.ref_id)
+
+    # -------------------------------------------------------------- countdowns
+
+    def add_countdown(self, key: str, message: discord.PartialMessage | discord.Message, ends_at: datetime, render: CountdownRender) -> None:
+        """Refresh `message` every tick until `ends_at` or until render returns None."""
+        self._countdowns[key] = Countdown(message=message, ends_at=ends_at.timestamp(), render=render)
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.create_task(self._tick_countdowns(), name="scheduler-countdowns")
+
+    def remove_countdown(self, key: str) -> None:
+        self._countdowns.pop(key, None)
+
+    async def _tick_countdowns(self) -> None:
+        sem = asyncio.Semaphore(self.MAX_CONCURRENT_EDITS)
+
+        async def edit(cd: Countdown, embed: discord.Embed, view: Optional[discord.ui.View]) -> None:
+            async with sem:
+                try:
+                    await cd.message.edit(embed=embed, view=view)
+                except Exception:
+                    pass
+
+        while self._countdowns:
+            await asyncio.sleep(self.TICK_SECONDS)
+            now = time.time()
+            edits = []
+            for key, cd in list(self._countdowns.items()):
+                # Round down to the tick so every message shows the same cadence
+                remaining = max(0, int(cd.ends_at - now) // self.TICK_SECONDS * self.TICK_SECONDS)
+                if remaining <= 0:
+                    # The deadline timer owns the final edit
+                    self._countdowns.pop(key, None)
+                    continue
+                if remaining == cd.last_shown:
+                    continue
+                try:
+                    rendered = cd.render(remaining)
+                except Exception as e:
+                    self.log.warning(f"[SCHED] Countdown {key} render failed: {e}")
+                    rendered = None
+                if rendered is None:
+                    self._countdowns.pop(key, None)
+                    continue
+                cd.last_shown = remaining
+                edits.append(edit(cd, *rendered))
+            if edits:
+                await asyncio.gather(*edits)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import random
 import datetime
+from dataclasses import dataclass
 from typing import Optional
 
 import discord
@@ -9,12 +10,17 @@ from discord import app_commands
 from discord.ext import commands
 
 from branding import BRAND_COLOR, FOOTER_TEXT
+from scheduler import message_ref
 
 WORDS = [
     "python", "discord", "frostmod", "moderation", "database", "asyncio", "channel", "message",
     "support", "heartbeat", "logging", "reaction", "webstatus", "embed", "audit"
 ]
 
+# Round length; reveal unlocks after the first 30 seconds
+GAME_SECONDS = 120
+REVEAL_AFTER_SECS = 30
+
 
 def scramble_word(word: str) -> str:
     chars = list(word)
@@ -26,6 +32,55 @@ def scramble_word(word: str) -> str:
     return "".join(chars)
 
 
+def scramble_embed(word: str, scrambled: str, time_left: int) -> discord.Embed:
+    desc = f"Unscramble this word: `{scrambled}`\nLength: {len(word)}\nTime left: {time_left}s"
+    embed = discord.Embed(title="Word Scramble", description=desc, color=BRAND_COLOR)
+    embed.set_footer(text=FOOTER_TEXT)
+    return embed
+
+
+@dataclass
+class ScrambleGame:
+    game_id: int
+    channel_id: int
+    message_id: int
+    word: str
+    scrambled: str
+    finished: bool = False
+    winner_id: Optional[int] = None
+
+
+async def load_game(client: discord.Client, game_id: int) -> Optional[ScrambleGame]:
+    pool = getattr(client, "pool", None)
+    if pool is None:
+        return None
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            "SELECT channel_id, message_id, word, scrambled, finished, winner_id FROM games_scramble WHERE game_id=$1",
+            game_id,
+        )
+    if row is None:
+        return None
+    return ScrambleGame(game_id, int(row[0]), int(row[1]), str(row[2]), str(row[3]), bool(row[4]), row[5])
+
+
+async def get_game(client: discord.Client, game_id: int) -> Optional[ScrambleGame]:
+    return await client.games.load("scramble", game_id, lambda: load_game(client, game_id))  # type: ignore[attr-defined]
+
+
+async def finish_game(client: discord.Client, game: ScrambleGame) -> None:
+    """Checkpoint the finished puzzle and release its timer and countdown."""
+    await client.write_behind.write_now(  # type: ignore[attr-defined]
+        ("games_scramble", game.game_id),
+        "UPDATE games_scramble SET finished=TRUE, winner_id=$1 WHERE game_id=$2",
+        game.winner_id,
+        game.game_id,
+    )
+    cog = client.get_cog("ScrambleCog")
+    if cog is not None:
+        await cog.finish(game.game_id)
+
+
 class ScrambleGuessModal(discord.ui.Modal, title="Scramble Guess"):
     def __init__(self, game_id: int):
         super().__init__(custom_id=f"scram_modal:{game_id}")
@@ -34,38 +89,32 @@ class ScrambleGuessModal(discord.ui.Modal, title="Scramble Guess"):
         self.add_item(self.answer)
 
     async def on_submit(self, interaction: discord.Interaction):
-        pool = getattr(interaction.client, "pool", None)
-        async with pool.acquire() as conn:  # type: ignore
-            row = await conn.fetchrow(
-                "SELECT word, scrambled, finished FROM games_scramble WHERE game_id=$1",
-                self.game_id,
-            )
-        if not row:
-            await interaction.response.send_message("Game not found.", ephemeral=True)
-            return
-        word, scrambled, finished = str(row[0]), str(row[1]), bool(row[2])
-        if finished:
-            await interaction.response.send_message("This scramble has finished.", ephemeral=True)
-            return
-        if self.answer.value.strip().lower() == word.lower():
+        client = interaction.client
+        async with client.games.lock("scramble", self.game_id):  # type: ignore[attr-defined]
+            game = await get_game(client, self.game_id)
+            if game is None:
+                await interaction.response.send_message("Game not found.", ephemeral=True)
+                return
+            if game.finished:
+                await interaction.response.send_message("This scramble has finished.", ephemeral=True)
+                return
+            if self.answer.value.strip().lower() != game.word.lower():
+                await interaction.response.send_message("Incorrect. Try again!", ephemeral=True)
+                return
             # mark finished and update winner
-            async with pool.acquire() as conn:  # type: ignore
-                await conn.execute(
-                    "UPDATE games_scramble SET finished=TRUE, winner_id=$1 WHERE game_id=$2",
-                    interaction.user.id,
-                    self.game_id,
-                )
-                mrow = await conn.fetchrow("SELECT message_id FROM games_scramble WHERE game_id=$1", self.game_id)
-            desc = f"`{scrambled}` → **{word}**\nWinner: <@{interaction.user.id}>"
+            game.finished = True
+            game.winner_id = interaction.user.id
+            desc = f"`{game.scrambled}` → **{game.word}**\nWinner: <@{interaction.user.id}>"
             embed = discord.Embed(title="Scramble — Solved!", description=desc, color=discord.Color.green())
             embed.set_footer(text=FOOTER_TEXT)
             view = ScrambleView(self.game_id)
             for c in view.children:
                 if isinstance(c, discord.ui.Button):
                     c.disabled = True
-            await interaction.response.edit_message(embed=embed, view=view)
-        else:
-            await interaction.response.send_message("Incorrect. Try again!", ephemeral=True)
+            try:
+                await interaction.response.edit_message(embed=embed, view=view)
+            finally:
+                await finish_game(client, game)
 
 
 class ScrambleView(discord.ui.View):
@@ -92,26 +141,27 @@ class ScrambleRevealButton(discord.ui.Button):
         self.disabled = not enabled
 
     async def callback(self, interaction: discord.Interaction):
-        pool = getattr(interaction.client, "pool", None)
-        async with pool.acquire() as conn:  # type: ignore
-            row = await conn.fetchrow("SELECT word, scrambled, finished FROM games_scramble WHERE game_id=$1", self.game_id)
-        if not row:
-            await interaction.response.send_message("Game not found.", ephemeral=True)
-            return
-        word, scrambled, finished = str(row[0]), str(row[1]), bool(row[2])
-        if finished:
-            await interaction.response.send_message("This scramble has finished.", ephemeral=True)
-            return
-        async with pool.acquire() as conn:  # type: ignore
-            await conn.execute("UPDATE games_scramble SET finished=TRUE WHERE game_id=$1", self.game_id)
-        desc = f"`{scrambled}` → **{word}**\nRevealed by a timeout."
-        embed = discord.Embed(title="Scramble — Revealed", description=desc, color=discord.Color.orange())
-        embed.set_footer(text=FOOTER_TEXT)
-        view = ScrambleView(self.game_id)
-        for c in view.children:
-            if isinstance(c, discord.ui.Button):
-                c.disabled = True
-        await interaction.response.edit_message(embed=embed, view=view)
+        client = interaction.client
+        async with client.games.lock("scramble", self.game_id):  # type: ignore[attr-defined]
+            game = await get_game(client, self.game_id)
+            if game is None:
+                await interaction.response.send_message("Game not found.", ephemeral=True)
+                return
+            if game.finished:
+                await interaction.response.send_message("This scramble has finished.", ephemeral=True)
+                return
+            game.finished = True
+            desc = f"`{game.scrambled}` → **{game.word}**\nRevealed by a timeout."
+            embed = discord.Embed(title="Scramble — Revealed", description=desc, color=discord.Color.orange())
+            embed.set_footer(text=FOOTER_TEXT)
+            view = ScrambleView(self.game_id)
+            for c in view.children:
+                if isinstance(c, discord.ui.Button):
+                    c.disabled = True
+            try:
+                await interaction.response.edit_message(embed=embed, view=view)
+            finally:
+                await finish_game(client, game)
 
 
 class ScrambleCog(commands.Cog):
@@ -119,6 +169,7 @@ class ScrambleCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        bot.scheduler.register("scramble_expire", self._expire)  # type: ignore[attr-defined]
 
     @app_commands.command(name="scramble", description="Start a word scramble puzzle in this channel")
     @app_commands.guild_only()
@@ -139,78 +190,78 @@ class ScrambleCog(commands.Cog):
             game_id = int(rec[0])
 
         # 2-minute countdown
-        total_secs = 120
-        desc = f"Unscramble this word: `{scrambled}`\nLength: {len(word)}\nTime left: {total_secs}s"
-        embed = discord.Embed(title="Word Scramble", description=desc, color=BRAND_COLOR)
-        embed.set_footer(text=FOOTER_TEXT)
         view = ScrambleView(game_id, reveal_enabled=False)
-        await interaction.response.send_message(embed=embed, view=view)
+        await interaction.response.send_message(embed=scramble_embed(word, scrambled, GAME_SECONDS), view=view)
         msg = await interaction.original_response()
         async with pool.acquire() as conn:  # type: ignore
             await conn.execute("UPDATE games_scramble SET message_id=$1 WHERE game_id=$2", msg.id, game_id)
-        # Enable reveal after 30s and update countdown periodically; auto-close at 0
-        async def countdown_task():
-            nonlocal total_secs
-            try:
-                while total_secs > 0:
-                    await discord.utils.sleep_until(discord.utils.utcnow() + datetime.timedelta(seconds=5))
-                    total_secs = max(0, total_secs - 5)
-                    # Check if finished
-                    async with pool.acquire() as conn:  # type: ignore
-                        row = await conn.fetchrow("SELECT word, scrambled, finished FROM games_scramble WHERE game_id=$1", game_id)
-                    if not row:
-                        return
-                    word2, scr2, finished = str(row[0]), str(row[1]), bool(row[2])
-                    if finished:
-                        return
-                    # Enable reveal at 30s
-                    rev_enabled = total_secs <= 90
-                    v2 = ScrambleView(game_id, reveal_enabled=rev_enabled)
-                    new_desc = f"Unscramble this word: `{scr2}`\nLength: {len(word2)}\nTime left: {total_secs}s"
-                    e2 = discord.Embed(title="Word Scramble", description=new_desc, color=BRAND_COLOR)
-                    e2.set_footer(text=FOOTER_TEXT)
-                    try:
-                        await msg.edit(embed=e2, view=v2)
-                    except Exception:
-                        pass
-                # Auto reveal when time hits 0 if not finished
-                async with pool.acquire() as conn:  # type: ignore
-                    row = await conn.fetchrow("SELECT word, scrambled, finished FROM games_scramble WHERE game_id=$1", game_id)
-                if row and not bool(row[2]):
-                    wordf, scrf = str(row[0]), str(row[1])
-                    async with pool.acquire() as conn:  # type: ignore
-                        await conn.execute("UPDATE games_scramble SET finished=TRUE WHERE game_id=$1", game_id)
-                    descf = f"`{scrf}` → **{wordf}**\nTime expired."
-                    ef = discord.Embed(title="Scramble — Time's Up", description=descf, color=discord.Color.orange())
-                    ef.set_footer(text=FOOTER_TEXT)
-                    vdone = ScrambleView(game_id)
-                    for c in vdone.children:
-                        if isinstance(c, discord.ui.Button):
-                            c.disabled = True
-                    try:
-                        await msg.edit(embed=ef, view=vdone)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
-        # Fire and forget
+        self.bot.games.put("scramble", game_id, ScrambleGame(game_id, interaction.channel_id, msg.id, word, scrambled))  # type: ignore[attr-defined]
+        # Auto-close is a durable timer; the shared ticker refreshes the countdown and unlocks reveal
+        ends_at = discord.utils.utcnow() + datetime.timedelta(seconds=GAME_SECONDS)
+        await self.bot.scheduler.schedule("scramble_expire", game_id, ends_at)  # type: ignore[attr-defined]
+        self.track(game_id, msg, ends_at)
+
+    def track(self, game_id: int, message, ends_at: datetime.datetime) -> None:
+        self.bot.scheduler.add_countdown(  # type: ignore[attr-defined]
+            f"scramble:{game_id}", message, ends_at, lambda secs: self._render_countdown(game_id, secs)
+        )
+
+    async def finish(self, game_id: int) -> None:
+        self.bot.games.drop("scramble", game_id)  # type: ignore[attr-defined]
+        self.bot.scheduler.remove_countdown(f"scramble:{game_id}")  # type: ignore[attr-defined]
+        await self.bot.scheduler.cancel("scramble_expire", game_id)  # type: ignore[attr-defined]
+
+    def _render_countdown(self, game_id: int, secs: int):
+        game = self.bot.games.get("scramble", game_id)  # type: ignore[attr-defined]
+        if game is None or game.finished:
+            return None
+        reveal_enabled = secs <= GAME_SECONDS - REVEAL_AFTER_SECS
+        return scramble_embed(game.word, game.scrambled, secs), ScrambleView(game_id, reveal_enabled=reveal_enabled)
+
+    async def _expire(self, game_id: int, payload: dict) -> None:
+        # Auto reveal when time hits 0 if not finished
+        self.bot.scheduler.remove_countdown(f"scramble:{game_id}")  # type: ignore[attr-defined]
+        async with self.bot.games.lock("scramble", game_id):  # type: ignore[attr-defined]
+            game = await get_game(self.bot, game_id)
+            if game is None or game.finished:
+                return
+            game.finished = True
+            await finish_game(self.bot, game)
+        descf = f"`{game.scrambled}` → **{game.word}**\nTime expired."
+        ef = discord.Embed(title="Scramble — Time's Up", description=descf, color=discord.Color.orange())
+        ef.set_footer(text=FOOTER_TEXT)
+        vdone = ScrambleView(game_id)
+        for c in vdone.children:
+            if isinstance(c, discord.ui.Button):
+                c.disabled = True
         try:
-            interaction.client.loop.create_task(countdown_task())
+            await message_ref(self.bot, game.channel_id, game.message_id).edit(embed=ef, view=vdone)
         except Exception:
             pass
 
+    async def resume(self, game: ScrambleGame) -> None:
+        """Re-attach a puzzle that was running before a restart."""
+        self.bot.games.put("scramble", game.game_id, game)  # type: ignore[attr-defined]
+        ends_at = self.bot.scheduler.fire_time("scramble_expire", game.game_id)  # type: ignore[attr-defined]
+        if ends_at is None:
+            ends_at = discord.utils.utcnow() + datetime.timedelta(seconds=GAME_SECONDS)
+            await self.bot.scheduler.schedule("scramble_expire", game.game_id, ends_at)  # type: ignore[attr-defined]
+        self.track(game.game_id, message_ref(self.bot, game.channel_id, game.message_id), ends_at)
+
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(ScrambleCog(bot))
+    cog = ScrambleCog(bot)
+    await bot.add_cog(cog)
     # Restore unfinished scrambles
     pool = getattr(bot, "pool", None)
     if pool is not None:
         async with pool.acquire() as conn:
-            rows = await conn.fetch("SELECT game_id, message_id FROM games_scramble WHERE finished=FALSE")
+            rows = await conn.fetch("SELECT game_id, channel_id, message_id, word, scrambled FROM games_scramble WHERE finished=FALSE")
         for r in rows:
-            gid = int(r[0]); mid = int(r[1])
+            game = ScrambleGame(int(r[0]), int(r[1]), int(r[2]), str(r[3]), str(r[4]))
             try:
-                bot.add_view(ScrambleView(gid), message_id=mid)
+                bot.add_view(ScrambleView(game.game_id), message_id=game.message_id)
+                await cog.resume(game)
             except Exception:
                 async with pool.acquire() as conn:
-                    await conn.execute("UPDATE games_scramble SET finished=TRUE WHERE game_id=$1", gid)
+                    await conn.execute("UPDATE games_scramble SET finished=TRUE WHERE game_id=$1", game.game_id)
@@ -7,6 +7,8 @@ from discord import app_commands
 from discord.ext import commands
 
 from branding import GREEN, YELLOW, RED, FOOTER_TEXT
+import latency
+from loopmonitor import LOOP_LAG, pending_tasks_by_cog
 
 
 def format_timedelta(td: timedelta) -> str:
@@ -32,7 +34,8 @@ class Status(commands.Cog):
         self.bot = bot
 
     @app_commands.command(name="status", description="Show bot uptime and API latency")
-    async def status(self, interaction: discord.Interaction):
+    @app_commands.describe(details="Admins: include event-loop lag, slow callbacks and pending tasks per cog")
+    async def status(self, interaction: discord.Interaction, details: bool = False):
         await interaction.response.defer(ephemeral=True)
         ws_ms = int((self.bot.latency or 0) * 1000)
         color = GREEN if ws_ms < 250 else YELLOW if ws_ms < 600 else RED
@@ -46,9 +49,29 @@ class Status(commands.Cog):
         embed.add_field(name="WebSocket Latency", value=f"{ws_ms} ms", inline=True)
         if interaction.guild:
             embed.add_field(name="Guild", value=interaction.guild.name, inline=False)
+        if details:
+            perms = getattr(interaction.user, "guild_permissions", None)
+            if perms is not None and perms.administrator:
+                self._add_loop_fields(embed)
+            else:
+                embed.add_field(name="Details", value="Loop diagnostics are only shown to administrators.", inline=False)
         embed.set_footer(text=FOOTER_TEXT)
         await interaction.followup.send(embed=embed, ephemeral=True)
 
+    def _add_loop_fields(self, embed: discord.Embed) -> None:
+        lag = "\n".join(f"{label}: {latency.format_percentiles(LOOP_LAG, seconds)}" for label, seconds in latency.WINDOWS.items())
+        embed.add_field(name="Event Loop Lag (p50 / p95 / p99)", value=lag, inline=False)
+        monitor = getattr(self.bot, "loop_monitor", None)
+        slow = monitor.top_slow(5) if monitor is not None else []
+        if slow:
+            value = "\n".join(f"`{e.where}` ×{e.count}, max {e.max_ms:.0f} ms" for e in slow)
+        else:
+            value = "None recorded"
+        embed.add_field(name="Slowest Callbacks", value=value[:1024], inline=False)
+        tasks = pending_tasks_by_cog(self.bot)
+        value = ", ".join(f"{name}: {n}" for name, n in tasks.most_common(10))
+        embed.add_field(name=f"Pending Tasks ({sum(tasks.values())})", value=value[:1024] or "None", inline=False)
+
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Status(bot))
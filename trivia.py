@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import random
-from typing import Optional, List
+from typing import Dict, List, Optional, Tuple
 
 import discord
 from discord import app_commands
@@ -10,6 +10,68 @@ from discord.ext import commands
 
 from branding import BRAND_COLOR, FOOTER_TEXT
 
+LEADERBOARD_SIZE = 10
+
+
+class QuestionDeck:
+    """Shuffled deck of question IDs: O(1) draws, no repeats until every question has been asked."""
+
+    def __init__(self, ids: List[int]):
+        self.ids: List[int] = list(ids)
+        self._deck: List[int] = []
+        self._last: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def draw(self) -> Optional[int]:
+        if not self.ids:
+            return None
+        if not self._deck:
+            self._deck = list(self.ids)
+            random.shuffle(self._deck)
+            # Don't repeat the previous question across the reshuffle boundary
+            if len(self._deck) > 1 and self._deck[-1] == self._last:
+                self._deck[0], self._deck[-1] = self._deck[-1], self._deck[0]
+        self._last = self._deck.pop()
+        return self._last
+
+    def add(self, qid: int) -> None:
+        """New questions join the current round at a random position."""
+        self.ids.append(qid)
+        self._deck.insert(random.randint(0, len(self._deck)), qid)
+
+    def remove(self, qid: int) -> None:
+        if qid in self.ids:
+            self.ids.remove(qid)
+        if qid in self._deck:
+            self._deck.remove(qid)
+
+
+class TopScores:
+    """Top-K of a guild's trivia scores.
+
+    Scores only ever go up, so a player outside the top K can only enter by
+    beating the current minimum, and the structure stays exact without ever
+    rescanning `trivia_scores`.
+    """
+
+    def __init__(self, k: int, rows: List[Tuple[int, int]]):
+        self.k = k
+        self.scores: Dict[int, int] = dict(rows[:k])
+
+    def update(self, user_id: int, score: int) -> None:
+        if user_id in self.scores or len(self.scores) < self.k:
+            self.scores[user_id] = score
+            return
+        low_user = min(self.scores, key=self.scores.__getitem__)
+        if score > self.scores[low_user]:
+            del self.scores[low_user]
+            self.scores[user_id] = score
+
+    def ranked(self) -> List[Tuple[int, int]]:
+        return sorted(self.scores.items(), key=lambda kv: (-kv[1], kv[0]))
+
 
 class TriviaView(discord.ui.View):
     def __init__(self, qid: int, options: List[str], correct_idx: int):
@@ -43,12 +105,15 @@ class TriviaOptionButton(discord.ui.Button):
             pool = getattr(interaction.client, "pool", None)
             if pool is not None:
                 async with pool.acquire() as conn:
-                    await conn.execute(
+                    score = await conn.fetchval(
                         "INSERT INTO trivia_scores (guild_id, user_id, score) VALUES ($1,$2,1) "
-                        "ON CONFLICT (guild_id, user_id) DO UPDATE SET score = trivia_scores.score + 1",
+                        "ON CONFLICT (guild_id, user_id) DO UPDATE SET score = trivia_scores.score + 1 RETURNING score",
                         interaction.guild_id,
                         user.id,
                     )
+                cog = interaction.client.get_cog("TriviaCog")  # type: ignore[attr-defined]
+                if cog is not None:
+                    cog.record_score(interaction.guild_id, user.id, int(score))
         # Respond with result
         verdict = "Correct!" if correct else "Incorrect"
         color = discord.Color.green() if correct else discord.Color.red()
@@ -62,6 +127,41 @@ class TriviaCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # Per-guild question decks (guild + global IDs) and leaderboards, loaded on first use
+        self.decks: Dict[Optional[int], QuestionDeck] = {}
+        self.leaderboards: Dict[int, TopScores] = {}
+
+    async def _deck(self, guild_id: Optional[int]) -> QuestionDeck:
+        deck = self.decks.get(guild_id)
+        if deck is None:
+            pool = getattr(self.bot, "pool", None)
+            async with pool.acquire() as conn:  # type: ignore
+                rows = await conn.fetch(
+                    "SELECT id FROM trivia_questions WHERE guild_id=$1 OR guild_id IS NULL",
+                    guild_id,
+                )
+            # Re-check: another /trivia may have loaded it while we awaited
+            deck = self.decks.setdefault(guild_id, QuestionDeck([int(r[0]) for r in rows]))
+        return deck
+
+    async def _leaderboard(self, guild_id: int) -> TopScores:
+        board = self.leaderboards.get(guild_id)
+        if board is None:
+            pool = getattr(self.bot, "pool", None)
+            async with pool.acquire() as conn:  # type: ignore
+                rows = await conn.fetch(
+                    "SELECT user_id, score FROM trivia_scores WHERE guild_id=$1 ORDER BY score DESC LIMIT $2",
+                    guild_id,
+                    LEADERBOARD_SIZE,
+                )
+            board = self.leaderboards.setdefault(guild_id, TopScores(LEADERBOARD_SIZE, [(int(r[0]), int(r[1])) for r in rows]))
+        return board
+
+    def record_score(self, guild_id: int, user_id: int, score: int) -> None:
+        board = self.leaderboards.get(guild_id)
+        # Unloaded guilds pick the new score up from the table on first /trivia_leaderboard
+        if board is not None:
+            board.update(user_id, score)
 
     @app_commands.command(name="trivia_add", description="Add a trivia question (4 options; specify the correct index 1-4)")
     @app_commands.describe(question="Question text", option1="Option 1", option2="Option 2", option3="Option 3", option4="Option 4", correct_index="1-4 index of the correct option", global_question="If true, question is global (usable in any guild)")
@@ -74,29 +174,40 @@ class TriviaCog(commands.Cog):
         gid = None if global_question else interaction.guild_id
         pool = getattr(self.bot, "pool", None)
         async with pool.acquire() as conn:  # type: ignore
-            await conn.execute(
-                "INSERT INTO trivia_questions (guild_id, question, options, correct_idx, author_id) VALUES ($1,$2,$3,$4,$5)",
+            qid = await conn.fetchval(
+                "INSERT INTO trivia_questions (guild_id, question, options, correct_idx, author_id) VALUES ($1,$2,$3,$4,$5) RETURNING id",
                 gid,
                 question,
                 options,
                 correct_index - 1,
                 interaction.user.id,
             )
+        # Keep loaded decks in sync: a global question joins every guild's deck
+        for deck_gid, deck in self.decks.items():
+            if gid is None or deck_gid == gid:
+                deck.add(int(qid))
         await interaction.response.send_message("Question added.", ephemeral=True)
 
     @app_commands.command(name="trivia", description="Start a trivia question from local or global pool")
     @checks.cooldown(1, 5.0)
     async def trivia(self, interaction: discord.Interaction):
+        deck = await self._deck(interaction.guild_id)
         pool = getattr(self.bot, "pool", None)
+        row = None
         async with pool.acquire() as conn:  # type: ignore
-            rows = await conn.fetch(
-                "SELECT id, question, options, correct_idx FROM trivia_questions WHERE guild_id=$1 OR guild_id IS NULL ORDER BY random() LIMIT 1",
-                interaction.guild_id,
-            )
-        if not rows:
+            while row is None and len(deck):
+                rid = deck.draw()
+                row = await conn.fetchrow(
+                    "SELECT question, options, correct_idx FROM trivia_questions WHERE id=$1",
+                    rid,
+                )
+                if row is None:
+                    # Deleted since the deck was loaded
+                    deck.remove(rid)
+        if row is None:
             await interaction.response.send_message("No trivia questions yet. Use /trivia_add to add some.", ephemeral=True)
             return
-        rid, qtext, options, correct_idx = int(rows[0][0]), str(rows[0][1]), list(rows[0][2]), int(rows[0][3])
+        qtext, options, correct_idx = str(row[0]), list(row[1]), int(row[2])
         view = TriviaView(rid, options, correct_idx)
         embed = discord.Embed(title="Trivia", description=qtext, color=BRAND_COLOR)
         embed.set_footer(text=FOOTER_TEXT)
@@ -105,16 +216,12 @@ class TriviaCog(commands.Cog):
     @app_commands.command(name="trivia_leaderboard", description="Show the guild trivia leaderboard")
     @app_commands.guild_only()
     async def trivia_leaderboard(self, interaction: discord.Interaction):
-        pool = getattr(self.bot, "pool", None)
-        async with pool.acquire() as conn:  # type: ignore
-            rows = await conn.fetch(
-                "SELECT user_id, score FROM trivia_scores WHERE guild_id=$1 ORDER BY score DESC LIMIT 10",
-                interaction.guild_id,
-            )
+        board = await self._leaderboard(interaction.guild_id)
+        rows = board.ranked()
         if not rows:
             await interaction.response.send_message("No scores yet.", ephemeral=True)
             return
-        lines = [f"<@{int(r[0])}> — {int(r[1])} pts" for r in rows]
+        lines = [f"<@{uid}> — {score} pts" for uid, score in rows]
         embed = discord.Embed(title="Trivia Leaderboard", description="\n".join(lines), color=BRAND_COLOR)
         embed.set_footer(text=FOOTER_TEXT)
         await interaction.response.send_message(embed=embed)
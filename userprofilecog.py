@@ -21,7 +21,9 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 
+from aibackend import BACKGROUND, INTERACTIVE, BackendUnavailable
 from branding import BRAND_COLOR, FOOTER_TEXT, GREEN, YELLOW, RED
+import jsonscan
 
 
 class RiskLevelEmbed(discord.Embed):
@@ -117,8 +119,12 @@ class UserProfiles(commands.Cog):
                             # Fetch the user to get current information
                             user = await self.bot.fetch_user(user_id)
                             if user:
-                                await self._update_risk_assessment(user)
+                                await self._update_risk_assessment(user, priority=BACKGROUND)
                                 updated_count += 1
+                        except BackendUnavailable as e:
+                            # Model busy or down: leave the remaining profiles for the next run
+                            self.logger.info(f"Postponing profile reassessments ({e.reason})")
+                            break
                         except Exception as e:
                             self.logger.error(f"Error updating profile for user {user_id}: {e}")
                             
@@ -548,7 +554,7 @@ class UserProfiles(commands.Cog):
             self.logger.error(f"Error analyzing social connections for user {user_id}: {e}")
             return 0.0
     
-    async def _update_risk_assessment(self, user: discord.User) -> Tuple[str, float, List[str]]:
+    async def _update_risk_assessment(self, user: discord.User, priority: int = INTERACTIVE) -> Tuple[str, float, List[str]]:
         """Update a user's risk assessment using AI analysis."""
         if not self.bot.pool:
             return "UNKNOWN", 0.0, []
@@ -631,61 +637,63 @@ class UserProfiles(commands.Cog):
                         message_content=user_prompt,
                         guild_id=None,  # Global assessment
                         debug_mode=True,
+                        system_override=system_prompt,
+                        response_format="text",  # Raw answer; the JSON is extracted below
+                        priority=priority,
                     )
                     
                     # Try to parse the AI response as JSON
                     self.logger.debug(f"Raw AI response for user {user.id}: {response}")
                     
                     # Extract JSON data from the response
-                    import re
-                    json_pattern = r'\{.*?\}'
-                    json_match = re.search(json_pattern, response, re.DOTALL)
-                    
-                    if json_match:
-                        json_str = json_match.group(0)
+                    risk_data = jsonscan.extract_object(response, keys=("risk_level", "risk_score"))
+
+                    if risk_data is not None:
                         try:
-                            risk_data = json.loads(json_str)
-                            if isinstance(risk_data, dict):
-                                risk_level = risk_data.get('risk_level', 'UNKNOWN')
-                                risk_score = float(risk_data.get('risk_score', 0.0))
-                                risk_factors = risk_data.get('risk_factors', [])
-                                
-                                # Ensure risk level is valid
-                                valid_levels = ["LOW", "MEDIUM", "HIGH", "VERY HIGH", "UNKNOWN"]
-                                if risk_level not in valid_levels:
-                                    risk_level = "UNKNOWN"
-                                    
-                                # Ensure score is in valid range
-                                risk_score = max(0.0, min(100.0, risk_score))
+                            risk_level = risk_data.get('risk_level', 'UNKNOWN')
+                            risk_score = float(risk_data.get('risk_score', 0.0))
+                            risk_factors = risk_data.get('risk_factors') or []
+                            if not isinstance(risk_factors, list):
+                                risk_factors = [str(risk_factors)]
+                            
+                            # Ensure risk level is valid
+                            valid_levels = ["LOW", "MEDIUM", "HIGH", "VERY HIGH", "UNKNOWN"]
+                            if risk_level not in valid_levels:
+                                risk_level = "UNKNOWN"
                                 
-                                # Boost risk score based on activity anomalies
-                                if activity_patterns.get("anomalies_detected", False):
-                                    anomaly_types = activity_patterns.get("anomaly_types", [])
-                                    if anomaly_types:
-                                        risk_score += min(15, len(anomaly_types) * 5)  # Up to +15 points
-                                        risk_factors.append(f"Unusual activity patterns: {', '.join(anomaly_types)}")
+                            # Ensure score is in valid range
+                            risk_score = max(0.0, min(100.0, risk_score))
+                            
+                            # Boost risk score based on activity anomalies
+                            if activity_patterns.get("anomalies_detected", False):
+                                anomaly_types = activity_patterns.get("anomaly_types", [])
+                                if anomaly_types:
+                                    risk_score += min(15, len(anomaly_types) * 5)  # Up to +15 points
+                                    risk_factors.append(f"Unusual activity patterns: {', '.join(anomaly_types)}")
+                            
+                            # Boost risk score based on social connections
+                            if social_risk > 0.3:  # Significant connections to high-risk users
+                                risk_score += min(20, social_risk * 25)  # Up to +20 points
+                                risk_factors.append(f"Significant connections to high-risk users")
                                 
-                                # Boost risk score based on social connections
-                                if social_risk > 0.3:  # Significant connections to high-risk users
-                                    risk_score += min(20, social_risk * 25)  # Up to +20 points
-                                    risk_factors.append(f"Significant connections to high-risk users")
-                                    
-                                # Cap risk score at 100
-                                risk_score = min(100.0, risk_score)
+                            # Cap risk score at 100
+                            risk_score = min(100.0, risk_score)
+                            
+                            # Update risk level based on final score
+                            if risk_score >= 85:
+                                risk_level = "VERY HIGH"
+                            elif risk_score >= 65:
+                                risk_level = "HIGH"
+                            elif risk_score >= 40:
+                                risk_level = "MEDIUM"
+                            else:
+                                risk_level = "LOW"
                                 
-                                # Update risk level based on final score
-                                if risk_score >= 85:
-                                    risk_level = "VERY HIGH"
-                                elif risk_score >= 65:
-                                    risk_level = "HIGH"
-                                elif risk_score >= 40:
-                                    risk_level = "MEDIUM"
-                                else:
-                                    risk_level = "LOW"
-                                    
-                        except (json.JSONDecodeError, ValueError) as e:
+                        except (TypeError, ValueError) as e:
                             self.logger.error(f"Error parsing AI response for user {user.id}: {e}")
                     
+                except BackendUnavailable:
+                    raise
                 except Exception as e:
                     self.logger.error(f"Error getting risk assessment from AI for user {user.id}: {e}")
             
@@ -707,7 +715,9 @@ class UserProfiles(commands.Cog):
                 )
                 
             return risk_level, risk_score, risk_factors
-            
+
+        except BackendUnavailable:
+            raise
         except Exception as e:
             self.logger.error(f"Error updating risk assessment for user {user.id}: {e}")
             return "UNKNOWN", 0.0, []
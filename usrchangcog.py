@@ -4,6 +4,7 @@ import discord
 from discord.ext import commands
 
 from branding import BRAND_COLOR, FOOTER_TEXT
+from db import LOG_SETTINGS
 
 
 class UserChangeLogger(commands.Cog):
@@ -13,18 +14,10 @@ class UserChangeLogger(commands.Cog):
         self.bot = bot
 
     async def _get_settings(self, guild_id: int):
-        pool = getattr(self.bot, "pool", None)
-        if not pool:
+        db = getattr(self.bot, "db", None)
+        if not db:
             return None
-        async with pool.acquire() as conn:
-            row = await conn.fetchrow(
-                """
-                SELECT logs_channel_id, log_nickname_change, log_role_change, log_avatar_change
-                FROM general_server WHERE guild_id = $1
-                """,
-                guild_id,
-            )
-        return row
+        return await db.fetchrow(LOG_SETTINGS, guild_id)
 
     async def _get_logs_channel(self, guild: discord.Guild, channel_id: int | None):
         if not channel_id:
@@ -69,6 +69,17 @@ class VoiceJoinLogger(commands.Cog):
                 member.id,
             )
 
+            # Weekly rollup for the activity digest
+            await conn.execute(
+                """
+                INSERT INTO activity_weekly (guild_id, week_start, voice_joins)
+                VALUES ($1, date_trunc('week', NOW() AT TIME ZONE 'UTC')::date, 1)
+                ON CONFLICT (guild_id, week_start) DO UPDATE
+                SET voice_joins = activity_weekly.voice_joins + 1
+                """,
+                member.guild.id,
+            )
+
         # Store session start in memory
         key = (member.guild.id, member.id)
         self.bot.voice_session_starts[key] = discord.utils.utcnow()  # type: ignore[attr-defined]
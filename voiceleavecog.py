@@ -86,6 +86,18 @@ class VoiceLeaveLogger(commands.Cog):
                     seconds,
                 )
 
+                # Weekly rollup for the activity digest
+                await conn.execute(
+                    """
+                    INSERT INTO activity_weekly (guild_id, week_start, voice_seconds)
+                    VALUES ($1, date_trunc('week', NOW() AT TIME ZONE 'UTC')::date, $2)
+                    ON CONFLICT (guild_id, week_start) DO UPDATE
+                    SET voice_seconds = activity_weekly.voice_seconds + EXCLUDED.voice_seconds
+                    """,
+                    member.guild.id,
+                    seconds,
+                )
+
         # Send embed if enabled
         if logs_channel_id:
             channel = member.guild.get_channel(logs_channel_id) or await self.bot.fetch_channel(logs_channel_id)  # type: ignore[arg-type]
@@ -0,0 +1,179 @@
+"""
+Write-behind buffer for FrostMod.
+
+Hot paths (game moves, counters) update in-memory state first and hand the
+database write to this buffer instead of awaiting it. Entries are keyed by the
+row they touch, so repeated writes to the same row between flushes collapse
+into the latest one. The buffer is flushed every few seconds, as soon as it
+grows past a threshold, and once more on shutdown.
+
+Counters pass a `merge` function so that instead of replacing the pending
+entry, a new submit folds its arguments into it (e.g. summing increments).
+
+Checkpoints (a game finishing, a row being created) should use `write_now`,
+which drops any pending entry for the key and writes synchronously.
+
+The buffer is created in `setup_hook` and exposed as `bot.write_behind`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import discord
+
+
+Args = Tuple[Any, ...]
+Merge = Callable[[Args, Args], Args]
+Entry = Tuple[str, Args, Optional[Merge]]
+
+
+class WriteBehind:
+    """Keyed, coalescing buffer of SQL statements flushed in one transaction."""
+
+    def __init__(self, bot: discord.Client, *, interval: float = 2.0, max_pending: int = 200):
+        self.bot = bot
+        self.interval = interval
+        self.max_pending = max_pending
+        self.log = logging.getLogger("writebehind")
+        self._pending: "OrderedDict[Hashable, Entry]" = OrderedDict()
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._warned_no_pool = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, key: Hashable, sql: str, *args: Any, merge: Optional[Merge] = None) -> None:
+        """Queue `sql` for `key`, replacing any statement still pending for it.
+
+        With `merge`, a pending entry is combined instead: merge(old_args, new_args).
+        """
+        old = self._pending.pop(key, None)
+        if merge is not None and old is not None:
+            args = merge(old[1], args)
+        self._pending[key] = (sql, args, merge)
+        if len(self._pending) >= self.max_pending:
+            self._wake.set()
+
+    def discard(self, key: Hashable) -> None:
+        self._pending.pop(key, None)
+
+    async def write_now(self, key: Hashable, sql: str, *args: Any) -> None:
+        """Checkpoint: supersede any pending write for `key` and execute immediately."""
+        # Serialized with flush so an older in-flight write cannot land after this one
+        async with self._flush_lock:
+            self._pending.pop(key, None)
+            pool = getattr(self.bot, "pool", None)
+            if pool is None:
+                return
+            async with pool.acquire() as conn:
+                await conn.execute(sql, *args)
+
+    async def flush(self) -> int:
+        """Write every pending entry; returns the number of rows written."""
+        async with self._flush_lock:
+            return await self._flush_pending()
+
+    @contextlib.asynccontextmanager
+    async def hold(self):
+        """Flush, then keep further writes out of the database until the block exits.
+
+        Lets an in-memory cache load a consistent snapshot: everything submitted
+        before the block is in the database, everything submitted during it is not.
+        """
+        async with self._flush_lock:
+            await self._flush_pending()
+            yield
+
+    async def _flush_pending(self) -> int:
+        if not self._pending:
+            return 0
+        pool = getattr(self.bot, "pool", None)
+        if pool is None:
+            # Keep the writes; they go out once a pool is attached
+            if not self._warned_no_pool:
+                self.log.warning(f"[WB] No database pool; holding {len(self._pending)} pending write(s)")
+                self._warned_no_pool = True
+            return 0
+        self._warned_no_pool = False
+        batch, self._pending = self._pending, OrderedDict()
+        # Keys that are finished (committed or dropped); only the rest are retried
+        done: Set[Hashable] = set()
+        try:
+            async with pool.acquire() as conn:
+                return await self._write(conn, batch, done)
+        except Exception as e:
+            # Database unreachable: keep what was not written (newer submits win) and retry next tick
+            self.log.warning(f"[WB] Flush deferred, {len(batch) - len(done)} pending: {e}")
+            for key, entry in batch.items():
+                if key in done:
+                    continue
+                newer = self._pending.get(key)
+                if newer is not None and entry[2] is not None:
+                    # Counters: the failed delta still has to be applied
+                    self._pending[key] = (newer[0], entry[2](entry[1], newer[1]), entry[2])
+                else:
+                    self._pending.setdefault(key, entry)
+            return 0
+
+    async def _write(self, conn, batch: "OrderedDict[Hashable, Entry]", done: Set[Hashable]) -> int:
+        # Group identical statements so each runs as one executemany round trip
+        groups: Dict[str, List[Tuple[Any, ...]]] = {}
+        for sql, args, _ in batch.values():
+            groups.setdefault(sql, []).append(args)
+        try:
+            async with conn.transaction():
+                for sql, rows in groups.items():
+                    await conn.executemany(sql, rows)
+            done.update(batch)
+            return len(batch)
+        except Exception as e:
+            if conn.is_closed():
+                raise
+            self.log.warning(f"[WB] Batch flush failed, retrying row by row: {e}")
+        # One bad statement must not block the rest of the batch forever. Each row
+        # commits on its own, so record it at once: if the connection drops midway,
+        # rows already written (counter deltas especially) must not be retried.
+        written = 0
+        for key, (sql, args, _) in batch.items():
+            try:
+                await conn.execute(sql, *args)
+                written += 1
+            except Exception as e:
+                if conn.is_closed():
+                    raise
+                self.log.error(f"[WB] Dropping write for {key!r}: {e}")
+            done.add(key)
+        return written
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="write-behind")
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write out whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            self.log.error(f"[WB] Final flush failed: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                self.log.error(f"[WB] Flush loop error: {e}")
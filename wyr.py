@@ -3,12 +3,15 @@ from __future__ import annotations
 import random
 import datetime
 import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
 from branding import BRAND_COLOR, FOOTER_TEXT
+from scheduler import message_ref
 
 PROMPTS = [
     ("Have unlimited time", "Have unlimited money"),
@@ -18,6 +21,17 @@ PROMPTS = [
     ("Travel the world", "Own your dream home"),
 ]
 
+# Voting window for /wyr; rematches stay open until someone closes them
+GAME_SECONDS = 120
+UNDO_WINDOW_SECS = 10
+
+COUNTS_SQL = "UPDATE games_wyr SET count_a=$1, count_b=$2 WHERE game_id=$3"
+VOTE_SQL = (
+    "INSERT INTO games_wyr_votes (game_id, user_id, choice) VALUES ($1,$2,$3) "
+    "ON CONFLICT (game_id, user_id) DO UPDATE SET choice=EXCLUDED.choice, created_at=NOW()"
+)
+UNVOTE_SQL = "DELETE FROM games_wyr_votes WHERE game_id=$1 AND user_id=$2"
+
 
 def _bar(count: int, total: int, width: int = 12) -> str:
     if total <= 0:
@@ -27,6 +41,40 @@ def _bar(count: int, total: int, width: int = 12) -> str:
     return "█" * filled + "░" * (width - filled)
 
 
+@dataclass
+class WYRGame:
+    game_id: int
+    channel_id: int
+    message_id: int
+    a: str
+    b: str
+    count_a: int = 0
+    count_b: int = 0
+    finished: bool = False
+    # user_id -> (choice, epoch seconds voted); backs duplicate-vote checks and undo
+    votes: Dict[int, Tuple[str, float]] = field(default_factory=dict)
+
+
+async def load_game(client: discord.Client, game_id: int) -> Optional[WYRGame]:
+    pool = getattr(client, "pool", None)
+    if pool is None:
+        return None
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            "SELECT channel_id, message_id, prompt_a, prompt_b, count_a, count_b, finished FROM games_wyr WHERE game_id=$1",
+            game_id,
+        )
+        if row is None:
+            return None
+        vote_rows = await conn.fetch("SELECT user_id, choice, created_at FROM games_wyr_votes WHERE game_id=$1", game_id)
+    votes = {int(v[0]): (str(v[1]), v[2].timestamp()) for v in vote_rows}
+    return WYRGame(game_id, int(row[0]), int(row[1]), str(row[2]), str(row[3]), int(row[4]), int(row[5]), bool(row[6]), votes)
+
+
+async def get_game(client: discord.Client, game_id: int) -> Optional[WYRGame]:
+    return await client.games.load("wyr", game_id, lambda: load_game(client, game_id))  # type: ignore[attr-defined]
+
+
 class WYRView(discord.ui.View):
     def __init__(self, game_id: int, a: str, b: str, count_a: int, count_b: int):
         super().__init__(timeout=None)
@@ -39,6 +87,10 @@ class WYRView(discord.ui.View):
         self.add_item(WYRButton(label=b, which="B", game_id=game_id))
         self.add_item(WYRRematchButton(game_id, a, b))
 
+    @classmethod
+    def for_game(cls, game: WYRGame) -> "WYRView":
+        return cls(game.game_id, game.a, game.b, game.count_a, game.count_b)
+
     def build_embed(self, *, time_left: int | None = None) -> discord.Embed:
         total = self.count_a + self.count_b
         bar_a = _bar(self.count_a, total)
@@ -69,49 +121,29 @@ class WYRButton(discord.ui.Button):
             await interaction.response.send_message("Please wait a moment before voting again.", ephemeral=True)
             return
         self._last_by_user[interaction.user.id] = now
-        pool = getattr(interaction.client, "pool", None)
-        async with pool.acquire() as conn:  # type: ignore
-            row = await conn.fetchrow(
-                "SELECT prompt_a, prompt_b, count_a, count_b, finished FROM games_wyr WHERE game_id=$1",
-                self.game_id,
-            )
-        if not row:
-            await interaction.response.send_message("Game not found.", ephemeral=True)
-            return
-        a, b, count_a, count_b, finished = str(row[0]), str(row[1]), int(row[2]), int(row[3]), bool(row[4])
-        if finished:
-            await interaction.response.send_message("This poll has finished.", ephemeral=True)
-            return
-        # Prevent multiple votes per user
-        async with pool.acquire() as conn:  # type: ignore
-            async with conn.transaction():
-                already = await conn.fetchval(
-                    "SELECT 1 FROM games_wyr_votes WHERE game_id=$1 AND user_id=$2",
-                    self.game_id,
-                    interaction.user.id,
-                )
-                if already:
-                    await interaction.response.send_message("You already voted in this poll.", ephemeral=True)
-                    return
-                # Record vote and update counters
-                await conn.execute(
-                    "INSERT INTO games_wyr_votes (game_id, user_id, choice) VALUES ($1,$2,$3)",
-                    self.game_id,
-                    interaction.user.id,
-                    self.which,
-                )
-                if self.which == "A":
-                    count_a += 1
-                else:
-                    count_b += 1
-                await conn.execute(
-                    "UPDATE games_wyr SET count_a=$1, count_b=$2 WHERE game_id=$3",
-                    count_a,
-                    count_b,
-                    self.game_id,
-                )
-        view = WYRView(self.game_id, a, b, count_a, count_b)
-        await interaction.response.edit_message(embed=view.build_embed(), view=view)
+        client = interaction.client
+        async with client.games.lock("wyr", self.game_id):  # type: ignore[attr-defined]
+            game = await get_game(client, self.game_id)
+            if game is None:
+                await interaction.response.send_message("Game not found.", ephemeral=True)
+                return
+            if game.finished:
+                await interaction.response.send_message("This poll has finished.", ephemeral=True)
+                return
+            # Prevent multiple votes per user
+            if interaction.user.id in game.votes:
+                await interaction.response.send_message("You already voted in this poll.", ephemeral=True)
+                return
+            # Record vote and update counters in memory; rows are written behind
+            game.votes[interaction.user.id] = (self.which, time.time())
+            if self.which == "A":
+                game.count_a += 1
+            else:
+                game.count_b += 1
+            client.write_behind.submit(("games_wyr_votes", game.game_id, interaction.user.id), VOTE_SQL, game.game_id, interaction.user.id, self.which)  # type: ignore[attr-defined]
+            client.write_behind.submit(("games_wyr", game.game_id), COUNTS_SQL, game.count_a, game.count_b, game.game_id)  # type: ignore[attr-defined]
+            view = WYRView.for_game(game)
+            await interaction.response.edit_message(embed=view.build_embed(), view=view)
         # Offer ephemeral 10s undo
         await interaction.followup.send(
             content=f"You voted {self.which}.",
@@ -122,7 +154,7 @@ class WYRButton(discord.ui.Button):
 
 class WYRUndoView(discord.ui.View):
     def __init__(self, game_id: int, which: str):
-        super().__init__(timeout=10)
+        super().__init__(timeout=UNDO_WINDOW_SECS)
         self.add_item(WYRUndoButton(game_id, which))
 
 
@@ -133,59 +165,32 @@ class WYRUndoButton(discord.ui.Button):
         self.which = which
 
     async def callback(self, interaction: discord.Interaction):
-        pool = getattr(interaction.client, "pool", None)
-        async with pool.acquire() as conn:  # type: ignore
-            # Only allow undo if vote exists and is recent (<=10s)
-            row = await conn.fetchrow(
-                "SELECT choice, created_at FROM games_wyr_votes WHERE game_id=$1 AND user_id=$2",
-                self.game_id,
-                interaction.user.id,
-            )
-            if not row:
+        client = interaction.client
+        async with client.games.lock("wyr", self.game_id):  # type: ignore[attr-defined]
+            game = await get_game(client, self.game_id)
+            vote = game.votes.get(interaction.user.id) if game is not None else None
+            if game is None or vote is None:
                 await interaction.response.send_message("No vote to undo.", ephemeral=True)
                 return
-            choice = str(row[0])
-            created_at = row[1]
-            from datetime import timezone, datetime, timedelta
-            now = datetime.now(timezone.utc)
-            if now - created_at > timedelta(seconds=10):
+            # Only allow undo if the vote is recent (<=10s)
+            choice, voted_at = vote
+            if time.time() - voted_at > UNDO_WINDOW_SECS:
                 await interaction.response.send_message("Undo window expired.", ephemeral=True)
                 return
-            a_b = await conn.fetchrow("SELECT prompt_a, prompt_b, count_a, count_b FROM games_wyr WHERE game_id=$1", self.game_id)
-            a, b, count_a, count_b = str(a_b[0]), str(a_b[1]), int(a_b[2]), int(a_b[3])
-            async with conn.transaction():
-                await conn.execute("DELETE FROM games_wyr_votes WHERE game_id=$1 AND user_id=$2", self.game_id, interaction.user.id)
-                if choice == 'A':
-                    count_a = max(0, count_a - 1)
-                else:
-                    count_b = max(0, count_b - 1)
-                await conn.execute("UPDATE games_wyr SET count_a=$1, count_b=$2 WHERE game_id=$3", count_a, count_b, self.game_id)
+            del game.votes[interaction.user.id]
+            if choice == 'A':
+                game.count_a = max(0, game.count_a - 1)
+            else:
+                game.count_b = max(0, game.count_b - 1)
+            client.write_behind.submit(("games_wyr_votes", game.game_id, interaction.user.id), UNVOTE_SQL, game.game_id, interaction.user.id)  # type: ignore[attr-defined]
+            client.write_behind.submit(("games_wyr", game.game_id), COUNTS_SQL, game.count_a, game.count_b, game.game_id)  # type: ignore[attr-defined]
+            view = WYRView.for_game(game)
+        await interaction.response.send_message("Your vote was undone.", ephemeral=True)
         # Update main (original) poll message, not the ephemeral undo message
-        view = WYRView(self.game_id, a, b, count_a, count_b)
-        pool = getattr(interaction.client, "pool", None)
         try:
-            async with pool.acquire() as conn:  # type: ignore
-                row2 = await conn.fetchrow(
-                    "SELECT message_id, channel_id FROM games_wyr WHERE game_id=$1",
-                    self.game_id,
-                )
-            if row2:
-                msg_id = int(row2[0]); ch_id = int(row2[1])
-                channel = interaction.client.get_channel(ch_id)
-                if channel is None:
-                    try:
-                        channel = await interaction.client.fetch_channel(ch_id)
-                    except Exception:
-                        channel = None
-                if isinstance(channel, (discord.TextChannel, discord.Thread, discord.VoiceChannel)):
-                    try:
-                        orig = await channel.fetch_message(msg_id)
-                        await orig.edit(embed=view.build_embed(), view=view)
-                    except Exception:
-                        pass
+            await message_ref(client, game.channel_id, game.message_id).edit(embed=view.build_embed(), view=view)
         except Exception:
             pass
-        await interaction.response.send_message("Your vote was undone.", ephemeral=True)
 
 
 class WYRRematchButton(discord.ui.Button):
@@ -216,6 +221,7 @@ class WYRRematchButton(discord.ui.Button):
         msg = await interaction.original_response()
         async with pool.acquire() as conn:  # type: ignore
             await conn.execute("UPDATE games_wyr SET message_id=$1 WHERE game_id=$2", msg.id, new_game_id)
+        interaction.client.games.put("wyr", new_game_id, WYRGame(new_game_id, interaction.channel_id, msg.id, a, b))  # type: ignore[attr-defined]
 
 
 class WYRCog(commands.Cog):
@@ -223,6 +229,7 @@ class WYRCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        bot.scheduler.register("wyr_expire", self._expire)  # type: ignore[attr-defined]
 
     @app_commands.command(name="wyr", description="Start a 'Would You Rather' poll")
     async def wyr(self, interaction: discord.Interaction):
@@ -241,75 +248,74 @@ class WYRCog(commands.Cog):
                 False,
             )
             game_id = int(rec[0])
-        total_secs = 120
         view = WYRView(game_id, a, b, 0, 0)
-        await interaction.response.send_message(embed=view.build_embed(time_left=total_secs), view=view)
+        await interaction.response.send_message(embed=view.build_embed(time_left=GAME_SECONDS), view=view)
         msg = await interaction.original_response()
         async with pool.acquire() as conn:  # type: ignore
             await conn.execute("UPDATE games_wyr SET message_id=$1 WHERE game_id=$2", msg.id, game_id)
+        self.bot.games.put("wyr", game_id, WYRGame(game_id, interaction.channel_id, msg.id, a, b))  # type: ignore[attr-defined]
 
-        async def countdown_task():
-            nonlocal total_secs
-            try:
-                while total_secs > 0:
-                    await discord.utils.sleep_until(discord.utils.utcnow() + datetime.timedelta(seconds=5))
-                    total_secs = max(0, total_secs - 5)
-                    # Pull latest counts/finished
-                    async with pool.acquire() as conn:  # type: ignore
-                        row = await conn.fetchrow(
-                            "SELECT prompt_a, prompt_b, count_a, count_b, finished FROM games_wyr WHERE game_id=$1",
-                            game_id,
-                        )
-                    if not row:
-                        return
-                    a2, b2, ca2, cb2, finished = str(row[0]), str(row[1]), int(row[2]), int(row[3]), bool(row[4])
-                    if finished:
-                        return
-                    v2 = WYRView(game_id, a2, b2, ca2, cb2)
-                    try:
-                        await msg.edit(embed=v2.build_embed(time_left=total_secs), view=v2)
-                    except Exception:
-                        pass
-                # Time up: finalize if not finished
-                async with pool.acquire() as conn:  # type: ignore
-                    row = await conn.fetchrow(
-                        "SELECT prompt_a, prompt_b, count_a, count_b, finished FROM games_wyr WHERE game_id=$1",
-                        game_id,
-                    )
-                if row and not bool(row[4]):
-                    a3, b3, ca3, cb3 = str(row[0]), str(row[1]), int(row[2]), int(row[3])
-                    async with pool.acquire() as conn:  # type: ignore
-                        await conn.execute("UPDATE games_wyr SET finished=TRUE WHERE game_id=$1", game_id)
-                    vdone = WYRView(game_id, a3, b3, ca3, cb3)
-                    for c in vdone.children:
-                        if isinstance(c, discord.ui.Button):
-                            c.disabled = True
-                    efin = vdone.build_embed(time_left=0)
-                    efin.title = "Would You Rather — Closed"
-                    try:
-                        await msg.edit(embed=efin, view=vdone)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
+        ends_at = discord.utils.utcnow() + datetime.timedelta(seconds=GAME_SECONDS)
+        await self.bot.scheduler.schedule("wyr_expire", game_id, ends_at)  # type: ignore[attr-defined]
+        self.track(game_id, msg, ends_at)
+
+    def track(self, game_id: int, message, ends_at: datetime.datetime) -> None:
+        self.bot.scheduler.add_countdown(  # type: ignore[attr-defined]
+            f"wyr:{game_id}", message, ends_at, lambda secs: self._render_countdown(game_id, secs)
+        )
+
+    def _render_countdown(self, game_id: int, secs: int):
+        game = self.bot.games.get("wyr", game_id)  # type: ignore[attr-defined]
+        if game is None or game.finished:
+            return None
+        view = WYRView.for_game(game)
+        return view.build_embed(time_left=secs), view
 
+    async def _expire(self, game_id: int, payload: dict) -> None:
+        # Time up: finalize if not finished
+        self.bot.scheduler.remove_countdown(f"wyr:{game_id}")  # type: ignore[attr-defined]
+        async with self.bot.games.lock("wyr", game_id):  # type: ignore[attr-defined]
+            game = await get_game(self.bot, game_id)
+            if game is None or game.finished:
+                return
+            game.finished = True
+            await self.bot.write_behind.write_now(  # type: ignore[attr-defined]
+                ("games_wyr", game_id),
+                "UPDATE games_wyr SET count_a=$1, count_b=$2, finished=TRUE WHERE game_id=$3",
+                game.count_a,
+                game.count_b,
+                game_id,
+            )
+        self.bot.games.drop("wyr", game_id)  # type: ignore[attr-defined]
+        vdone = WYRView.for_game(game)
+        for c in vdone.children:
+            if isinstance(c, discord.ui.Button):
+                c.disabled = True
+        efin = vdone.build_embed(time_left=0)
+        efin.title = "Would You Rather — Closed"
         try:
-            self.bot.loop.create_task(countdown_task())
+            await message_ref(self.bot, game.channel_id, game.message_id).edit(embed=efin, view=vdone)
         except Exception:
             pass
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(WYRCog(bot))
+    cog = WYRCog(bot)
+    await bot.add_cog(cog)
     # Restore unfinished WYR polls
     pool = getattr(bot, "pool", None)
     if pool is not None:
         async with pool.acquire() as conn:
-            rows = await conn.fetch("SELECT game_id, message_id, prompt_a, prompt_b, count_a, count_b FROM games_wyr WHERE finished=FALSE")
+            rows = await conn.fetch("SELECT game_id, message_id, prompt_a, prompt_b, count_a, count_b, channel_id FROM games_wyr WHERE finished=FALSE")
         for r in rows:
             gid = int(r[0]); mid = int(r[1]); a = str(r[2]); b = str(r[3]); ca = int(r[4]); cb = int(r[5])
             try:
                 bot.add_view(WYRView(gid, a, b, ca, cb), message_id=mid)
+                # Only timed polls have a pending expiry; load those now and resume their countdown
+                ends_at = bot.scheduler.fire_time("wyr_expire", gid)  # type: ignore[attr-defined]
+                if ends_at is not None:
+                    await get_game(bot, gid)
+                    cog.track(gid, message_ref(bot, int(r[6]), mid), ends_at)
             except Exception:
                 async with pool.acquire() as conn:
                     await conn.execute("UPDATE games_wyr SET finished=TRUE WHERE game_id=$1", gid)